@@ -12,3 +12,9 @@ class AccountsConfig(AppConfig):
 
     def ready(self):
         import accounts.signals  # ensures signals are registered
+        from election.metrics import register_collector
+        from .password_pool import get_pool
+        from .user_cache import user_cache
+
+        register_collector("user_cache", user_cache.stats)
+        register_collector("password_pool", lambda: get_pool().stats())
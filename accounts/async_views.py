@@ -0,0 +1,62 @@
+"""
+Async login for running under uvicorn/ASGI, enabled with ASYNC_LOGIN_VIEW.
+
+Same request and response as LoginView, but the event loop awaits the
+password pool (accounts/password_pool.py) instead of a thread blocking on
+it, so a login storm doesn't tie up the threads that serve sync views.
+"""
+import json
+
+from asgiref.sync import sync_to_async
+from django.http import HttpResponse
+from django.views import View
+from django.views.decorators.csrf import csrf_exempt
+from django.utils.decorators import method_decorator
+from rest_framework.exceptions import APIException, ParseError, ValidationError
+from rest_framework.renderers import JSONRenderer
+
+from election import admission
+from .models import User
+from .password_pool import acheck_password
+from .serializers import LoginCredentialsSerializer
+from .views import login_payload
+
+
+def json_response(data, status=200, headers=None):
+    return HttpResponse(JSONRenderer().render(data), status=status, content_type="application/json", headers=headers)
+
+
+@method_decorator(csrf_exempt, name="dispatch")
+class AsyncLoginView(View):
+    async def post(self, request):
+        ticket = None
+        try:
+            ticket = await sync_to_async(lambda: admission.admit("login", admission.client_id(request)))()
+            user = await self.authenticate(request)
+            # Issuing the refresh token records it for the blacklist (a DB write)
+            return json_response(await sync_to_async(login_payload)(user))
+        except APIException as exc:
+            headers = {"Retry-After": str(exc.wait)} if getattr(exc, "wait", None) else None
+            detail = exc.detail if isinstance(exc.detail, (dict, list)) else {"detail": exc.detail}
+            return json_response(detail, exc.status_code, headers)
+        finally:
+            if ticket is not None:
+                await sync_to_async(ticket.release)()
+
+    async def authenticate(self, request):
+        try:
+            data = json.loads(request.body or b"{}")
+        except ValueError:
+            raise ParseError()
+        serializer = LoginCredentialsSerializer(data=data)
+        serializer.is_valid(raise_exception=True)
+        national_id = serializer.validated_data["national_id"]
+        password = serializer.validated_data["password"]
+
+        user = await User.objects.filter(national_id=national_id).afirst()
+        if user is None:
+            # Hash anyway so unknown IDs take as long as wrong passwords
+            await acheck_password(User(), password)
+        elif await acheck_password(user, password) and user.is_active:
+            return user
+        raise ValidationError({"non_field_errors": [LoginCredentialsSerializer.INVALID_CREDENTIALS]})
@@ -1,5 +1,8 @@
 from django.contrib.auth.backends import BaseBackend
+from django.core.exceptions import PermissionDenied
 from .models import User
+from .password_pool import check_password
+from .user_cache import user_cache
 
 class NationalIDBackend(BaseBackend):
     """
@@ -11,12 +14,19 @@ class NationalIDBackend(BaseBackend):
         try:
             user = User.objects.get(national_id=national_id)
         except User.DoesNotExist:
-            return None
-        if user.check_password(password) and user.is_active:
+            # Hash anyway so unknown IDs take as long as wrong passwords
+            check_password(User(), password)
+            raise PermissionDenied
+        # Hashed in the password pool, not on this worker
+        if check_password(user, password) and user.is_active:
             return user
-        return None
+        # Stop here: ModelBackend would hash the password again, in-process
+        raise PermissionDenied
 
     def get_user(self, user_id):
+        return user_cache.get(user_id, self.load_user)
+
+    def load_user(self, user_id):
         try:
             return User.objects.get(pk=user_id)
         except User.DoesNotExist:
@@ -0,0 +1,36 @@
+import sys
+
+from django.core.management.base import BaseCommand, CommandError
+
+from accounts.register_import import BATCH_SIZE, import_register
+
+
+class Command(BaseCommand):
+    help = "Bulk-load a voter register from a CSV file ('-' for stdin)."
+
+    def add_arguments(self, parser):
+        parser.add_argument("path")
+        parser.add_argument("--batch-size", type=int, default=BATCH_SIZE)
+        parser.add_argument(
+            "--workers", type=int, default=None,
+            help="Password-hashing processes. Defaults to one per core; 0 hashes in-process.",
+        )
+
+    def handle(self, *args, **options):
+        path = options["path"]
+
+        try:
+            if path == "-":
+                report = import_register(sys.stdin.buffer, options["batch_size"], options["workers"])
+            else:
+                with open(path, "rb") as stream:
+                    report = import_register(stream, options["batch_size"], options["workers"])
+        except (OSError, ValueError) as exc:
+            raise CommandError(exc)
+
+        for error in report.errors:
+            self.stderr.write(f"line {error['line']}: {error['error']}")
+        self.stdout.write(
+            f"Read {report.rows} rows: {report.inserted} imported, {len(report.errors)} rejected "
+            f"({report.duplicates} duplicates)."
+        )
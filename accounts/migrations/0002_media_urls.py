@@ -0,0 +1,23 @@
+# Generated by Django 5.2.8 on 2026-10-18 14:29
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('accounts', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='user',
+            name='profile_pic_thumb_url',
+            field=models.CharField(blank=True, default='', editable=False, max_length=500),
+        ),
+        migrations.AddField(
+            model_name='user',
+            name='profile_pic_url',
+            field=models.CharField(blank=True, default='', editable=False, max_length=500),
+        ),
+    ]
@@ -3,6 +3,7 @@ from django.contrib.auth.models import AbstractBaseUser, BaseUserManager, Permis
 from cloudinary.models import CloudinaryField
 from django.core.validators import RegexValidator
 import uuid
+from election.media import MediaURLsMixin
 
 class UserManager(BaseUserManager):
     def create_user(self, national_id, password=None, **extra_fields):
@@ -20,7 +21,7 @@ class UserManager(BaseUserManager):
 
 
 
-class User(AbstractBaseUser, PermissionsMixin):
+class User(MediaURLsMixin, AbstractBaseUser, PermissionsMixin):
     id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
     
     national_id = models.CharField(
@@ -42,6 +43,13 @@ class User(AbstractBaseUser, PermissionsMixin):
     )
     
     profile_pic = CloudinaryField('profile_pic', null=True, blank=True)
+    profile_pic_url = models.CharField(max_length=500, blank=True, default="", editable=False)
+    profile_pic_thumb_url = models.CharField(max_length=500, blank=True, default="", editable=False)
+
+    media_urls = {
+        "profile_pic_url": ("profile_pic", None),
+        "profile_pic_thumb_url": ("profile_pic", "thumbnail"),
+    }
 
     is_active = models.BooleanField(default=True)
     is_staff = models.BooleanField(default=False)
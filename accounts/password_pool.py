@@ -0,0 +1,199 @@
+"""
+Password verification in a bounded process pool.
+
+PBKDF2 is deliberately slow and holds the GIL for the whole hash, so a
+burst of logins would otherwise starve every other request on the worker.
+Here hashes run in PASSWORD_POOL_WORKERS processes; the calling thread (or
+coroutine) only waits on the result. At most PASSWORD_POOL_WORKERS +
+PASSWORD_POOL_QUEUE_DEPTH verifications are in flight per process. Beyond
+that a login is rejected at once with PasswordPoolBusy (429 with
+Retry-After) instead of queueing behind the storm.
+
+PASSWORD_POOL_WORKERS = 0 verifies in-process, as Django does by default.
+"""
+import asyncio
+import multiprocessing
+import os
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+from django.conf import settings
+from django.contrib.auth.hashers import verify_password
+from django.core.signals import setting_changed
+from django.dispatch import receiver
+from rest_framework.exceptions import Throttled
+
+POOL_SETTINGS = ("PASSWORD_POOL_WORKERS", "PASSWORD_POOL_QUEUE_DEPTH", "PASSWORD_POOL_START_METHOD", "PASSWORD_HASHERS")
+
+
+class PasswordPoolBusy(Throttled):
+    default_detail = "Too many logins in progress; try again shortly."
+    default_code = "login_busy"
+
+    def __init__(self):
+        super().__init__(wait=1)
+
+
+def init_worker():
+    # Spawned (not forked) workers start without Django configured
+    import django
+    from django.apps import apps
+
+    if not apps.ready:
+        django.setup()
+
+
+def _verify(password, encoded):
+    started = time.time()
+    is_correct, must_update = verify_password(password, encoded)
+    return is_correct, must_update, started, time.time() - started
+
+
+class PasswordPool:
+    def __init__(self, workers, queue_depth, start_method="spawn"):
+        self.workers = workers
+        self.capacity = workers + queue_depth
+        self.start_method = start_method
+        self.slots = threading.BoundedSemaphore(self.capacity) if workers else None
+        self.executor = None
+        self.lock = threading.Lock()
+        self.reset_stats()
+
+    def reset_stats(self):
+        self.completed = 0
+        self.rejected = 0
+        self.in_flight = 0
+        self.queue_wait_total = 0.0
+        self.queue_wait_max = 0.0
+        self.hash_total = 0.0
+
+    def get_executor(self):
+        with self.lock:
+            if self.executor is None:
+                self.executor = ProcessPoolExecutor(
+                    self.workers,
+                    mp_context=multiprocessing.get_context(self.start_method),
+                    initializer=init_worker,
+                )
+            return self.executor
+
+    def submit(self, password, encoded):
+        """
+        Future of (is_correct, must_update, started, hash_seconds); raises
+        PasswordPoolBusy if the pool and its queue are full.
+        """
+        if not self.slots.acquire(blocking=False):
+            with self.lock:
+                self.rejected += 1
+            raise PasswordPoolBusy()
+        submitted = time.time()
+        try:
+            future = self.get_executor().submit(_verify, password, encoded)
+        except BaseException:
+            self.slots.release()
+            raise
+        with self.lock:
+            self.in_flight += 1
+        future.add_done_callback(lambda f: self.done(f, submitted))
+        return future
+
+    def done(self, future, submitted):
+        self.slots.release()
+        with self.lock:
+            self.in_flight -= 1
+            if future.cancelled() or future.exception() is not None:
+                return
+            _, _, started, hash_seconds = future.result()
+            self.record(max(0.0, started - submitted), hash_seconds)
+
+    def record(self, queue_wait, hash_seconds):
+        # called with self.lock held
+        self.completed += 1
+        self.queue_wait_total += queue_wait
+        self.queue_wait_max = max(self.queue_wait_max, queue_wait)
+        self.hash_total += hash_seconds
+
+    def verify(self, password, encoded):
+        if not self.workers:
+            is_correct, must_update, _, hash_seconds = _verify(password, encoded)
+            with self.lock:
+                self.record(0.0, hash_seconds)
+            return is_correct, must_update
+        return self.submit(password, encoded).result()[:2]
+
+    async def averify(self, password, encoded):
+        if not self.workers:
+            return await asyncio.to_thread(self.verify, password, encoded)
+        result = await asyncio.wrap_future(self.submit(password, encoded))
+        return result[:2]
+
+    def stats(self):
+        with self.lock:
+            completed = self.completed or 1
+            return {
+                "workers": self.workers,
+                "capacity": self.capacity,
+                "in_flight": self.in_flight,
+                "completed": self.completed,
+                "rejected": self.rejected,
+                "queue_wait_avg_ms": round(self.queue_wait_total / completed * 1000, 2),
+                "queue_wait_max_ms": round(self.queue_wait_max * 1000, 2),
+                "hash_avg_ms": round(self.hash_total / completed * 1000, 2),
+            }
+
+    def shutdown(self):
+        with self.lock:
+            if self.executor is not None:
+                self.executor.shutdown(wait=False, cancel_futures=True)
+                self.executor = None
+
+
+_pool = None
+_pool_lock = threading.Lock()
+
+
+def get_pool():
+    global _pool
+    with _pool_lock:
+        if _pool is None:
+            workers = getattr(settings, "PASSWORD_POOL_WORKERS", os.cpu_count() or 1)
+            _pool = PasswordPool(
+                workers,
+                getattr(settings, "PASSWORD_POOL_QUEUE_DEPTH", workers * 4),
+                getattr(settings, "PASSWORD_POOL_START_METHOD", "spawn"),
+            )
+        return _pool
+
+
+@receiver(setting_changed)
+def reset_pool(*, setting, **kwargs):
+    global _pool
+    if setting in POOL_SETTINGS:
+        with _pool_lock:
+            if _pool is not None:
+                _pool.shutdown()
+            _pool = None
+
+
+def _upgrade(user, password):
+    # Same as AbstractBaseUser.check_password's setter: rehash with the
+    # preferred hasher without counting it as a password change
+    user.set_password(password)
+    user._password = None
+
+
+def check_password(user, password):
+    is_correct, must_update = get_pool().verify(password, user.password)
+    if is_correct and must_update:
+        _upgrade(user, password)
+        user.save(update_fields=["password"])
+    return is_correct
+
+
+async def acheck_password(user, password):
+    is_correct, must_update = await get_pool().averify(password, user.password)
+    if is_correct and must_update:
+        _upgrade(user, password)
+        await user.asave(update_fields=["password"])
+    return is_correct
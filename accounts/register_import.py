@@ -0,0 +1,221 @@
+"""
+Bulk voter-register import.
+
+Input is a CSV with a header row: national_id, vin, first_name, last_name,
+password, and optionally dob (YYYY-MM-DD), state and lga. Rows are streamed
+in batches. Each batch is validated in one pass with precompiled patterns,
+its passwords are hashed in a process pool (PBKDF2 dominates the cost) while
+the previous batch is written, and User and VoterProfile rows go in with
+bulk_create. bulk_create skips the create_user_profile signal, so profiles
+are created here.
+
+Rows get the same checks as registration through the API (field lengths,
+the voting age on dob), so a bad row is reported on its own line instead of
+failing its batch's insert.
+
+Duplicates are reported against the unique indexes on national_id and vin,
+both within the file and against existing users.
+"""
+import csv
+import datetime
+import io
+import os
+import re
+from concurrent.futures import ProcessPoolExecutor
+
+from django.contrib.auth.hashers import make_password
+from django.db import IntegrityError, transaction
+from rest_framework import serializers
+
+from .models import User, VoterProfile
+from .password_pool import init_worker
+from .serializers import voting_age_validator
+
+BATCH_SIZE = 2000
+REQUIRED_COLUMNS = ("national_id", "vin", "first_name", "last_name", "password")
+
+NATIONAL_ID_RE = re.compile(r"\d{11}")
+VIN_RE = re.compile(r"[A-HJ-NPR-Z0-9]{17}")
+# The free-text columns and the most characters each User column holds
+MAX_LENGTHS = {
+    column: User._meta.get_field(column).max_length for column in ("first_name", "last_name", "state", "lga")
+}
+
+
+class ImportReport:
+    def __init__(self):
+        self.rows = 0
+        self.inserted = 0
+        self.errors = []
+
+    def error(self, line, message):
+        self.errors.append({"line": line, "error": message})
+
+    @property
+    def duplicates(self):
+        return sum(1 for error in self.errors if error["error"].startswith("Duplicate"))
+
+    def as_dict(self):
+        return {
+            "rows": self.rows,
+            "inserted": self.inserted,
+            "rejected": len(self.errors),
+            "duplicates": self.duplicates,
+            "errors": self.errors,
+        }
+
+
+def hash_password(password):
+    return make_password(password)
+
+
+def read_batches(stream, batch_size):
+    """
+    Yields lists of (line_number, row) from a CSV text or binary stream.
+    """
+    if not isinstance(stream, io.TextIOBase):
+        stream = io.TextIOWrapper(stream, encoding="utf-8-sig", newline="")
+    reader = csv.DictReader(stream)
+    missing = [column for column in REQUIRED_COLUMNS if column not in (reader.fieldnames or ())]
+    if missing:
+        raise ValueError(f"Missing column(s): {', '.join(missing)}.")
+
+    batch = []
+    for row in reader:
+        batch.append((reader.line_num, row))
+        if len(batch) >= batch_size:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
+
+
+def validate_batch(batch, report):
+    """
+    Field checks for a whole batch; returns the (line, fields) that pass.
+    """
+    valid = []
+    for line, row in batch:
+        fields = {key: (row.get(key) or "").strip() for key in (*REQUIRED_COLUMNS, "dob", "state", "lga")}
+        fields["vin"] = fields["vin"].upper()
+        if not NATIONAL_ID_RE.fullmatch(fields["national_id"]):
+            report.error(line, "National ID must be exactly 11 digits.")
+        elif not VIN_RE.fullmatch(fields["vin"]):
+            report.error(line, "VIN must be exactly 17 characters and alphanumeric (no I, O, Q).")
+        elif not fields["first_name"] or not fields["last_name"]:
+            report.error(line, "first_name and last_name are required.")
+        elif not fields["password"]:
+            report.error(line, "password is required.")
+        elif too_long := [column for column, limit in MAX_LENGTHS.items() if len(fields[column]) > limit]:
+            report.error(line, f"{too_long[0]} must be at most {MAX_LENGTHS[too_long[0]]} characters.")
+        else:
+            try:
+                fields["dob"] = datetime.date.fromisoformat(fields["dob"]) if fields["dob"] else None
+            except ValueError:
+                report.error(line, "dob must be YYYY-MM-DD.")
+                continue
+            if fields["dob"]:
+                try:
+                    voting_age_validator(fields["dob"])
+                except serializers.ValidationError as error:
+                    report.error(line, str(error.detail[0]))
+                    continue
+            valid.append((line, fields))
+    return valid
+
+
+def drop_duplicates(rows, seen, report):
+    """
+    Rejects rows whose national_id or vin is already in the file (`seen`)
+    or the database; returns the rest.
+    """
+    national_ids = {fields["national_id"] for _, fields in rows}
+    vins = {fields["vin"] for _, fields in rows}
+    taken_national_ids = set(User.objects.filter(national_id__in=national_ids).values_list("national_id", flat=True))
+    taken_vins = set(User.objects.filter(vin__in=vins).values_list("vin", flat=True))
+
+    unique = []
+    for line, fields in rows:
+        if fields["national_id"] in taken_national_ids or fields["national_id"] in seen["national_id"]:
+            report.error(line, "Duplicate national_id (accounts_user.national_id is unique).")
+        elif fields["vin"] in taken_vins or fields["vin"] in seen["vin"]:
+            report.error(line, "Duplicate vin (accounts_user.vin is unique).")
+        else:
+            seen["national_id"].add(fields["national_id"])
+            seen["vin"].add(fields["vin"])
+            unique.append((line, fields))
+    return unique
+
+
+def build_user(fields, password_hash):
+    return User(
+        national_id=fields["national_id"],
+        vin=fields["vin"],
+        first_name=fields["first_name"],
+        last_name=fields["last_name"],
+        dob=fields["dob"],
+        state=fields["state"] or None,
+        lga=fields["lga"] or None,
+        password=password_hash,
+    )
+
+
+def insert_batch(rows, hashes, report):
+    users = [build_user(fields, password_hash) for (_, fields), password_hash in zip(rows, hashes)]
+    try:
+        with transaction.atomic():
+            User.objects.bulk_create(users)
+            VoterProfile.objects.bulk_create([VoterProfile(user=user) for user in users])
+    except IntegrityError:
+        # Someone registered one of these voters after our duplicate check;
+        # insert one at a time to find which.
+        insert_one_by_one(rows, hashes, report)
+        return
+    report.inserted += len(users)
+
+
+def insert_one_by_one(rows, hashes, report):
+    for (line, fields), password_hash in zip(rows, hashes):
+        user = build_user(fields, password_hash)
+        try:
+            with transaction.atomic():
+                User.objects.bulk_create([user])
+                VoterProfile.objects.create(user=user)
+        except IntegrityError:
+            report.error(line, "Duplicate national_id or vin (unique index).")
+        else:
+            report.inserted += 1
+
+
+def import_register(stream, batch_size=BATCH_SIZE, workers=None):
+    """
+    Imports a voter-register CSV. `workers` hashing processes (default: one
+    per core; 0 hashes in this process).
+    """
+    workers = os.cpu_count() if workers is None else workers
+    report = ImportReport()
+    seen = {"national_id": set(), "vin": set()}
+    pool = ProcessPoolExecutor(workers, initializer=init_worker) if workers else None
+    pending = None
+
+    try:
+        for batch in read_batches(stream, batch_size):
+            report.rows += len(batch)
+            rows = drop_duplicates(validate_batch(batch, report), seen, report)
+            passwords = [fields.pop("password") for _, fields in rows]
+            if pool:
+                # Hash this batch in the pool while the previous one is written
+                hashes = pool.map(hash_password, passwords, chunksize=max(1, len(passwords) // (workers * 4)))
+            else:
+                hashes = map(hash_password, passwords)
+            if pending:
+                insert_batch(pending[0], list(pending[1]), report)
+            pending = (rows, hashes)
+        if pending:
+            insert_batch(pending[0], list(pending[1]), report)
+    finally:
+        if pool:
+            pool.shutdown(cancel_futures=True)
+
+    report.errors.sort(key=lambda error: error["line"])
+    return report
@@ -16,6 +16,19 @@ def alphanumeric_validator(value):
 
 
 
+def voting_age_validator(value):
+    today = date.today()
+    age = today.year - value.year - (
+        (today.month, today.day) < (value.month, value.day)
+    )
+    if age < 18:
+        raise serializers.ValidationError(
+            "You must be at least 18 years old to register."
+        )
+    return value
+
+
+
 class RegisterSerializer(serializers.ModelSerializer):
     password = serializers.CharField(write_only=True)
 
@@ -44,15 +57,7 @@ class RegisterSerializer(serializers.ModelSerializer):
         ]
 
     def validate_dob(self, value):
-        today = date.today()
-        age = today.year - value.year - (
-            (today.month, today.day) < (value.month, value.day)
-        )
-        if age < 18:
-            raise serializers.ValidationError(
-                "You must be at least 18 years old to register."
-            )
-        return value
+        return voting_age_validator(value)
 
     def create(self, validated_data):
         password = validated_data.pop("password")
@@ -69,7 +74,9 @@ class LoginSerializer(serializers.Serializer):
     )
     password = serializers.CharField(write_only=True)
 
-    def validate(self, data):
+    INVALID_CREDENTIALS = "Invalid national_id or password."
+
+    def validate_credentials(self, data):
         national_id = str(data.get("national_id", "")).strip()
         password = data.get("password")
 
@@ -77,6 +84,10 @@ class LoginSerializer(serializers.Serializer):
             raise serializers.ValidationError({
                 "non_field_errors": "Both national_id and password are required."
             })
+        return national_id, password
+
+    def validate(self, data):
+        national_id, password = self.validate_credentials(data)
 
         user = authenticate(
             national_id=national_id,
@@ -85,13 +96,23 @@ class LoginSerializer(serializers.Serializer):
 
         if not user:
             raise serializers.ValidationError({
-                "non_field_errors": "Invalid national_id or password."
+                "non_field_errors": self.INVALID_CREDENTIALS
             })
 
         data["user"] = user
         return data
 
 
+class LoginCredentialsSerializer(LoginSerializer):
+    """
+    LoginSerializer's field checks only; the async login view checks the
+    password itself.
+    """
+    def validate(self, data):
+        data["national_id"], data["password"] = self.validate_credentials(data)
+        return data
+
+
 
 class VoteProfileSerializer(serializers.ModelSerializer):
     class Meta:
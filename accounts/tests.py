@@ -1,3 +1,272 @@
-from django.test import TestCase
+import io
+import json
+from datetime import date, timedelta
+from unittest import mock, skipIf
 
-# Create your tests here.
+from django.db import connection
+from django.core.management import call_command
+from django.test import AsyncRequestFactory, TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from rest_framework.test import APIClient
+from rest_framework_simplejwt.tokens import AccessToken
+
+try:
+    import fakeredis
+except ImportError:  # only needed for the pub/sub test
+    fakeredis = None
+
+from election import admission
+from . import user_cache as user_cache_module
+from .async_views import AsyncLoginView
+from .auth_backend import NationalIDBackend
+from .password_pool import get_pool
+from .models import User, VoterProfile
+from .register_import import import_register
+from .user_cache import CHANNEL, UserCache, user_cache
+
+
+LOCMEM_CACHES = {
+    "default": {"BACKEND": "django.core.cache.backends.locmem.LocMemCache"}
+}
+
+
+def make_user(n=1):
+    return User.objects.create_user(
+        national_id=f"{n:011d}",
+        password="secret-pass",
+        vin=f"{n:017d}",
+        first_name="Test",
+        last_name=str(n),
+    )
+
+
+@override_settings(CACHES=LOCMEM_CACHES)
+class UserCacheTests(TestCase):
+    def setUp(self):
+        user_cache.clear()
+        user_cache.reset_stats()
+        self.user = make_user()
+        self.client = APIClient()
+        self.client.credentials(HTTP_AUTHORIZATION=f"Bearer {AccessToken.for_user(self.user)}")
+
+    def user_queries(self, func):
+        with CaptureQueriesContext(connection) as ctx:
+            func()
+        return [q["sql"] for q in ctx.captured_queries if '"accounts_user"' in q["sql"]]
+
+    def test_jwt_user_is_loaded_once(self):
+        self.assertEqual(len(self.user_queries(lambda: self.client.get("/vote/candidates/presidential/"))), 1)
+        for _ in range(3):
+            response = self.client.get("/vote/candidates/presidential/")
+            self.assertEqual(response.status_code, 200)
+            self.assertEqual(self.user_queries(lambda: self.client.get("/vote/candidates/presidential/")), [])
+
+        stats = user_cache.stats()
+        self.assertEqual(stats["misses"], 1)
+        self.assertEqual(stats["queries_saved"], 6)
+
+    def test_deactivation_takes_effect_on_next_request(self):
+        self.assertEqual(self.client.get("/vote/candidates/presidential/").status_code, 200)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.user.is_active = False
+            self.user.save()
+
+        self.assertEqual(self.client.get("/vote/candidates/presidential/").status_code, 401)
+
+    def test_session_backend_uses_cache(self):
+        backend = NationalIDBackend()
+        self.assertEqual(backend.get_user(self.user.pk), self.user)
+        with self.assertNumQueries(0):
+            cached = backend.get_user(self.user.pk)
+        self.assertEqual(cached, self.user)
+        self.assertIsNot(cached, backend.get_user(self.user.pk))
+
+    def test_bounded_and_expiring(self):
+        small = UserCache(maxsize=2, ttl=60)
+        users = [self.user, make_user(2), make_user(3)]
+        for user in users:
+            small.store(user)
+        self.assertIsNone(small.lookup(users[0].pk))
+        self.assertEqual(small.lookup(users[2].pk), users[2])
+
+        expired = UserCache(maxsize=2, ttl=0)
+        expired.store(self.user)
+        self.assertIsNone(expired.lookup(self.user.pk))
+
+    @skipIf(fakeredis is None, "fakeredis is not installed")
+    def test_invalidation_is_published(self):
+        redis = fakeredis.FakeRedis()
+        subscriber = redis.pubsub(ignore_subscribe_messages=True)
+        subscriber.subscribe(CHANNEL)
+        subscriber.get_message()
+
+        with mock.patch.object(user_cache_module, "redis_enabled", return_value=True), \
+                mock.patch.object(user_cache_module, "get_redis", return_value=redis):
+            user_cache.invalidate(self.user.pk)
+
+        message = subscriber.get_message(timeout=1)
+        self.assertEqual(message["data"].decode(), str(self.user.pk))
+
+
+@override_settings(PASSWORD_HASHERS=["django.contrib.auth.hashers.MD5PasswordHasher"])
+class RegisterImportTests(TestCase):
+    HEADER = "national_id,vin,first_name,last_name,dob,state,lga,password\n"
+
+    def csv(self, *lines):
+        return io.BytesIO((self.HEADER + "".join(line + "\n" for line in lines)).encode())
+
+    def test_import_creates_users_and_profiles(self):
+        existing = make_user(9)
+        stream = self.csv(
+            "12345678901,ABCDEFGH123456789,Ada,Obi,1990-01-02,Lagos,Ikeja,pass-1",
+            "12345678902,abcdefgh123456780,Bola,Ade,,,,pass-2",
+            "12345678901,ABCDEFGH123456781,Dup,NationalId,,,,pass-3",
+            f"12345678903,{existing.vin},Dup,Vin,,,,pass-4",
+            "1234,ABCDEFGH123456782,Short,Id,,,,pass-5",
+            "12345678904,ABCDEFGHI23456782,Bad,Vin,,,,pass-6",
+            "12345678905,ABCDEFGH123456783,No,Password,,,,",
+            "12345678906,ABCDEFGH123456784,Bad,Dob,02/01/1990,,,pass-7",
+        )
+
+        report = import_register(stream, batch_size=3, workers=0)
+
+        self.assertEqual((report.rows, report.inserted, report.duplicates), (8, 2, 2))
+        self.assertEqual([e["line"] for e in report.errors], [4, 5, 6, 7, 8, 9])
+        ada = User.objects.get(national_id="12345678901")
+        self.assertTrue(ada.check_password("pass-1"))
+        self.assertEqual((ada.state, str(ada.dob)), ("Lagos", "1990-01-02"))
+        self.assertEqual(User.objects.get(national_id="12345678902").vin, "ABCDEFGH123456780")
+        self.assertEqual(VoterProfile.objects.filter(user__national_id__startswith="1234567890").count(), 2)
+
+    def test_import_applies_registration_rules(self):
+        too_young = (date.today() - timedelta(days=17 * 365)).isoformat()
+        stream = self.csv(
+            f"12345678901,ABCDEFGH123456789,{'A' * 101},Obi,,,,pass-1",
+            f"12345678902,ABCDEFGH123456780,Bola,Ade,,{'L' * 101},,pass-2",
+            f"12345678903,ABCDEFGH123456781,Chi,Eze,{too_young},,,pass-3",
+            "12345678904,ABCDEFGH123456782,Dayo,Ola,1990-01-02,Lagos,Ikeja,pass-4",
+        )
+
+        report = import_register(stream, batch_size=10, workers=0)
+
+        self.assertEqual(report.inserted, 1)
+        self.assertEqual(report.errors, [
+            {"line": 2, "error": "first_name must be at most 100 characters."},
+            {"line": 3, "error": "state must be at most 100 characters."},
+            {"line": 4, "error": "You must be at least 18 years old to register."},
+        ])
+
+    def test_command_hashes_in_worker_processes(self):
+        lines = [f"{n:011d},{n:017d},Voter,{n},,,,pw-{n}" for n in range(100, 110)]
+        out, err = io.StringIO(), io.StringIO()
+        with mock.patch("sys.stdin", io.TextIOWrapper(self.csv(*lines))):
+            call_command("import_voters", "-", "--workers", "2", "--batch-size", "4", stdout=out, stderr=err)
+
+        self.assertIn("10 imported, 0 rejected", out.getvalue())
+        self.assertTrue(User.objects.get(national_id=f"{105:011d}").check_password("pw-105"))
+
+
+@override_settings(PASSWORD_POOL_WORKERS=0)
+@override_settings(CACHES=LOCMEM_CACHES)
+class PasswordPoolTests(TestCase):
+    def setUp(self):
+        self.user = make_user()
+        self.client = APIClient()
+
+    def login(self, password="secret-pass"):
+        return self.client.post(
+            "/auth/login/", {"national_id": self.user.national_id, "password": password}, format="json"
+        )
+
+    def test_login_in_process(self):
+        self.assertEqual(self.login().status_code, 200)
+        self.assertEqual(self.login("wrong").status_code, 400)
+        self.assertEqual(get_pool().stats()["completed"], 2)
+
+    @override_settings(PASSWORD_POOL_WORKERS=1, PASSWORD_POOL_QUEUE_DEPTH=0)
+    def test_full_pool_rejects_fast(self):
+        pool = get_pool()
+        self.assertTrue(pool.slots.acquire(blocking=False))  # a login already in flight
+        try:
+            response = self.login()
+        finally:
+            pool.slots.release()
+
+        self.assertEqual(response.status_code, 429)
+        self.assertEqual(response["Retry-After"], "1")
+        self.assertEqual(pool.stats()["rejected"], 1)
+
+    @override_settings(PASSWORD_POOL_WORKERS=1)
+    def test_login_in_worker_process(self):
+        response = self.login()
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()["user"]["national_id"], self.user.national_id)
+
+        stats = get_pool().stats()
+        self.assertEqual((stats["completed"], stats["in_flight"]), (1, 0))
+        self.assertGreater(stats["hash_avg_ms"], 0)
+
+    async def test_async_login_view(self):
+        factory = AsyncRequestFactory()
+
+        async def post(body):
+            request = factory.post("/auth/login/", body, content_type="application/json")
+            return await AsyncLoginView.as_view()(request)
+
+        ok = await post({"national_id": self.user.national_id, "password": "secret-pass"})
+        self.assertEqual(ok.status_code, 200)
+        self.assertIn("access", json.loads(ok.content))
+
+        wrong = await post({"national_id": self.user.national_id, "password": "nope"})
+        self.assertEqual(wrong.status_code, 400)
+        self.assertEqual(json.loads(wrong.content), {"non_field_errors": ["Invalid national_id or password."]})
+
+        unknown = await post({"national_id": "99999999999", "password": "nope"})
+        self.assertEqual(unknown.status_code, 400)
+
+
+@skipIf(fakeredis is None, "fakeredis is not installed")
+@override_settings(ADMISSION_CONTROL={"login": {"client_rate": 0.01, "client_burst": 2, "concurrency": 10}})
+class LoginAdmissionTests(TestCase):
+    def setUp(self):
+        self.user = make_user()
+        redis = fakeredis.FakeRedis()
+        for patcher in (
+            mock.patch.object(admission, "enabled", return_value=True),
+            mock.patch.object(admission, "get_redis", return_value=redis),
+        ):
+            patcher.start()
+            self.addCleanup(patcher.stop)
+
+    def test_login_is_limited_per_client_address(self):
+        body = {"national_id": self.user.national_id, "password": "wrong"}
+        statuses = [APIClient().post("/auth/login/", body, format="json").status_code for _ in range(3)]
+
+        self.assertEqual(statuses, [400, 400, 429])
+        other = APIClient(REMOTE_ADDR="10.0.0.2").post("/auth/login/", body, format="json")
+        self.assertEqual(other.status_code, 400)
+
+    @override_settings(ADMISSION_TRUSTED_PROXIES=1)
+    def test_clients_behind_one_proxy_are_limited_separately(self):
+        body = {"national_id": self.user.national_id, "password": "wrong"}
+
+        def login(forwarded_for):
+            client = APIClient(REMOTE_ADDR="10.0.0.1", HTTP_X_FORWARDED_FOR=forwarded_for)
+            return client.post("/auth/login/", body, format="json").status_code
+
+        # Entries left of the proxy's are the client's own and not trusted
+        self.assertEqual([login(f"198.51.100.{n}, 203.0.113.7") for n in range(3)], [400, 400, 429])
+        self.assertEqual(login("203.0.113.8"), 400)
+        self.assertEqual(login("203.0.113.8"), 400)
+
+    async def test_async_login_is_limited(self):
+        factory = AsyncRequestFactory()
+        body = {"national_id": self.user.national_id, "password": "wrong"}
+        responses = [
+            await AsyncLoginView.as_view()(factory.post("/auth/login/", body, content_type="application/json"))
+            for _ in range(3)
+        ]
+
+        self.assertEqual([r.status_code for r in responses], [400, 400, 429])
+        self.assertGreaterEqual(int(responses[-1]["Retry-After"]), 1)
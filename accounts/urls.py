@@ -1,7 +1,9 @@
+from django.conf import settings
 from django.urls import path
+from .async_views import AsyncLoginView
 from .views import RegisterView, LoginView
 
 urlpatterns = [
     path("register/", RegisterView.as_view(), name="register"),
-    path("login/", LoginView.as_view(), name="login"),
+    path("login/", (AsyncLoginView if settings.ASYNC_LOGIN_VIEW else LoginView).as_view(), name="login"),
 ]
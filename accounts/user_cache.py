@@ -0,0 +1,175 @@
+"""
+Per-process cache of authenticated users.
+
+Every JWT-authenticated request would otherwise load its User row again.
+Users are kept here by id, bounded to USER_CACHE_SIZE entries (least
+recently used evicted first) and USER_CACHE_TTL seconds, and callers get a
+copy so a request can't change another request's instance.
+
+A User save or delete evicts it in this process and publishes its id on a
+Redis channel; every other process has a listener thread that evicts it
+too. The TTL bounds staleness if a message is missed, and a listener that
+has to reconnect clears its whole cache.
+"""
+import copy
+import logging
+import threading
+import time
+from collections import OrderedDict
+
+from django.conf import settings
+from django.db import transaction
+
+logger = logging.getLogger(__name__)
+
+CHANNEL = "user_cache:invalidate"
+
+
+def get_redis():
+    from django_redis import get_redis_connection
+
+    return get_redis_connection("default")
+
+
+def redis_enabled():
+    try:
+        from django_redis.cache import RedisCache
+    except ImportError:
+        return False
+    from django.core.cache import caches
+
+    return isinstance(caches["default"], RedisCache)
+
+
+class UserCache:
+    def __init__(self, maxsize=None, ttl=None):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.entries = OrderedDict()  # user id -> (expires_at, user)
+        self.lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.invalidations = 0
+        self.listener = None
+
+    def get_maxsize(self):
+        return self.maxsize if self.maxsize is not None else getattr(settings, "USER_CACHE_SIZE", 10000)
+
+    def get_ttl(self):
+        return self.ttl if self.ttl is not None else getattr(settings, "USER_CACHE_TTL", 30)
+
+    def lookup(self, user_id):
+        """
+        The cached user (a copy) or None; counts the hit or miss.
+        """
+        key = str(user_id)
+        with self.lock:
+            entry = self.entries.get(key)
+            if entry is not None and entry[0] > time.monotonic():
+                self.entries.move_to_end(key)
+                self.hits += 1
+                return copy.copy(entry[1])
+            if entry is not None:
+                del self.entries[key]
+            self.misses += 1
+        return None
+
+    def store(self, user):
+        self.ensure_listener()
+        maxsize = self.get_maxsize()
+        if maxsize <= 0:
+            return
+        with self.lock:
+            self.entries[str(user.pk)] = (time.monotonic() + self.get_ttl(), copy.copy(user))
+            self.entries.move_to_end(str(user.pk))
+            while len(self.entries) > maxsize:
+                self.entries.popitem(last=False)
+
+    def get(self, user_id, load):
+        """
+        The user with this id, from the cache or from load(user_id). load
+        returns None for a missing user; that isn't cached.
+        """
+        user = self.lookup(user_id)
+        if user is None:
+            user = load(user_id)
+            if user is not None:
+                self.store(user)
+        return user
+
+    async def aget(self, user_id, aload):
+        user = self.lookup(user_id)
+        if user is None:
+            user = await aload(user_id)
+            if user is not None:
+                self.store(user)
+        return user
+
+    def evict(self, user_id):
+        with self.lock:
+            if self.entries.pop(str(user_id), None) is not None:
+                self.invalidations += 1
+
+    def clear(self):
+        with self.lock:
+            self.entries.clear()
+
+    def invalidate(self, user_id):
+        """
+        Evicts the user here and, through Redis, in every other process.
+        """
+        self.evict(user_id)
+        if redis_enabled():
+            try:
+                get_redis().publish(CHANNEL, str(user_id))
+            except Exception:
+                logger.exception("Could not publish user cache invalidation for %s", user_id)
+
+    def invalidate_on_commit(self, user_id):
+        # Evict now so this process doesn't serve the old row before the
+        # commit, and again everywhere once the change is visible.
+        self.evict(user_id)
+        transaction.on_commit(lambda: self.invalidate(user_id))
+
+    def stats(self):
+        with self.lock:
+            lookups = self.hits + self.misses
+            return {
+                "size": len(self.entries),
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": round(self.hits / lookups, 4) if lookups else 0.0,
+                # each hit is a User query the request didn't make
+                "queries_saved": self.hits,
+                "invalidations": self.invalidations,
+            }
+
+    def reset_stats(self):
+        with self.lock:
+            self.hits = self.misses = self.invalidations = 0
+
+    def ensure_listener(self):
+        if self.listener is not None or not redis_enabled():
+            return
+        with self.lock:
+            if self.listener is None:
+                self.listener = threading.Thread(target=self.listen, name="user-cache-invalidation", daemon=True)
+                self.listener.start()
+
+    def listen(self):
+        while True:
+            try:
+                pubsub = get_redis().pubsub(ignore_subscribe_messages=True)
+                pubsub.subscribe(CHANNEL)
+                for message in pubsub.listen():
+                    if message["type"] == "message":
+                        data = message["data"]
+                        self.evict(data.decode() if isinstance(data, bytes) else data)
+            except Exception:
+                logger.exception("User cache invalidation listener lost Redis; retrying")
+            # Invalidations may have been missed while disconnected
+            self.clear()
+            time.sleep(1)
+
+
+user_cache = UserCache()
@@ -21,28 +21,35 @@ class RegisterView(APIView):
 from rest_framework_simplejwt.tokens import RefreshToken
 from rest_framework.views import APIView
 from rest_framework.response import Response
+from election.admission import AdmissionControlMixin
 from .serializers import LoginSerializer
 
-class LoginView(APIView):
+class LoginView(AdmissionControlMixin, APIView):
+    admission_endpoint = "login"
+
     @swagger_auto_schema(request_body=LoginSerializer)
     def post(self, request):
         serializer = LoginSerializer(data=request.data)
         serializer.is_valid(raise_exception=True)
 
-        user = serializer.validated_data["user"]
-        refresh = RefreshToken.for_user(user)
-
-        return Response({
-            "refresh": str(refresh),
-            "access": str(refresh.access_token),
-            "user": {
-                "national_id": user.national_id,
-                "first_name": user.first_name,
-                "last_name": user.last_name,
-                "dob": user.dob,
-                "state": user.state,
-                "lga": user.lga, 
-                "profile_pic": user.profile_pic.url if user.profile_pic else None,
-            }
-        })
+        return Response(login_payload(serializer.validated_data["user"]))
+
+
+def login_payload(user):
+    refresh = RefreshToken.for_user(user)
+
+    return {
+        "refresh": str(refresh),
+        "access": str(refresh.access_token),
+        "user": {
+            "national_id": user.national_id,
+            "first_name": user.first_name,
+            "last_name": user.last_name,
+            "dob": user.dob,
+            "state": user.state,
+            "lga": user.lga, 
+            "profile_pic": user.profile_pic_url or None,
+            "profile_pic_thumb": user.profile_pic_thumb_url or None,
+        }
+    }
 
@@ -0,0 +1,134 @@
+"""
+Shared harness for the standalone benchmarks in this directory.
+
+Run a benchmark as a module from the project root, e.g.
+
+    python -m benchmarks.bench_party_counters
+
+Each one builds a throw-away test database from DATABASE_URL (an SQLite file
+by default) and a local-memory cache, so it never touches real data. Point
+DATABASE_URL at PostgreSQL for numbers that mean anything under concurrency,
+and set BENCH_USE_REDIS=1 to keep the configured Redis cache.
+"""
+import os
+import threading
+import time
+from contextlib import contextmanager
+
+
+LOCMEM_CACHES = {
+    "default": {
+        "BACKEND": "django.core.cache.backends.locmem.LocMemCache",
+        "LOCATION": "benchmarks",
+    }
+}
+
+
+def setup_django():
+    os.environ.setdefault("DJANGO_SETTINGS_MODULE", "election.settings")
+    os.environ.setdefault("SECRET_KEY", "benchmark")
+    os.environ.setdefault("DATABASE_URL", "sqlite:///bench.sqlite3")
+
+    import django
+    from django.conf import settings
+
+    django.setup()
+
+    database = settings.DATABASES["default"]
+    if database["ENGINE"].endswith("sqlite3"):
+        # A file (not the default in-memory db) so worker threads share it
+        database.setdefault("TEST", {})["NAME"] = "bench_test.sqlite3"
+        database.setdefault("OPTIONS", {})["timeout"] = 60
+
+
+@contextmanager
+def test_database():
+    from django.db import connection
+    from django.test.utils import (
+        override_settings,
+        setup_test_environment,
+        teardown_test_environment,
+    )
+
+    setup_test_environment()
+    old_name = connection.settings_dict["NAME"]
+    connection.creation.create_test_db(verbosity=0, autoclobber=True)
+    try:
+        if os.environ.get("BENCH_USE_REDIS"):
+            yield
+        else:
+            with override_settings(CACHES=LOCMEM_CACHES):
+                yield
+    finally:
+        connection.creation.destroy_test_db(old_name, verbosity=0)
+        teardown_test_environment()
+
+
+def percentile(samples, pct):
+    if not samples:
+        return 0.0
+    ordered = sorted(samples)
+    index = min(len(ordered) - 1, int(round(pct / 100 * (len(ordered) - 1))))
+    return ordered[index]
+
+
+def run_concurrent(operation, workers, ops_per_worker):
+    """
+    Calls operation(worker, i) ops_per_worker times on each of `workers`
+    threads, all released together. Returns a dict of throughput and latency
+    figures (latencies in milliseconds).
+    """
+    from django.db import connections
+
+    barrier = threading.Barrier(workers + 1)
+    latencies = []
+    errors = []
+    lock = threading.Lock()
+
+    def worker(index):
+        local = []
+        barrier.wait()
+        try:
+            for i in range(ops_per_worker):
+                start = time.perf_counter()
+                try:
+                    operation(index, i)
+                except Exception as exc:  # counted, not fatal to the run
+                    with lock:
+                        errors.append(exc)
+                    continue
+                local.append((time.perf_counter() - start) * 1000)
+        finally:
+            connections.close_all()
+        with lock:
+            latencies.extend(local)
+
+    threads = [threading.Thread(target=worker, args=(n,)) for n in range(workers)]
+    for thread in threads:
+        thread.start()
+    barrier.wait()
+    started = time.perf_counter()
+    for thread in threads:
+        thread.join()
+    elapsed = time.perf_counter() - started
+
+    return {
+        "workers": workers,
+        "ops": len(latencies),
+        "errors": len(errors),
+        "seconds": round(elapsed, 3),
+        "ops_per_sec": round(len(latencies) / elapsed, 1) if elapsed else 0.0,
+        "p50_ms": round(percentile(latencies, 50), 2),
+        "p95_ms": round(percentile(latencies, 95), 2),
+        "p99_ms": round(percentile(latencies, 99), 2),
+    }
+
+
+def print_table(rows, columns=None):
+    if not rows:
+        return
+    columns = columns or list(rows[0])
+    widths = {c: max(len(str(c)), *(len(str(r.get(c, ""))) for r in rows)) for c in columns}
+    print("  ".join(str(c).rjust(widths[c]) for c in columns))
+    for row in rows:
+        print("  ".join(str(row.get(c, "")).rjust(widths[c]) for c in columns))
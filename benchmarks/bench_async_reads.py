@@ -0,0 +1,151 @@
+"""
+Read throughput through Django's ASGI handler: the sync DRF read views
+versus the native async views (ASYNC_READ_VIEWS).
+
+    python -m benchmarks.bench_async_reads --concurrency 50 --requests 40
+
+Requests are driven in-process at the ASGI application by `concurrency`
+asyncio tasks (no server or sockets), all on one event loop as in a single
+uvicorn worker, so req/s is per worker. Sync views run one at a time on
+asgiref's thread; the async ones overlap their cache and DB waits. With the
+local-memory cache and SQLite there is next to no I/O to wait on, so use
+BENCH_USE_REDIS=1 and a PostgreSQL DATABASE_URL for representative numbers.
+"""
+import argparse
+import asyncio
+import time
+import types
+
+from benchmarks import percentile, print_table, setup_django, test_database
+
+PARTIES = 18
+
+
+class ASGIClient:
+    def __init__(self, app):
+        self.app = app
+
+    async def get(self, path, headers=()):
+        path, _, query = path.partition("?")
+        scope = {
+            "type": "http",
+            "asgi": {"version": "3.0"},
+            "http_version": "1.1",
+            "method": "GET",
+            "scheme": "http",
+            "path": path,
+            "raw_path": path.encode(),
+            "root_path": "",
+            "query_string": query.encode(),
+            "headers": [(name.encode(), value.encode()) for name, value in headers],
+            "server": ("bench", 80),
+            "client": ("127.0.0.1", 0),
+        }
+        received = False
+        finished = asyncio.Event()
+        status = {}
+
+        async def receive():
+            nonlocal received
+            if not received:
+                received = True
+                return {"type": "http.request", "body": b"", "more_body": False}
+            await finished.wait()
+            return {"type": "http.disconnect"}
+
+        async def send(message):
+            if message["type"] == "http.response.start":
+                status["code"] = message["status"]
+            elif not message.get("more_body"):
+                finished.set()
+
+        await self.app(scope, receive, send)
+        return status.get("code")
+
+
+async def drive(client, paths, concurrency, requests):
+    latencies = []
+    errors = 0
+
+    async def worker(index):
+        nonlocal errors
+        for i in range(requests):
+            path, headers = paths[(index + i) % len(paths)]
+            started = time.perf_counter()
+            code = await client.get(path, headers)
+            if code != 200:
+                errors += 1
+                continue
+            latencies.append((time.perf_counter() - started) * 1000)
+
+    started = time.perf_counter()
+    await asyncio.gather(*(worker(n) for n in range(concurrency)))
+    elapsed = time.perf_counter() - started
+    return {
+        "ok": len(latencies),
+        "errors": errors,
+        "req_per_sec": round(len(latencies) / elapsed, 1),
+        "p50_ms": round(percentile(latencies, 50), 2),
+        "p99_ms": round(percentile(latencies, 99), 2),
+    }
+
+
+def run(concurrency, requests):
+    from django.core.handlers.asgi import ASGIHandler
+    from django.test.utils import override_settings
+    from django.urls import include, path
+    from rest_framework_simplejwt.tokens import AccessToken
+
+    from accounts.models import User
+    from vote import urls as vote_urls
+    from vote.counters import increment_party_votes
+    from vote.models import Candidate
+
+    for n in range(PARTIES):
+        party = f"P{n:02d}"
+        Candidate.objects.create(
+            election_type="presidential", name=f"Candidate {n}", party=party,
+            party_image=f"{party}.png", age=50, image=f"candidate-{n}.png",
+        )
+        increment_party_votes("presidential", party, f"{party}.png", amount=1000 + n)
+
+    user = User.objects.create_user(
+        national_id="00000000001", password="secret-pass", vin="00000000000000001",
+        first_name="Bench", last_name="User",
+    )
+    auth = [("authorization", f"Bearer {AccessToken.for_user(user)}")]
+    endpoints = {
+        "candidates": [("/vote/candidates/presidential/", auth)],
+        "party-votes": [
+            ("/vote/party-votes/presidential/", []),
+            ("/vote/party-votes/presidential/?ordering=-vote_count", []),
+        ],
+    }
+    modes = {
+        "sync": vote_urls.sync_read_urlpatterns,
+        "async": vote_urls.async_read_urlpatterns,
+    }
+
+    client = ASGIClient(ASGIHandler())
+    rows = []
+    for endpoint, paths in endpoints.items():
+        for mode, patterns in modes.items():
+            urlconf = types.ModuleType(f"bench_{mode}_urls")
+            urlconf.urlpatterns = [path("vote/", include(patterns))]
+            with override_settings(ROOT_URLCONF=urlconf):
+                asyncio.run(drive(client, paths, concurrency, 2))  # warm caches
+                result = asyncio.run(drive(client, paths, concurrency, requests))
+            rows.append({"endpoint": endpoint, "views": mode, **result})
+
+    print_table(rows)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--concurrency", type=int, default=50)
+    parser.add_argument("--requests", type=int, default=40, help="per task")
+    args = parser.parse_args()
+
+    setup_django()
+    with test_database():
+        run(args.concurrency, args.requests)
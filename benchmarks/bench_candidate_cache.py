@@ -0,0 +1,130 @@
+"""
+Candidate-list caching: one serialized list per voter (the old scheme)
+versus one shared pre-encoded list per election plus a per-voter overlay.
+
+    python -m benchmarks.bench_candidate_cache --users 100000
+
+Each simulated voter requests the presidential list --requests times, in a
+shuffled order. Reports how often the list was served without running the
+serializer, how many per-voter DB lookups were needed, total cache size and
+time per request.
+Cache size is measured in a local-memory cache (pickled bytes, as Redis
+would store them).
+"""
+import argparse
+import random
+import time
+import uuid
+
+from benchmarks import print_table, setup_django, test_database
+
+ELECTION = "presidential"
+CANDIDATES = 12
+
+
+def old_scheme(user, build_rows):
+    from django.core.cache import cache
+
+    from vote.models import Vote
+
+    key = f"candidates_{ELECTION}_{user.id}"
+    data = cache.get(key)
+    if data:
+        return
+    set(Vote.objects.filter(user=user, election_type=ELECTION).values_list("candidate_id", flat=True))
+    cache.set(key, build_rows(), timeout=3600)
+
+
+def new_scheme(user, build_rows):
+    from django.core.cache import cache
+
+    from vote import candidate_cache
+
+    _, fragments = candidate_cache.get_shared(ELECTION, build_rows)
+    candidate_cache.render(fragments, candidate_cache.get_user_vote(ELECTION, user))
+
+
+def cache_bytes():
+    from django.core.cache import cache
+
+    return sum(len(value) for value in cache._cache.values())
+
+
+def run(users, requests):
+    from django.core.cache import cache
+    from django.db import connection
+    from django.test.utils import override_settings
+
+    from accounts.models import User
+    from vote.counters import party_totals
+    from vote.models import Candidate
+    from vote.serializers import CandidateSerializer
+
+    for n in range(CANDIDATES):
+        Candidate.objects.create(
+            election_type=ELECTION, name=f"Candidate {n}", party=f"P{n}",
+            party_image=f"party-{n}.png", age=50, image=f"candidate-{n}.png",
+        )
+
+    builds = 0
+
+    def build_rows():
+        nonlocal builds
+        builds += 1
+        party_votes = {(ELECTION, party): count for party, count in party_totals(ELECTION).items()}
+        return CandidateSerializer(
+            Candidate.objects.filter(election_type=ELECTION).order_by("name"),
+            many=True,
+            context={"user_votes": set(), "party_votes": party_votes},
+        ).data
+
+    voters = [User(id=uuid.uuid4()) for _ in range(users)]
+    schedule = voters * requests
+    random.Random(42).shuffle(schedule)
+
+    rows = []
+    big_cache = {
+        "default": {
+            "BACKEND": "django.core.cache.backends.locmem.LocMemCache",
+            "LOCATION": "bench-candidate-cache",
+            "OPTIONS": {"MAX_ENTRIES": users * 4},
+        }
+    }
+    for name, scheme in (("per-user", old_scheme), ("shared+overlay", new_scheme)):
+        with override_settings(CACHES=big_cache):
+            cache.clear()
+            builds = 0
+            queries = 0
+
+            def count_query(execute, *args):
+                nonlocal queries
+                queries += 1
+                return execute(*args)
+
+            with connection.execute_wrapper(count_query):
+                started = time.perf_counter()
+                for user in schedule:
+                    scheme(user, build_rows)
+                elapsed = time.perf_counter() - started
+            rows.append({
+                "scheme": name,
+                "requests": len(schedule),
+                "list_hit_rate": f"{1 - builds / len(schedule):.2%}",
+                "db_queries": queries,
+                "cache_mb": round(cache_bytes() / 1e6, 2),
+                "us_per_request": round(elapsed / len(schedule) * 1e6, 1),
+            })
+            cache.clear()
+
+    print_table(rows)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--users", type=int, default=100_000)
+    parser.add_argument("--requests", type=int, default=3, help="Requests per voter.")
+    args = parser.parse_args()
+
+    setup_django()
+    with test_database():
+        run(args.users, args.requests)
@@ -0,0 +1,202 @@
+"""
+Database connections under threaded load: a persistent connection per
+thread (CONN_MAX_AGE=600, the default) versus the connection pool
+(DATABASE_POOL, election/db_pool).
+
+    DATABASE_URL=postgres://... python -m benchmarks.bench_db_pool --threads 64 --requests 5000
+
+Each request does what Django's request signals do around a view:
+close_old_connections() before and after one candidate query. It runs
+under two thread models:
+
+* fixed: --threads long-lived threads, as in a threaded gunicorn worker;
+* per-request: a new thread per request, at most --threads at a time, as
+  when a thread pool keeps replacing its threads. Persistent connections
+  are then never reused: each request opens one, dropped when its thread
+  exits.
+
+Reports connections opened (churn), the most server connections seen at
+once (pg_stat_activity), throughput and latency. PostgreSQL with
+psycopg[pool] only: elsewhere the benchmark exits.
+"""
+import argparse
+import gc
+import threading
+import time
+
+from benchmarks import percentile, print_table, run_concurrent, setup_django, test_database
+
+MONITOR_INTERVAL = 0.005
+
+
+def configure(pool_size, timeout):
+    from django.db import connections
+
+    base = {**connections["default"].settings_dict, "ENGINE": "django.db.backends.postgresql"}
+    options = {name: value for name, value in base["OPTIONS"].items() if name != "pool"}
+    connections.settings["persistent"] = {**base, "CONN_MAX_AGE": 600, "OPTIONS": options}
+    connections.settings["monitor"] = {**base, "CONN_MAX_AGE": 600, "OPTIONS": options}
+    connections.settings["pooled"] = {
+        **base,
+        "ENGINE": "election.db_pool",
+        "CONN_MAX_AGE": 0,
+        "CONN_HEALTH_CHECKS": True,
+        "OPTIONS": {**options, "pool": {"min_size": min(2, pool_size), "max_size": pool_size, "timeout": timeout}},
+    }
+
+
+class PeakConnections:
+    """Samples the server's connection count to the test database on a thread."""
+
+    def __init__(self):
+        self.peak = 0
+        self.stop = threading.Event()
+        self.thread = threading.Thread(target=self.sample)
+
+    def sample(self):
+        from django.db import connections
+
+        monitor = connections["monitor"]
+        try:
+            with monitor.cursor() as cursor:
+                while not self.stop.is_set():
+                    cursor.execute(
+                        "SELECT count(*) FROM pg_stat_activity "
+                        "WHERE datname = current_database() AND pid <> pg_backend_pid()"
+                    )
+                    self.peak = max(self.peak, cursor.fetchone()[0])
+                    time.sleep(MONITOR_INTERVAL)
+        finally:
+            monitor.close()
+
+    def __enter__(self):
+        self.thread.start()
+        return self
+
+    def __exit__(self, *exc_info):
+        self.stop.set()
+        self.thread.join()
+
+
+def per_request_threads(operation, threads, requests):
+    # A fresh thread per request, at most `threads` running at once
+    slots = threading.Semaphore(threads)
+    latencies = []
+    errors = []
+    lock = threading.Lock()
+
+    def one():
+        start = time.perf_counter()
+        try:
+            operation()
+        except Exception as exc:  # counted, not fatal to the run
+            with lock:
+                errors.append(exc)
+        else:
+            with lock:
+                latencies.append((time.perf_counter() - start) * 1000)
+        finally:
+            slots.release()
+
+    spawned = []
+    started = time.perf_counter()
+    for _ in range(requests):
+        slots.acquire()
+        thread = threading.Thread(target=one)
+        thread.start()
+        spawned.append(thread)
+    for thread in spawned:
+        thread.join()
+    elapsed = time.perf_counter() - started
+
+    return {
+        "errors": len(errors),
+        "ops_per_sec": round(len(latencies) / elapsed, 1) if elapsed else 0.0,
+        "p50_ms": round(percentile(latencies, 50), 2),
+        "p95_ms": round(percentile(latencies, 95), 2),
+        "p99_ms": round(percentile(latencies, 99), 2),
+    }
+
+
+def run(threads, requests, pool_size, timeout):
+    from django.db import close_old_connections, connection, connections
+    from django.db.backends.signals import connection_created
+
+    from vote.models import Candidate
+
+    if connection.vendor != "postgresql":
+        print(f"This benchmark needs PostgreSQL; DATABASE_URL points at {connection.vendor}.")
+        return
+    try:
+        import psycopg_pool  # noqa: F401
+    except ImportError:
+        print("This benchmark needs psycopg[pool] installed.")
+        return
+
+    for party in ("APC", "PDP", "LP", "NNPP"):
+        Candidate.objects.create(
+            election_type="presidential", name=f"{party} candidate", party=party, age=60,
+            image="c", party_image="p",
+        )
+    configure(pool_size, timeout)
+
+    opened = {"persistent": 0}
+    lock = threading.Lock()
+
+    def count_connection(sender, connection, **kwargs):
+        if connection.alias == "persistent":
+            with lock:
+                opened["persistent"] += 1
+
+    connection_created.connect(count_connection)
+
+    def request(alias):
+        close_old_connections()
+        list(Candidate.objects.using(alias).filter(election_type="presidential").values_list("id", "party"))
+        close_old_connections()
+
+    rows = []
+    for model in ("fixed", "per-request"):
+        for setup in ("persistent", "pooled"):
+            opened["persistent"] = 0
+            with PeakConnections() as peak:
+                if model == "fixed":
+                    figures = run_concurrent(lambda worker, i: request(setup), threads, requests // threads)
+                else:
+                    figures = per_request_threads(lambda: request(setup), threads, requests)
+
+            if setup == "pooled":
+                stats = connections["pooled"].pool.get_stats()
+                churn = stats.get("connections_num", 0)
+                connections["pooled"].close_pool()
+            else:
+                churn = opened["persistent"]
+                gc.collect()  # close anything dead threads left open
+
+            rows.append({
+                "threads": model,
+                "setup": setup,
+                "requests": requests,
+                "connections_opened": churn,
+                "peak_server_connections": peak.peak,
+                "ops_per_sec": figures["ops_per_sec"],
+                "p50_ms": figures["p50_ms"],
+                "p99_ms": figures["p99_ms"],
+                "errors": figures["errors"],
+            })
+
+    connection_created.disconnect(count_connection)
+    print_table(rows)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--threads", type=int, default=64)
+    parser.add_argument("--requests", type=int, default=5000)
+    parser.add_argument("--pool-size", type=int, default=10)
+    parser.add_argument("--timeout", type=float, default=10.0)
+    args = parser.parse_args()
+
+    setup_django()
+    with test_database():
+        run(args.threads, args.requests, args.pool_size, args.timeout)
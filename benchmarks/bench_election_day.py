@@ -0,0 +1,255 @@
+"""
+Election-day load test: the full voter journey through the real URLs.
+
+    python -m benchmarks.bench_election_day --voters 200 --workers 8
+    python -m benchmarks.bench_election_day --fake-redis --baseline previous.json
+
+Faker generates the voters (seeded, so runs are repeatable). Each worker
+thread takes its share and, per voter: registers, logs in, then for every
+election type lists the candidates, casts a vote and polls party votes.
+
+Reports throughput, p50/p95/p99 latency and DB statements per request for
+each endpoint, and writes them with the commit, database and cache backend
+to --output as JSON. --baseline compares p95 and queries per request with
+an earlier results file.
+
+Database: DATABASE_URL (SQLite file by default, or local PostgreSQL).
+Cache: local memory by default; --fake-redis runs django-redis against an
+in-process fakeredis server (needs fakeredis[lua] for django-redis's
+INCR script), BENCH_USE_REDIS=1 the configured Redis.
+Counter modes and other settings come from the environment as usual, e.g.
+VOTE_TALLY_WRITE_BEHIND=1. Passwords are hashed for real unless
+--fast-hashing is given.
+"""
+import argparse
+import datetime
+import json
+import random
+import subprocess
+import threading
+import time
+from collections import defaultdict
+from contextlib import ExitStack
+
+from benchmarks import percentile, print_table, setup_django, test_database
+
+PARTIES = ("APC", "PDP", "LP", "NNPP", "APGA", "ADC")
+VIN_ALPHABET = "ABCDEFGHJKLMNPRSTUVWXYZ0123456789"
+ENDPOINTS = ("register", "login", "candidates", "cast", "party-votes")
+
+
+def make_voters(count, seed):
+    from faker import Faker
+
+    fake = Faker("en_US")
+    Faker.seed(seed)
+    rng = random.Random(seed)
+    voters = []
+    for n in range(count):
+        voters.append({
+            "national_id": f"{70000000000 + n:011d}",
+            "vin": "".join(rng.choice(VIN_ALPHABET) for _ in range(12)) + f"{n:05d}",
+            "first_name": fake.first_name(),
+            "last_name": fake.last_name(),
+            "dob": fake.date_of_birth(minimum_age=18, maximum_age=90).isoformat(),
+            "state": fake.state(),
+            "lga": fake.city(),
+            "password": fake.password(length=12),
+        })
+    return voters
+
+
+class Recorder:
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.samples = defaultdict(list)  # endpoint -> [(ms, statements)]
+        self.errors = defaultdict(int)
+        self.local = threading.local()
+
+    def count_statement(self, execute, sql, params, many, context):
+        self.local.statements = getattr(self.local, "statements", 0) + 1
+        return execute(sql, params, many, context)
+
+    def timed(self, endpoint, expected, request):
+        self.local.statements = 0
+        started = time.perf_counter()
+        response = request()
+        elapsed = (time.perf_counter() - started) * 1000
+        with self.lock:
+            if response.status_code not in expected:
+                self.errors[endpoint] += 1
+            else:
+                self.samples[endpoint].append((elapsed, self.local.statements))
+        return response
+
+    def rows(self, seconds):
+        rows = []
+        for endpoint in ENDPOINTS:
+            samples = self.samples.get(endpoint, [])
+            latencies = [ms for ms, _ in samples]
+            rows.append({
+                "endpoint": endpoint,
+                "requests": len(samples),
+                "errors": self.errors.get(endpoint, 0),
+                "req_per_sec": round(len(samples) / seconds, 1) if seconds else 0.0,
+                "p50_ms": round(percentile(latencies, 50), 2),
+                "p95_ms": round(percentile(latencies, 95), 2),
+                "p99_ms": round(percentile(latencies, 99), 2),
+                "queries_per_req": round(sum(q for _, q in samples) / len(samples), 2) if samples else 0.0,
+            })
+        return rows
+
+
+def journey(recorder, voters, election_types, candidates, seed):
+    from django.db import connection, connections
+    from rest_framework.test import APIClient
+
+    rng = random.Random(seed)
+    client = APIClient()
+    try:
+        with connection.execute_wrapper(recorder.count_statement):
+            for voter in voters:
+                recorder.timed("register", {201}, lambda: client.post("/auth/register/", voter, format="json"))
+                login = recorder.timed("login", {200}, lambda: client.post(
+                    "/auth/login/", {"national_id": voter["national_id"], "password": voter["password"]}, format="json"
+                ))
+                if login.status_code != 200:
+                    continue
+                client.credentials(HTTP_AUTHORIZATION=f"Bearer {login.json()['access']}")
+                for election_type in election_types:
+                    recorder.timed("candidates", {200}, lambda: client.get(f"/vote/candidates/{election_type}/"))
+                    choice = rng.choice(candidates[election_type])
+                    recorder.timed("cast", {200, 201}, lambda: client.post(
+                        "/vote/cast/", {"candidate_id": choice}, format="json"
+                    ))
+                    recorder.timed("party-votes", {200}, lambda: client.get(f"/vote/party-votes/{election_type}/"))
+                client.credentials()
+    finally:
+        connections.close_all()
+
+
+def fake_redis_caches():
+    import fakeredis
+
+    return {
+        "default": {
+            "BACKEND": "django_redis.cache.RedisCache",
+            "LOCATION": "redis://fakeredis:6379/1",
+            "OPTIONS": {
+                "CLIENT_CLASS": "django_redis.client.DefaultClient",
+                "CONNECTION_POOL_KWARGS": {
+                    "connection_class": fakeredis.FakeConnection,
+                    "server": fakeredis.FakeServer(),
+                },
+            },
+        }
+    }
+
+
+def current_commit():
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True, check=True
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def compare(rows, baseline_path):
+    with open(baseline_path) as f:
+        baseline = {row["endpoint"]: row for row in json.load(f)["endpoints"]}
+    changes = []
+    for row in rows:
+        before = baseline.get(row["endpoint"])
+        if not before:
+            continue
+        changes.append({
+            "endpoint": row["endpoint"],
+            "p95_before": before["p95_ms"],
+            "p95_after": row["p95_ms"],
+            "p95_change": f"{(row['p95_ms'] - before['p95_ms']) / before['p95_ms'] * 100:+.1f}%" if before["p95_ms"] else "n/a",
+            "queries_before": before["queries_per_req"],
+            "queries_after": row["queries_per_req"],
+        })
+    return changes
+
+
+def run(options):
+    from django.conf import settings
+    from django.db import connection
+
+    from vote.models import ELECTION_TYPES, Candidate
+
+    election_types = [value for value, _ in ELECTION_TYPES]
+    candidates = {}
+    for election_type in election_types:
+        candidates[election_type] = [
+            Candidate.objects.create(
+                election_type=election_type, name=f"{party} {election_type} candidate", party=party,
+                party_image=f"{party.lower()}.png", age=55, image="candidate.png",
+            ).id
+            for party in PARTIES
+        ]
+
+    voters = make_voters(options.voters, options.seed)
+    shares = [voters[n::options.workers] for n in range(options.workers)]
+    recorder = Recorder()
+
+    threads = [
+        threading.Thread(target=journey, args=(recorder, share, election_types, candidates, options.seed + n))
+        for n, share in enumerate(shares)
+    ]
+    started = time.perf_counter()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    seconds = time.perf_counter() - started
+
+    rows = recorder.rows(seconds)
+    print_table(rows)
+
+    results = {
+        "commit": current_commit(),
+        "recorded_at": datetime.datetime.now(datetime.timezone.utc).isoformat(timespec="seconds"),
+        "database": connection.vendor,
+        "cache": settings.CACHES["default"]["BACKEND"],
+        "voters": options.voters,
+        "workers": options.workers,
+        "seed": options.seed,
+        "seconds": round(seconds, 3),
+        "endpoints": rows,
+    }
+    with open(options.output, "w") as f:
+        json.dump(results, f, indent=2)
+    print(f"\nWrote {options.output}")
+
+    if options.baseline:
+        print()
+        print_table(compare(rows, options.baseline))
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--voters", type=int, default=200)
+    parser.add_argument("--workers", type=int, default=8)
+    parser.add_argument("--seed", type=int, default=2027)
+    parser.add_argument("--fake-redis", action="store_true", help="django-redis on an in-process fakeredis server")
+    parser.add_argument("--fast-hashing", action="store_true", help="MD5 passwords, to load everything but PBKDF2")
+    parser.add_argument("--output", default="election_day_results.json")
+    parser.add_argument("--baseline", help="earlier results file to compare with")
+    options = parser.parse_args()
+
+    setup_django()
+    from django.test.utils import override_settings
+
+    with test_database(), ExitStack() as stack:
+        if options.fake_redis:
+            stack.enter_context(override_settings(CACHES=fake_redis_caches()))
+        if options.fast_hashing:
+            # In-process: spawned pool workers wouldn't see the override
+            stack.enter_context(override_settings(
+                PASSWORD_HASHERS=["django.contrib.auth.hashers.MD5PasswordHasher"],
+                PASSWORD_POOL_WORKERS=0,
+            ))
+        run(options)
@@ -0,0 +1,105 @@
+"""
+List encoding: DRF serializer + JSONRenderer versus vote.fast_rows
+(values_list rows + dumps), for candidate and party-vote lists.
+
+    python -m benchmarks.bench_fast_rows --sizes 10 1000 50000 --repeat 5
+
+Times the whole build (query, rows, encoding) and checks that both give the
+same bytes. Reports which JSON encoder fast_rows used.
+"""
+import argparse
+import statistics
+import time
+
+from benchmarks import print_table, setup_django, test_database
+
+
+def timed(func, repeat):
+    timings = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        result = func()
+        timings.append((time.perf_counter() - started) * 1000)
+    return statistics.median(timings), result
+
+
+def run(sizes, repeat):
+    from rest_framework.renderers import JSONRenderer
+
+    from vote import fast_rows
+    from vote.counters import with_live_totals
+    from vote.models import Candidate, PartyVoteCount
+    from vote.serializers import CandidateSerializer, PartyVoteCountSerializer
+
+    largest = max(sizes)
+    url = "http://res.cloudinary.com/demo/image/upload/{}.png"
+    Candidate.objects.bulk_create(
+        [
+            Candidate(
+                election_type="presidential", name=f"Candidate {n:06d}", party=f"P{n:06d}", age=40 + n % 30,
+                image=f"c{n}", party_image=f"p{n}", image_url=url.format(f"c{n}"),
+                party_image_url=url.format(f"p{n}"), image_thumb_url=url.format(f"t/c{n}"),
+                party_image_thumb_url=url.format(f"t/p{n}"),
+            )
+            for n in range(largest)
+        ],
+        batch_size=5000,
+    )
+    PartyVoteCount.objects.bulk_create(
+        [
+            PartyVoteCount(
+                election_type="presidential", party=f"P{n:06d}", vote_count=n,
+                party_image=f"p{n}", party_image_url=url.format(f"p{n}"),
+            )
+            for n in range(largest)
+        ],
+        batch_size=5000,
+    )
+
+    renderer = JSONRenderer()
+    context = {"party_votes": {}, "user_votes": set()}
+    rows = []
+    for size in sizes:
+        # Fresh querysets per call, so neither side reuses a result cache
+        def candidates():
+            return Candidate.objects.order_by("name")[:size]
+
+        def parties():
+            queryset = with_live_totals(PartyVoteCount.objects.all(), "presidential")
+            return queryset.order_by("-live_votes", "party")[:size]
+
+        cases = {
+            "candidates": (
+                lambda: renderer.render(CandidateSerializer(candidates(), many=True, context=context).data),
+                lambda: fast_rows.dumps(fast_rows.candidate_rows(candidates(), {})),
+            ),
+            "party-votes": (
+                lambda: renderer.render(PartyVoteCountSerializer(parties(), many=True).data),
+                lambda: fast_rows.dumps(fast_rows.party_vote_rows(parties())),
+            ),
+        }
+        for name, (slow, fast) in cases.items():
+            slow_ms, slow_bytes = timed(slow, repeat)
+            fast_ms, fast_bytes = timed(fast, repeat)
+            assert slow_bytes == fast_bytes, f"{name} x{size}: fast path output differs"
+            rows.append({
+                "list": name,
+                "rows": size,
+                "serializer_ms": round(slow_ms, 2),
+                "fast_ms": round(fast_ms, 2),
+                "speedup": f"{slow_ms / fast_ms:.1f}x",
+            })
+
+    print(f"encoder: {'orjson' if fast_rows.orjson else 'json (stdlib)'}")
+    print_table(rows)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--sizes", type=int, nargs="+", default=[10, 1000, 50000])
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    setup_django()
+    with test_database():
+        run(args.sizes, args.repeat)
@@ -0,0 +1,92 @@
+"""
+Read latency during a login storm, with password hashing in-process versus
+in the password pool.
+
+    python -m benchmarks.bench_login_storm --logins 8 --reads 200
+
+`logins` threads log in back to back (real PBKDF2) while the main thread
+polls the party-votes endpoint; all share one process, as in a threaded
+worker. In-process hashing holds the GIL, so reads queue behind it; with
+the pool the login threads only wait on other processes.
+"""
+import argparse
+import os
+import threading
+import time
+
+from benchmarks import percentile, print_table, setup_django, test_database
+
+
+def run(logins, reads):
+    from django.test.utils import override_settings
+    from rest_framework.test import APIClient
+
+    from accounts.models import User
+    from vote.counters import increment_party_votes
+    from vote.models import Candidate
+
+    Candidate.objects.create(
+        election_type="presidential", name="Candidate", party="APC",
+        party_image="apc.png", age=50, image="candidate.png",
+    )
+    increment_party_votes("presidential", "APC", "apc.png", amount=100)
+    users = [
+        User.objects.create_user(
+            national_id=f"{n:011d}", password="secret-pass", vin=f"{n:017d}", first_name="Bench", last_name=str(n)
+        )
+        for n in range(1, logins + 1)
+    ]
+
+    rows = []
+    for label, workers in (("in-process", 0), ("pool", os.cpu_count() or 1)):
+        with override_settings(PASSWORD_POOL_WORKERS=workers, PASSWORD_POOL_QUEUE_DEPTH=logins):
+            stop = threading.Event()
+            counts = {"ok": 0, "rejected": 0}
+
+            def storm(user):
+                client = APIClient()
+                while not stop.is_set():
+                    response = client.post(
+                        "/auth/login/", {"national_id": user.national_id, "password": "secret-pass"}, format="json"
+                    )
+                    counts["ok" if response.status_code == 200 else "rejected"] += 1
+
+            # Warm the pool and caches before timing
+            APIClient().post("/auth/login/", {"national_id": users[0].national_id, "password": "secret-pass"}, format="json")
+            client = APIClient()
+            client.get("/vote/party-votes/presidential/")
+
+            threads = [threading.Thread(target=storm, args=(user,)) for user in users]
+            for thread in threads:
+                thread.start()
+            samples = []
+            started = time.perf_counter()
+            for _ in range(reads):
+                request_started = time.perf_counter()
+                client.get("/vote/party-votes/presidential/")
+                samples.append((time.perf_counter() - request_started) * 1000)
+            elapsed = time.perf_counter() - started
+            stop.set()
+            for thread in threads:
+                thread.join()
+
+            rows.append({
+                "hashing": label,
+                "logins_per_sec": round(counts["ok"] / elapsed, 1),
+                "rejected": counts["rejected"],
+                "read_p50_ms": round(percentile(samples, 50), 2),
+                "read_p99_ms": round(percentile(samples, 99), 2),
+            })
+
+    print_table(rows)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--logins", type=int, default=8, help="concurrent login threads")
+    parser.add_argument("--reads", type=int, default=200)
+    args = parser.parse_args()
+
+    setup_django()
+    with test_database():
+        run(args.logins, args.reads)
@@ -0,0 +1,74 @@
+"""
+Serializer time per 1,000 candidate rows: building Cloudinary URLs per row
+(the old get_image_url/get_party_image_url) versus reading the precomputed
+URL columns.
+
+    python -m benchmarks.bench_media_urls --rows 1000 --repeat 20
+
+Rows are unsaved model instances, so only serialization is timed.
+"""
+import argparse
+import statistics
+import time
+
+from benchmarks import print_table, setup_django
+
+
+def run(rows, repeat):
+    from vote.models import Candidate
+    from vote.serializers import PLACEHOLDER_IMAGE, CandidateSerializer
+
+    class URLBuildingSerializer(CandidateSerializer):
+        # The serializer as it was: a Cloudinary URL built per field per row
+        def get_image_url(self, obj):
+            return obj.image.url if obj.image else PLACEHOLDER_IMAGE
+
+        def get_image_thumb_url(self, obj):
+            return obj.image.build_url(width=160, height=160, crop="fill", gravity="auto") if obj.image else PLACEHOLDER_IMAGE
+
+        def get_party_image_url(self, obj):
+            return obj.party_image.url if obj.party_image else PLACEHOLDER_IMAGE
+
+        def get_party_image_thumb_url(self, obj):
+            return obj.party_image.build_url(width=160, height=160, crop="fill", gravity="auto") if obj.party_image else PLACEHOLDER_IMAGE
+
+    image_field = Candidate._meta.get_field("image")
+    candidates = []
+    for n in range(rows):
+        # Resources, as rows loaded from the database would have
+        candidate = Candidate(
+            id=n + 1, election_type="presidential", name=f"Candidate {n}", party=f"P{n % 18:02d}",
+            party_image=image_field.to_python(f"parties/p{n % 18:02d}.png"), age=50,
+            image=image_field.to_python(f"candidates/c{n}.jpg"),
+        )
+        candidate.refresh_media_urls()
+        candidates.append(candidate)
+    context = {"user_votes": set(), "party_votes": {}}
+
+    result = []
+    for label, serializer_class in (("build per row", URLBuildingSerializer), ("precomputed", CandidateSerializer)):
+        timings = []
+        for _ in range(repeat):
+            started = time.perf_counter()
+            data = serializer_class(candidates, many=True, context=context).data
+            timings.append((time.perf_counter() - started) * 1000)
+        result.append({
+            "urls": label,
+            "ms_per_1000_rows": round(statistics.median(timings) * 1000 / rows, 2),
+            "min_ms": round(min(timings) * 1000 / rows, 2),
+        })
+        if label == "precomputed":
+            reference = URLBuildingSerializer(candidates, many=True, context=context).data
+            assert data == reference, "precomputed URLs differ from the built ones"
+
+    print_table(result)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--rows", type=int, default=1000)
+    parser.add_argument("--repeat", type=int, default=20)
+    args = parser.parse_args()
+
+    setup_django()
+    run(args.rows, args.repeat)
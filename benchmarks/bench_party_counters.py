@@ -0,0 +1,76 @@
+"""
+Cast throughput with a single PartyVoteCount row per party versus sharded
+counters, at 1, 8 and 64 concurrent writers.
+
+    DATABASE_URL=postgres://... python -m benchmarks.bench_party_counters
+
+SQLite serializes all writers on one database lock, so only PostgreSQL shows
+the row-contention difference sharding is meant to remove.
+"""
+import uuid
+
+from benchmarks import print_table, run_concurrent, setup_django, test_database
+
+WRITERS = (1, 8, 64)
+OPS_PER_WRITER = 50
+SHARD_SETTINGS = (0, 16)
+# All votes go to two parties, as on election day when the leaders take most
+# of the traffic.
+PARTIES = ("APC", "PDP")
+
+
+def make_voters(count):
+    from accounts.models import User
+
+    users = [
+        User(
+            national_id=f"{n:011d}",
+            vin=uuid.uuid4().hex[:17].upper(),
+            first_name="Bench",
+            last_name=str(n),
+        )
+        for n in range(count)
+    ]
+    User.objects.bulk_create(users, batch_size=1000)
+    return list(User.objects.order_by("national_id").values_list("id", flat=True))
+
+
+def run():
+    from django.test.utils import override_settings
+
+    from accounts.models import User
+    from vote.services import cast_vote
+    from vote.models import Candidate, PartyVoteCount, PartyVoteShard, Vote
+
+    candidates = [
+        Candidate.objects.create(
+            election_type="presidential", name=f"{party} candidate", party=party,
+            party_image=f"{party.lower()}.png", age=60, image="candidate.png",
+        )
+        for party in PARTIES
+    ]
+    user_ids = make_voters(max(WRITERS) * OPS_PER_WRITER)
+
+    rows = []
+    for shards in SHARD_SETTINGS:
+        for writers in WRITERS:
+            Vote.objects.all().delete()
+            PartyVoteCount.objects.all().delete()
+            PartyVoteShard.objects.all().delete()
+
+            def cast(worker, i):
+                user_id = user_ids[worker * OPS_PER_WRITER + i]
+                candidate = candidates[(worker + i) % len(candidates)]
+                cast_vote(User(id=user_id), candidate)
+
+            with override_settings(VOTE_COUNTER_SHARDS=shards):
+                result = run_concurrent(cast, writers, OPS_PER_WRITER)
+            rows.append({"shards": shards, **result})
+
+    print_table(rows)
+
+
+if __name__ == "__main__":
+    setup_django()
+    with test_database():
+        run()
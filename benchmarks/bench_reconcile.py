@@ -0,0 +1,86 @@
+"""
+Reconciliation time over a seeded Vote table: one GROUP BY over every vote
+versus vote.reconcile's chunked count at 1, 2, 4 and 8 worker threads.
+
+    DATABASE_URL=postgres://... python -m benchmarks.bench_reconcile --votes 2000000
+
+Seeding goes through bulk_create, so large runs spend most of their time
+there. SQLite answers one query at a time whatever the thread count; use
+PostgreSQL to see the chunks run in parallel.
+"""
+import argparse
+import time
+import uuid
+
+from benchmarks import print_table, setup_django, test_database
+
+WORKERS = (1, 2, 4, 8)
+PARTIES = ("APC", "PDP", "LP", "NNPP")
+
+
+def seed(votes):
+    from accounts.models import User
+    from vote.models import Candidate, PartyVoteCount, Vote
+
+    candidates = [
+        Candidate.objects.create(
+            election_type="presidential", name=party, party=party, age=60, image="c", party_image="p"
+        )
+        for party in PARTIES
+    ]
+    batch = 20_000
+    for start in range(0, votes, batch):
+        users = [
+            User(national_id=f"{n:011d}", vin=uuid.uuid4().hex[:17].upper(), first_name="Bench", last_name=str(n))
+            for n in range(start, min(start + batch, votes))
+        ]
+        User.objects.bulk_create(users, batch_size=5000)
+        Vote.objects.bulk_create(
+            [
+                Vote(user_id=user.id, candidate=candidates[n % len(candidates)], election_type="presidential")
+                for n, user in enumerate(users, start)
+            ],
+            batch_size=5000,
+        )
+    for n, party in enumerate(PARTIES):
+        # One counter off by a few votes so every run has drift to find
+        expected = votes // len(PARTIES) + (1 if n < votes % len(PARTIES) else 0)
+        PartyVoteCount.objects.create(election_type="presidential", party=party, vote_count=expected + (3 if n == 0 else 0))
+
+
+def run(votes, chunk_size):
+    from django.db.models import Count
+
+    from vote.models import Vote
+    from vote.reconcile import reconcile
+
+    started = time.perf_counter()
+    seed(votes)
+    print(f"Seeded {votes} votes in {time.perf_counter() - started:.1f}s")
+
+    rows = []
+    started = time.perf_counter()
+    list(Vote.objects.values("election_type", "candidate__party").annotate(total=Count("id")).order_by())
+    rows.append({"method": "single GROUP BY", "workers": 1, "chunks": 1, "seconds": round(time.perf_counter() - started, 2)})
+
+    for workers in WORKERS:
+        report = reconcile(workers=workers, chunk_size=chunk_size)
+        rows.append({
+            "method": "chunked",
+            "workers": workers,
+            "chunks": report.chunks,
+            "seconds": round(report.seconds, 2),
+            "drift": len(report.drift),
+        })
+    print_table(rows, ["method", "workers", "chunks", "seconds", "drift"])
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--votes", type=int, default=200_000)
+    parser.add_argument("--chunk-size", type=int, default=50_000)
+    args = parser.parse_args()
+
+    setup_django()
+    with test_database():
+        run(args.votes, args.chunk_size)
@@ -0,0 +1,60 @@
+"""
+Steady-state dashboard polling of the results endpoints with and without
+If-None-Match: bytes sent and time per poll.
+
+    python -m benchmarks.bench_results_polling --polls 2000
+"""
+import argparse
+import time
+
+from benchmarks import print_table, setup_django, test_database
+
+PARTIES = 18
+
+
+def run(polls):
+    from rest_framework.test import APIClient
+
+    from accounts.models import User
+    from vote.counters import increment_party_votes
+    from vote.models import Candidate
+
+    for n in range(PARTIES):
+        party = f"P{n:02d}"
+        Candidate.objects.create(
+            election_type="presidential", name=f"Candidate {n}", party=party,
+            party_image=f"{party}.png", age=50, image=f"candidate-{n}.png",
+        )
+        increment_party_votes("presidential", party, f"{party}.png", amount=1000 + n)
+
+    voter = User.objects.create(national_id="00000000001", vin="0" * 17)
+    client = APIClient()
+    client.force_authenticate(voter)
+
+    rows = []
+    for url in ("/vote/party-votes/presidential/", "/vote/candidates/presidential/"):
+        etag = client.get(url)["ETag"]
+        for mode, headers in (("full", {}), ("if-none-match", {"HTTP_IF_NONE_MATCH": etag})):
+            sent = 0
+            started = time.perf_counter()
+            for _ in range(polls):
+                sent += len(client.get(url, **headers).content)
+            elapsed = time.perf_counter() - started
+            rows.append({
+                "endpoint": url,
+                "mode": mode,
+                "bytes_per_poll": sent // polls,
+                "us_per_poll": round(elapsed / polls * 1e6, 1),
+            })
+
+    print_table(rows)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--polls", type=int, default=2000)
+    args = parser.parse_args()
+
+    setup_django()
+    with test_database():
+        run(args.polls)
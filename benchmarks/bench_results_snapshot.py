@@ -0,0 +1,73 @@
+"""
+Party-votes latency: the serializer path (queryset + filters + serializer,
+cached per query string until the next vote) versus the materialized
+snapshot (pre-encoded bytes).
+
+    python -m benchmarks.bench_results_snapshot --requests 1000
+
+"after vote" requests follow a fresh vote, as on election day. For the
+snapshot, the broadcaster's refresh runs between the vote and the request,
+outside the timed section, as it would in its own process.
+"""
+import argparse
+import time
+
+from benchmarks import percentile, print_table, setup_django, test_database
+
+PARTIES = 18
+
+
+def run(requests):
+    from rest_framework.test import APIClient
+
+    from vote import snapshot
+    from vote.cache_keys import PARTY_VOTES, generation, invalidate_party_votes
+    from vote.counters import increment_party_votes
+    from vote.models import Candidate
+
+    for n in range(PARTIES):
+        party = f"P{n:02d}"
+        Candidate.objects.create(
+            election_type="presidential", name=f"Candidate {n}", party=party,
+            party_image=f"{party}.png", age=50, image=f"candidate-{n}.png",
+        )
+        increment_party_votes("presidential", party, f"{party}.png", amount=1000 + n)
+
+    client = APIClient()
+    paths = {
+        "serializer": "/vote/party-votes/presidential/?ordering=-vote_count",
+        "snapshot": "/vote/party-votes/presidential/",
+    }
+
+    rows = []
+    for scenario in ("steady", "after vote"):
+        for name, url in paths.items():
+            samples = []
+            for i in range(requests):
+                if scenario == "after vote":
+                    increment_party_votes("presidential", f"P{i % PARTIES:02d}", None)
+                    invalidate_party_votes("presidential")
+                    if name == "snapshot":
+                        snapshot.refresh("presidential", version=generation(PARTY_VOTES, "presidential"))
+                started = time.perf_counter()
+                client.get(url)
+                samples.append((time.perf_counter() - started) * 1000)
+            rows.append({
+                "scenario": scenario,
+                "path": name,
+                "p50_ms": round(percentile(samples, 50), 3),
+                "p95_ms": round(percentile(samples, 95), 3),
+                "p99_ms": round(percentile(samples, 99), 3),
+            })
+
+    print_table(rows)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--requests", type=int, default=1000)
+    args = parser.parse_args()
+
+    setup_django()
+    with test_database():
+        run(args.requests)
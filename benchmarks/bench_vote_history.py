@@ -0,0 +1,77 @@
+"""
+Turnout-curve and results-as-of query times over per-minute VoteBuckets.
+
+    python -m benchmarks.bench_vote_history --votes 50000000 --hours 12 --parties 18
+
+Bucket rows scale with minutes x parties, not with votes, so the buckets
+for --votes are seeded directly (spread evenly over the day) rather than
+by casting that many votes.
+"""
+import argparse
+import statistics
+import time
+from datetime import datetime, timedelta, timezone
+
+from benchmarks import print_table, setup_django, test_database
+
+
+def seed(votes, hours, parties):
+    from vote.models import VoteBucket
+
+    minutes = hours * 60
+    per_bucket, extra = divmod(votes, minutes * parties)
+    opening = datetime(2027, 2, 25, 8, tzinfo=timezone.utc)
+    VoteBucket.objects.bulk_create(
+        [
+            VoteBucket(
+                election_type="presidential", party=f"P{party:02d}", minute=opening + timedelta(minutes=minute),
+                vote_count=per_bucket + (1 if minute * parties + party < extra else 0),
+            )
+            for minute in range(minutes)
+            for party in range(parties)
+        ],
+        batch_size=5000,
+    )
+    return opening, minutes
+
+
+def timed(func, repeat):
+    timings = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        func()
+        timings.append((time.perf_counter() - started) * 1000)
+    return round(statistics.median(timings), 2), round(max(timings), 2)
+
+
+def run(votes, hours, parties, repeat):
+    from vote import history
+
+    opening, minutes = seed(votes, hours, parties)
+    midday = opening + timedelta(minutes=minutes // 2)
+    cases = {
+        "turnout, 1 min": lambda: history.turnout("presidential"),
+        "turnout, 15 min": lambda: history.turnout("presidential", interval=15),
+        "turnout, last hour": lambda: history.turnout("presidential", since=opening + timedelta(hours=hours - 1)),
+        "results at midday": lambda: history.results_at("presidential", midday),
+        "results at close": lambda: history.results_at("presidential", opening + timedelta(hours=hours)),
+    }
+    rows = []
+    for name, func in cases.items():
+        median, worst = timed(func, repeat)
+        rows.append({"query": name, "buckets": minutes * parties, "median_ms": median, "max_ms": worst})
+    assert history.turnout("presidential")["total_votes"] == votes
+    print_table(rows)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--votes", type=int, default=50_000_000)
+    parser.add_argument("--hours", type=int, default=12)
+    parser.add_argument("--parties", type=int, default=18)
+    parser.add_argument("--repeat", type=int, default=20)
+    args = parser.parse_args()
+
+    setup_django()
+    with test_database():
+        run(args.votes, args.hours, args.parties, args.repeat)
@@ -0,0 +1,126 @@
+"""
+vote_vote as one table versus partitioned by election type
+(vote/partitioning.py): bulk insert throughput, per-election party
+aggregation and a time-range count served by the BRIN index.
+
+    DATABASE_URL=postgres://... python -m benchmarks.bench_vote_partitioning --rows 10000000
+
+Voters each vote in every election, so --rows votes need rows/3 voters;
+seeding them is not timed. PostgreSQL only: on other databases there is
+nothing to partition and the benchmark exits.
+"""
+import argparse
+import time
+import uuid
+
+from benchmarks import print_table, setup_django, test_database
+
+PARTIES = ("APC", "PDP", "LP", "NNPP")
+BATCH = 10_000
+
+
+def seed_voters(count):
+    from accounts.models import User
+
+    for start in range(0, count, BATCH):
+        User.objects.bulk_create(
+            [
+                User(national_id=f"{n:011d}", vin=uuid.uuid4().hex[:17].upper(), first_name="Bench", last_name=str(n))
+                for n in range(start, min(start + BATCH, count))
+            ],
+            batch_size=BATCH,
+        )
+    return list(User.objects.values_list("id", flat=True))
+
+
+def insert_votes(voters, candidates, rows):
+    from vote.models import Vote
+
+    election_types = list(candidates)
+    inserted = 0
+    started = time.perf_counter()
+    while inserted < rows:
+        batch = []
+        for n in range(inserted, min(inserted + BATCH, rows)):
+            election_type = election_types[n % len(election_types)]
+            parties = candidates[election_type]
+            batch.append(Vote(
+                user_id=voters[n // len(election_types)],
+                candidate_id=parties[n % len(parties)],
+                election_type=election_type,
+            ))
+        Vote.objects.bulk_create(batch, batch_size=BATCH)
+        inserted += len(batch)
+    return time.perf_counter() - started
+
+
+def timed(func, repeat=3):
+    best = None
+    for _ in range(repeat):
+        started = time.perf_counter()
+        func()
+        elapsed = (time.perf_counter() - started) * 1000
+        best = elapsed if best is None else min(best, elapsed)
+    return round(best, 1)
+
+
+def run(rows):
+    from django.db import connection
+    from django.db.models import Count, Max, Min
+
+    from vote import partitioning
+    from vote.models import ELECTION_TYPES, Candidate, Vote
+
+    if not partitioning.supported(connection):
+        print(f"Partitioning needs PostgreSQL; DATABASE_URL points at {connection.vendor}.")
+        return
+
+    candidates = {
+        election_type: [
+            Candidate.objects.create(
+                election_type=election_type, name=f"{party} {election_type}", party=party, age=60,
+                image="c", party_image="p",
+            ).id
+            for party in PARTIES
+        ]
+        for election_type, _ in ELECTION_TYPES
+    }
+    voters = seed_voters(-(-rows // len(candidates)))
+
+    results = []
+    for layout in ("single table", "partitioned"):
+        with connection.cursor() as cursor:
+            cursor.execute(f'TRUNCATE "{partitioning.TABLE}"')
+        if layout == "partitioned":
+            partitioning.partition(connection)
+        else:
+            partitioning.unpartition(connection)
+            partitioning.add_brin_index(connection)
+
+        seconds = insert_votes(voters, candidates, rows)
+        with connection.cursor() as cursor:
+            cursor.execute(f'ANALYZE "{partitioning.TABLE}"')
+
+        span = Vote.objects.aggregate(first=Min("timestamp"), last=Max("timestamp"))
+        window_start = span["last"] - (span["last"] - span["first"]) / 10
+
+        row = {"layout": layout, "rows": rows, "insert_rows_per_sec": round(rows / seconds)}
+        for election_type, _ in ELECTION_TYPES:
+            row[f"{election_type}_agg_ms"] = timed(lambda: list(
+                Vote.objects.filter(election_type=election_type)
+                .values("candidate_id").annotate(total=Count("id")).order_by()
+            ))
+        row["last_10pct_count_ms"] = timed(lambda: Vote.objects.filter(timestamp__gte=window_start).count())
+        results.append(row)
+
+    print_table(results)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rows", type=int, default=1_000_000)
+    args = parser.parse_args()
+
+    setup_django()
+    with test_database():
+        run(args.rows)
@@ -0,0 +1,214 @@
+"""
+Admission control for the write-heavy endpoints (cast, login).
+
+Each endpoint class in ADMISSION_CONTROL gets:
+
+* a global token bucket (``rate`` requests/second, bursting to ``burst``);
+* a per-client bucket (``client_rate``/``client_burst``), keyed by the
+  authenticated user or, before login, the client address. Behind a
+  proxy, REMOTE_ADDR is the proxy's, so the address is taken from
+  X-Forwarded-For, ADMISSION_TRUSTED_PROXIES hops from the right (the
+  entries further left are whatever the client sent);
+* a cap on requests in flight at once (``concurrency``), so a spike can't
+  hold every database connection and starve the read endpoints.
+
+All three are checked and charged in one Lua script, so concurrent workers
+can't overshoot a limit. A request that doesn't fit is turned away before
+it does any work: 429 with Retry-After, which is the time until a token
+frees up for rate limits and one second for the concurrency cap. In-flight
+slots are leased, so a worker that dies mid-request frees its slot after
+``lease`` seconds.
+
+Admission needs the django-redis cache. Without it, or if Redis errors,
+requests are let through: a limiter outage shouldn't close the polls.
+"""
+import logging
+import math
+import uuid
+
+from django.conf import settings
+from rest_framework.exceptions import Throttled
+
+from . import metrics
+
+logger = logging.getLogger(__name__)
+
+admission_requests = metrics.Counter(
+    "admission_requests_total",
+    "Admission decisions by endpoint class and result (admitted/rate_limited/overloaded/error).",
+    ("endpoint", "result"),
+)
+
+ADMITTED, RATE_LIMITED, OVERLOADED = 1, 0, 2
+
+# KEYS: global bucket, client bucket, in-flight set
+# ARGV: rate, burst, client_rate, client_burst, concurrency, lease, ticket
+# Returns {decision, seconds to wait (as a string; Lua numbers are truncated)}
+# "Now" is Redis's clock, so app servers with skewed clocks share buckets
+# and leases consistently.
+ADMIT_SCRIPT = """
+local clock = redis.call('TIME')
+local now = tonumber(clock[1]) + tonumber(clock[2]) / 1000000
+local concurrency, lease = tonumber(ARGV[5]), tonumber(ARGV[6])
+
+local function refill(key, rate, burst)
+    if rate <= 0 then return nil, 0 end
+    local state = redis.call('HMGET', key, 'tokens', 'ts')
+    local tokens = tonumber(state[1]) or burst
+    local elapsed = math.max(0, now - (tonumber(state[2]) or now))
+    tokens = math.min(burst, tokens + elapsed * rate)
+    if tokens < 1 then return tokens, (1 - tokens) / rate end
+    return tokens, 0
+end
+
+local function charge(key, tokens, rate, burst)
+    if tokens == nil then return end
+    redis.call('HSET', key, 'tokens', tokens - 1, 'ts', now)
+    redis.call('PEXPIRE', key, math.ceil(burst / rate * 1000) + 1000)
+end
+
+local rate, burst = tonumber(ARGV[1]), tonumber(ARGV[2])
+local client_rate, client_burst = tonumber(ARGV[3]), tonumber(ARGV[4])
+local tokens, wait = refill(KEYS[1], rate, burst)
+local client_tokens, client_wait = refill(KEYS[2], client_rate, client_burst)
+wait = math.max(wait, client_wait)
+if wait > 0 then return {0, tostring(wait)} end
+
+if concurrency > 0 then
+    redis.call('ZREMRANGEBYSCORE', KEYS[3], '-inf', now - lease)
+    if redis.call('ZCARD', KEYS[3]) >= concurrency then return {2, '1'} end
+    redis.call('ZADD', KEYS[3], now, ARGV[7])
+    redis.call('PEXPIRE', KEYS[3], math.ceil(lease * 1000))
+end
+charge(KEYS[1], tokens, rate, burst)
+charge(KEYS[2], client_tokens, client_rate, client_burst)
+return {1, '0'}
+"""
+
+DEFAULT_LIMITS = {"rate": 0, "burst": 1, "client_rate": 0, "client_burst": 1, "concurrency": 0, "lease": 30}
+
+
+class Overloaded(Throttled):
+    default_detail = "The service is busy; try again shortly."
+    default_code = "overloaded"
+
+
+def get_redis():
+    from django_redis import get_redis_connection
+
+    return get_redis_connection("default")
+
+
+def redis_enabled():
+    try:
+        from django_redis.cache import RedisCache
+    except ImportError:
+        return False
+    from django.core.cache import caches
+
+    return isinstance(caches["default"], RedisCache)
+
+
+def limits(endpoint):
+    configured = getattr(settings, "ADMISSION_CONTROL", {}).get(endpoint)
+    return {**DEFAULT_LIMITS, **configured} if configured else None
+
+
+def enabled():
+    return getattr(settings, "ADMISSION_CONTROL_ENABLED", True) and redis_enabled()
+
+
+def client_address(request):
+    address = request.META.get("REMOTE_ADDR", "")
+    proxies = getattr(settings, "ADMISSION_TRUSTED_PROXIES", 0)
+    forwarded = request.META.get("HTTP_X_FORWARDED_FOR", "")
+    hops = [hop.strip() for hop in forwarded.split(",") if hop.strip()]
+    if proxies and hops:
+        # Each trusted proxy appended the address it saw; the outermost
+        # one's entry is the client as far as we can trust
+        address = hops[-min(proxies, len(hops))]
+    return address
+
+
+def client_id(request):
+    user = getattr(request, "user", None)
+    if user is not None and user.is_authenticated:
+        return f"user:{user.pk}"
+    return f"addr:{client_address(request)}"
+
+
+class Ticket:
+    def __init__(self, endpoint, token, redis):
+        self.endpoint = endpoint
+        self.token = token
+        self.redis = redis
+
+    def release(self):
+        try:
+            self.redis.zrem(_key(self.endpoint, "inflight"), self.token)
+        except Exception:
+            # The lease expires the slot anyway
+            logger.warning("Could not release %s admission slot", self.endpoint, exc_info=True)
+
+
+def _key(endpoint, part):
+    return f"admission:{endpoint}:{part}"
+
+
+def admit(endpoint, client, redis=None):
+    """
+    Admits one request to ``endpoint`` for ``client`` or raises Overloaded.
+    Returns a Ticket to release() when the request is done, or None if the
+    endpoint isn't limited (or the limiter is unavailable).
+    """
+    config = limits(endpoint)
+    if config is None or (redis is None and not enabled()):
+        return None
+
+    token = uuid.uuid4().hex
+    try:
+        redis = redis or get_redis()
+        decision, wait = redis.eval(
+            ADMIT_SCRIPT, 3,
+            _key(endpoint, "bucket"), _key(endpoint, f"client:{client}"), _key(endpoint, "inflight"),
+            config["rate"], config["burst"], config["client_rate"], config["client_burst"],
+            config["concurrency"], config["lease"], token,
+        )
+    except Exception:
+        logger.warning("Admission control unavailable for %s; letting request through", endpoint, exc_info=True)
+        admission_requests.inc(endpoint, "error")
+        return None
+
+    if int(decision) == ADMITTED:
+        admission_requests.inc(endpoint, "admitted")
+        return Ticket(endpoint, token, redis) if config["concurrency"] else None
+    admission_requests.inc(endpoint, "rate_limited" if int(decision) == RATE_LIMITED else "overloaded")
+    raise Overloaded(wait=max(1, math.ceil(float(wait))))
+
+
+class AdmissionControlMixin:
+    """
+    For DRF views: admits each request to ``admission_endpoint`` after
+    authentication (so per-client limits can key on the user) and before
+    the handler runs, and frees its slot once the response is built.
+    """
+    admission_endpoint = None
+
+    def initial(self, request, *args, **kwargs):
+        super().initial(request, *args, **kwargs)
+        if request.method not in ("GET", "HEAD", "OPTIONS") and not self.is_replay(request):
+            self.admission_ticket = admit(self.admission_endpoint, client_id(request))
+
+    def is_replay(self, request):
+        """
+        True for a request that will only get a stored response back (an
+        idempotent retry), which is neither limited nor charged.
+        """
+        return False
+
+    def finalize_response(self, request, response, *args, **kwargs):
+        ticket = getattr(self, "admission_ticket", None)
+        if ticket is not None:
+            self.admission_ticket = None
+            ticket.release()
+        return super().finalize_response(request, response, *args, **kwargs)
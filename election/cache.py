@@ -0,0 +1,32 @@
+"""
+Cache backends that count hits and misses per key family for /metrics.
+Drop-in replacements for the backends they subclass.
+"""
+from django.core.cache.backends.locmem import LocMemCache as BaseLocMemCache
+from django_redis.cache import RedisCache as BaseRedisCache
+
+from . import metrics
+
+_missing = object()
+
+
+class InstrumentedCacheMixin:
+    def get(self, key, default=None, version=None, **kwargs):
+        value = super().get(key, _missing, version=version, **kwargs)
+        metrics.record_cache_lookup(key, value is not _missing)
+        return default if value is _missing else value
+
+    def get_many(self, keys, version=None, **kwargs):
+        keys = list(keys)
+        found = super().get_many(keys, version=version, **kwargs)
+        for key in keys:
+            metrics.record_cache_lookup(key, key in found)
+        return found
+
+
+class LocMemCache(InstrumentedCacheMixin, BaseLocMemCache):
+    pass
+
+
+class RedisCache(InstrumentedCacheMixin, BaseRedisCache):
+    pass
@@ -0,0 +1,76 @@
+"""
+Pooled PostgreSQL connections, with pool metrics for /metrics.
+
+With DATABASE_POOL on, settings point every PostgreSQL database at this
+backend. It's Django's postgresql backend using its native psycopg 3
+connection pool (OPTIONS["pool"]). Each alias gets one pool per process,
+DATABASE_POOL_MIN_SIZE to DATABASE_POOL_MAX_SIZE connections, shared by
+all of the process's threads. That includes the threads that run the
+async views' ORM calls, so sync and async views draw on the same pool.
+
+A request checks a connection out on its first query and returns it when
+the request finishes. It doesn't keep a persistent connection per thread,
+so the server's connection count is capped at workers x max size however
+many threads a worker starts. A request that waits DATABASE_POOL_TIMEOUT
+seconds without getting a connection fails. Each checkout is health
+checked first (CONN_HEALTH_CHECKS), so a connection the server dropped is
+replaced rather than handed out.
+
+Exported:
+
+* db_pool_checkout_seconds{alias}: time to get a connection, including
+  the wait for a free one;
+* db_pool_checkout_timeouts_total{alias}: checkouts that gave up;
+* db_pool_<alias>_* gauges from the pool's own stats, read at scrape
+  time. They include size, in_use, waiting and saturation (in_use / max).
+"""
+from election import metrics
+
+checkout_seconds = metrics.Histogram(
+    "db_pool_checkout_seconds", "Time to check a connection out of the pool, by database alias.", ("alias",)
+)
+checkout_timeouts = metrics.Counter(
+    "db_pool_checkout_timeouts_total", "Pool checkouts that timed out, by database alias.", ("alias",)
+)
+
+# psycopg_pool counters worth exporting, under our names
+COUNTERS = {
+    "requests_num": "checkouts",
+    "requests_queued": "checkouts_queued",
+    "requests_wait_ms": "checkout_wait_ms",
+    "requests_errors": "checkout_errors",
+    "connections_num": "connections_opened",
+    "connections_errors": "connection_errors",
+    "connections_lost": "connections_lost",
+    "returns_bad": "returns_bad",
+}
+
+
+def pool_stats(pool):
+    raw = pool.get_stats()
+    in_use = raw["pool_size"] - raw["pool_available"]
+    stats = {
+        "min": raw["pool_min"],
+        "max": raw["pool_max"],
+        "size": raw["pool_size"],
+        "available": raw["pool_available"],
+        "in_use": in_use,
+        "waiting": raw["requests_waiting"],
+        "saturation": round(in_use / raw["pool_max"], 3) if raw["pool_max"] else 0.0,
+    }
+    # psycopg_pool only reports counters that have moved
+    stats.update({name: raw.get(key, 0) for key, name in COUNTERS.items()})
+    return stats
+
+
+def stats():
+    from django.db.backends.postgresql.base import DatabaseWrapper
+
+    return {
+        f"{alias}_{name}": value
+        for alias, pool in list(DatabaseWrapper._connection_pools.items())
+        for name, value in pool_stats(pool).items()
+    }
+
+
+metrics.register_collector("db_pool", stats)
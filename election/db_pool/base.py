@@ -0,0 +1,20 @@
+import time
+
+from django.db.backends.postgresql import base
+from psycopg_pool import PoolTimeout
+
+from . import checkout_seconds, checkout_timeouts
+
+
+class DatabaseWrapper(base.DatabaseWrapper):
+    def get_new_connection(self, conn_params):
+        if self.pool is None:
+            return super().get_new_connection(conn_params)
+        started = time.perf_counter()
+        try:
+            return super().get_new_connection(conn_params)
+        except PoolTimeout:
+            checkout_timeouts.inc(self.alias)
+            raise
+        finally:
+            checkout_seconds.observe(time.perf_counter() - started, self.alias)
@@ -0,0 +1,110 @@
+"""
+Read-replica routing with read-your-writes stickiness.
+
+Replicas come from DATABASE_REPLICA_URLS (settings.DATABASE_REPLICAS lists
+their aliases). ReplicaRouter sends reads made while serving a GET (or
+HEAD/OPTIONS) request to a random replica. Everything else stays on the
+primary:
+- every write;
+- every query of a POST/PUT/PATCH/DELETE request;
+- reads inside a transaction;
+- queries made outside a request, such as management commands, the
+  broadcaster and websocket consumers.
+
+A replica may trail the primary. After a user's write request succeeds,
+that user is pinned to the primary for READ_YOUR_WRITES_WINDOW seconds,
+through a cache key every worker can see. Their next candidate list then
+can't miss the vote they just cast. The pin is checked once the request
+knows its user (after DRF authentication) and looked up at most once per
+request.
+
+ReplicaRoutingMiddleware (election/middleware.py) sets up the per-request
+state this relies on.
+"""
+import random
+from contextvars import ContextVar
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import DEFAULT_DB_ALIAS, connections
+from django.utils.functional import SimpleLazyObject, empty
+
+SAFE_METHODS = ("GET", "HEAD", "OPTIONS")
+
+_state = ContextVar("db_routing_state", default=None)
+
+
+def replicas():
+    return getattr(settings, "DATABASE_REPLICAS", [])
+
+
+def pin_key(user_id):
+    return f"db_pin_{user_id}"
+
+
+def pin_to_primary(user_id):
+    cache.set(pin_key(user_id), 1, timeout=getattr(settings, "READ_YOUR_WRITES_WINDOW", 5))
+
+
+def _known_user(request):
+    # Only a user something has already loaded: evaluating Django's lazy
+    # session user here would itself run queries through this router.
+    user = request.__dict__.get("user")
+    if isinstance(user, SimpleLazyObject):
+        user = None if user._wrapped is empty else user._wrapped
+    if user is None or not user.is_authenticated:
+        return None
+    return user
+
+
+class RoutingState:
+    def __init__(self, request):
+        self.request = request
+        self.primary = request.method not in SAFE_METHODS
+        self.pinned_user = None
+
+    def use_primary(self):
+        if self.primary:
+            return True
+        user = _known_user(self.request)
+        if user is None:
+            return False
+        if self.pinned_user != user.pk:
+            self.pinned_user = user.pk
+            self.primary = bool(cache.get(pin_key(user.pk)))
+        return self.primary
+
+
+def begin_request(request):
+    return _state.set(RoutingState(request))
+
+
+def end_request(token, request, response):
+    _state.reset(token)
+    if response is None or request.method in SAFE_METHODS or response.status_code >= 400 or not replicas():
+        return
+    user = _known_user(request)
+    if user is not None:
+        pin_to_primary(user.pk)
+
+
+class ReplicaRouter:
+    def db_for_read(self, model, **hints):
+        aliases = replicas()
+        if not aliases:
+            return DEFAULT_DB_ALIAS
+        state = _state.get()
+        if state is None or state.use_primary() or connections[DEFAULT_DB_ALIAS].in_atomic_block:
+            return DEFAULT_DB_ALIAS
+        return random.choice(aliases)
+
+    def db_for_write(self, model, **hints):
+        return DEFAULT_DB_ALIAS
+
+    def allow_relation(self, obj1, obj2, **hints):
+        # Replicas hold the same rows as the primary
+        return True
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        # Replicas get their schema through replication
+        return False if db in replicas() else None
@@ -0,0 +1,60 @@
+"""
+Precomputed Cloudinary URLs.
+
+Building a Cloudinary URL is string work that the serializers used to
+repeat for every row on every request. Models with MediaURLsMixin keep the
+URLs (plain and a thumbnail variant) in ordinary columns, filled in when
+the model is saved; serializers read the columns. For rows that are not
+saved through the model (bulk_create, the counters' raw upsert) call
+refresh_media_urls() or build_url() directly. `backfill_media_urls` fills
+existing rows.
+
+An empty column means "no image"; callers apply their own placeholder.
+"""
+from functools import lru_cache
+
+from django.conf import settings
+
+
+@lru_cache(maxsize=4096)
+def _build(field, public_id, variant):
+    resource = field.to_python(public_id)
+    if not resource:
+        return ""
+    if variant == "thumbnail":
+        return resource.build_url(**getattr(settings, "MEDIA_THUMBNAIL", {}))
+    return resource.url
+
+
+def build_url(model, source_field, value, variant=None):
+    """
+    URL for a CloudinaryField value (resource or stored string) of
+    model.source_field; "" when there is no image.
+    """
+    field = model._meta.get_field(source_field)
+    stored = field.get_prep_value(value)
+    if not stored:
+        return ""
+    # Memoized by stored value: votes re-supply the same party image
+    return _build(field, stored, variant)
+
+
+class MediaURLsMixin:
+    """
+    media_urls maps each URL column to (CloudinaryField name, variant),
+    variant being None for the plain URL or "thumbnail".
+    """
+    media_urls = {}
+
+    def refresh_media_urls(self):
+        for column, (source, variant) in self.media_urls.items():
+            setattr(self, column, build_url(type(self), source, getattr(self, source), variant))
+
+    def save(self, *args, **kwargs):
+        update_fields = kwargs.get("update_fields")
+        if update_fields is None:
+            self.refresh_media_urls()
+        elif {source for source, _ in self.media_urls.values()} & set(update_fields):
+            self.refresh_media_urls()
+            kwargs["update_fields"] = {*update_fields, *self.media_urls}
+        super().save(*args, **kwargs)
@@ -0,0 +1,186 @@
+"""
+In-process metrics in the Prometheus text format, served at /metrics.
+
+Deliberately small (no client library): counters, gauges and histograms
+with labels, each update a dict lookup and an add under one lock, so it can
+stay on in production. Values are per process; with several workers,
+scrape each one (or run one worker per pod), as with any in-process
+Prometheus registry.
+
+What feeds it:
+
+* election.middleware.MetricsMiddleware: per-route request counts and
+  latency, DB statements and DB time per request.
+* election.cache backends: cache hits and misses per key family.
+* vote.consumers.VoteConsumer: open WebSockets per group.
+* Collectors (register_collector) for stats kept elsewhere, e.g. the user
+  cache and the password pool, read at scrape time.
+"""
+import threading
+from bisect import bisect_left
+
+_lock = threading.Lock()
+_metrics = []
+_collectors = []
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+QUERY_COUNT_BUCKETS = (0, 1, 2, 3, 5, 10, 20, 50, 100)
+
+# Longest prefixes first; see key_family()
+CACHE_KEY_FAMILIES = (
+    "results_snapshot", "party_votes", "candidates", "user_vote", "live_tally", "cache_gen",
+)
+
+
+def _escape(value):
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _labels(names, values, extra=()):
+    pairs = [*zip(names, values), *extra]
+    if not pairs:
+        return ""
+    return "{" + ",".join(f'{name}="{_escape(value)}"' for name, value in pairs) + "}"
+
+
+def _number(value):
+    if value == float("inf"):
+        return "+Inf"
+    return repr(value) if isinstance(value, float) else str(value)
+
+
+class Metric:
+    kind = None
+
+    def __init__(self, name, help_text, labels=()):
+        self.name = name
+        self.help_text = help_text
+        self.label_names = tuple(labels)
+        self.values = {}
+        with _lock:
+            _metrics.append(self)
+
+    def header(self):
+        return [f"# HELP {self.name} {self.help_text}", f"# TYPE {self.name} {self.kind}"]
+
+    def samples(self):
+        with _lock:
+            items = sorted(self.values.items())
+        return [f"{self.name}{_labels(self.label_names, key)} {_number(value)}" for key, value in items]
+
+    def clear(self):
+        with _lock:
+            self.values.clear()
+
+
+class Counter(Metric):
+    kind = "counter"
+
+    def inc(self, *labels, amount=1):
+        with _lock:
+            self.values[labels] = self.values.get(labels, 0) + amount
+
+    def value(self, *labels):
+        return self.values.get(labels, 0)
+
+
+class Gauge(Counter):
+    kind = "gauge"
+
+    def dec(self, *labels, amount=1):
+        self.inc(*labels, amount=-amount)
+
+
+class Histogram(Metric):
+    kind = "histogram"
+
+    def __init__(self, name, help_text, labels=(), buckets=LATENCY_BUCKETS):
+        super().__init__(name, help_text, labels)
+        self.buckets = tuple(buckets)
+
+    def observe(self, value, *labels):
+        index = bisect_left(self.buckets, value)
+        with _lock:
+            state = self.values.get(labels)
+            if state is None:
+                # per-bucket (not cumulative) counts, sum, count
+                state = self.values[labels] = [[0] * (len(self.buckets) + 1), 0.0, 0]
+            state[0][index] += 1
+            state[1] += value
+            state[2] += 1
+
+    def count(self, *labels):
+        state = self.values.get(labels)
+        return state[2] if state else 0
+
+    def total(self, *labels):
+        state = self.values.get(labels)
+        return state[1] if state else 0.0
+
+    def samples(self):
+        with _lock:
+            items = sorted((key, (list(state[0]), state[1], state[2])) for key, state in self.values.items())
+        lines = []
+        for key, (counts, total, count) in items:
+            cumulative = 0
+            for bound, bucket_count in zip((*self.buckets, float("inf")), counts):
+                cumulative += bucket_count
+                lines.append(f"{self.name}_bucket{_labels(self.label_names, key, [('le', _number(bound))])} {cumulative}")
+            lines.append(f"{self.name}_sum{_labels(self.label_names, key)} {_number(total)}")
+            lines.append(f"{self.name}_count{_labels(self.label_names, key)} {count}")
+        return lines
+
+
+http_requests = Counter(
+    "http_requests_total", "HTTP requests by route, method and status.", ("route", "method", "status")
+)
+http_latency = Histogram(
+    "http_request_duration_seconds", "HTTP request latency by route.", ("route", "method")
+)
+db_queries = Histogram(
+    "db_queries_per_request", "DB statements per HTTP request.", ("route",), buckets=QUERY_COUNT_BUCKETS
+)
+db_time = Histogram(
+    "db_time_per_request_seconds", "Time spent in DB statements per HTTP request.", ("route",)
+)
+cache_lookups = Counter(
+    "cache_lookups_total", "Cache reads by key family and result (hit/miss).", ("family", "result")
+)
+websocket_connections = Gauge(
+    "websocket_connections", "Open WebSocket connections by channel group.", ("group",)
+)
+
+
+def key_family(key):
+    for family in CACHE_KEY_FAMILIES:
+        if key.startswith(family):
+            return family
+    return "other"
+
+
+def record_cache_lookup(key, hit):
+    cache_lookups.inc(key_family(str(key)), "hit" if hit else "miss")
+
+
+def register_collector(prefix, stats):
+    """
+    Exposes the numeric values of stats() (a dict) as <prefix>_<name>
+    gauges, read at scrape time.
+    """
+    with _lock:
+        _collectors.append((prefix, stats))
+
+
+def render():
+    lines = []
+    for metric in list(_metrics):
+        samples = metric.samples()
+        if samples:
+            lines.extend(metric.header())
+            lines.extend(samples)
+    for prefix, stats in list(_collectors):
+        for name, value in stats().items():
+            if isinstance(value, (int, float)) and not isinstance(value, bool):
+                lines.append(f"# TYPE {prefix}_{name} gauge")
+                lines.append(f"{prefix}_{name} {_number(value)}")
+    return "\n".join(lines) + "\n"
@@ -0,0 +1,105 @@
+import time
+from contextlib import ExitStack, contextmanager
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.db import connections
+
+from . import db_router, metrics
+
+
+class QueryCounter:
+    def __init__(self):
+        self.count = 0
+        self.seconds = 0.0
+
+    def __call__(self, execute, sql, params, many, context):
+        started = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.seconds += time.perf_counter() - started
+            self.count += 1
+
+
+class MetricsMiddleware:
+    """
+    Per-route request count and latency, and DB statements and DB time per
+    request, for every view. Put it first in MIDDLEWARE so the timing
+    covers the rest of the stack.
+    """
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        with self.observe(request) as result:
+            result.append(self.get_response(request))
+        return result[0]
+
+    async def __acall__(self, request):
+        with self.observe(request) as result:
+            result.append(await self.get_response(request))
+        return result[0]
+
+    @contextmanager
+    def observe(self, request):
+        counter = QueryCounter()
+        result = []
+        started = time.perf_counter()
+        try:
+            # Every alias, so reads routed to a replica are counted too
+            with ExitStack() as stack:
+                for alias_connection in connections.all():
+                    stack.enter_context(alias_connection.execute_wrapper(counter))
+                yield result
+        finally:
+            elapsed = time.perf_counter() - started
+            # The URL pattern, not the path, so label values stay bounded
+            match = getattr(request, "resolver_match", None)
+            route = match.route if match else "unmatched"
+            status = result[0].status_code if result else 500
+            metrics.http_requests.inc(route, request.method, status)
+            metrics.http_latency.observe(elapsed, route, request.method)
+            metrics.db_queries.observe(counter.count, route)
+            metrics.db_time.observe(counter.seconds, route)
+
+
+class ReplicaRoutingMiddleware:
+    """
+    Gives election.db_router.ReplicaRouter the current request (reads of
+    safe requests may go to a replica) and pins a user to the primary
+    after a successful write.
+    """
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        token = db_router.begin_request(request)
+        response = None
+        try:
+            response = self.get_response(request)
+        finally:
+            db_router.end_request(token, request, response)
+        return response
+
+    async def __acall__(self, request):
+        token = db_router.begin_request(request)
+        response = None
+        try:
+            response = await self.get_response(request)
+        finally:
+            db_router.end_request(token, request, response)
+        return response
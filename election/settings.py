@@ -2,7 +2,7 @@ from pathlib import Path
 import os
 from datetime import timedelta
 from dotenv import load_dotenv
-from decouple import config
+from decouple import Csv, config
 import cloudinary
 import dj_database_url
 
@@ -46,6 +46,8 @@ INSTALLED_APPS = [
 
 
 MIDDLEWARE = [
+    "election.middleware.MetricsMiddleware",
+    "election.middleware.ReplicaRoutingMiddleware",
     "corsheaders.middleware.CorsMiddleware",
     "django.middleware.security.SecurityMiddleware",
     "whitenoise.middleware.WhiteNoiseMiddleware",
@@ -96,6 +98,7 @@ CORS_ALLOW_HEADERS = [
     "accept-encoding",
     "authorization",
     "content-type",
+    "idempotency-key",
     "origin",
     "user-agent",
     "x-csrftoken",
@@ -103,6 +106,7 @@ CORS_ALLOW_HEADERS = [
 ]
 
 WSGI_APPLICATION = "election.wsgi.application"
+ASGI_APPLICATION = "election.asgi.application"
 
 
 DATABASES = {
@@ -112,6 +116,39 @@ DATABASES = {
     )
 }
 
+# Read replicas, as comma-separated database URLs. Reads made while serving
+# GET requests go to a replica; writes, write requests and the reads of a
+# user who wrote in the last READ_YOUR_WRITES_WINDOW seconds stay on the
+# primary (election/db_router.py).
+for index, replica_url in enumerate(config("DATABASE_REPLICA_URLS", default="", cast=Csv())):
+    DATABASES[f"replica_{index}"] = {
+        **dj_database_url.parse(replica_url, conn_max_age=600),
+        "TEST": {"MIRROR": "default"},
+    }
+DATABASE_REPLICAS = [alias for alias in DATABASES if alias != "default"]
+DATABASE_ROUTERS = ["election.db_router.ReplicaRouter"]
+READ_YOUR_WRITES_WINDOW = config("READ_YOUR_WRITES_WINDOW", default=5, cast=int)
+
+# Connection pooling for PostgreSQL databases (needs psycopg[pool]). Each
+# process shares one pool per database between all its threads and async
+# views, in place of a persistent connection per thread (election/db_pool).
+DATABASE_POOL = config("DATABASE_POOL", default=False, cast=bool)
+DATABASE_POOL_MIN_SIZE = config("DATABASE_POOL_MIN_SIZE", default=2, cast=int)
+DATABASE_POOL_MAX_SIZE = config("DATABASE_POOL_MAX_SIZE", default=10, cast=int)
+# Seconds a query waits for a free connection before failing
+DATABASE_POOL_TIMEOUT = config("DATABASE_POOL_TIMEOUT", default=10.0, cast=float)
+if DATABASE_POOL:
+    for database in DATABASES.values():
+        if database["ENGINE"] == "django.db.backends.postgresql":
+            # Pooled connections go back to the pool after each request and
+            # are health checked on checkout
+            database.update(ENGINE="election.db_pool", CONN_MAX_AGE=0, CONN_HEALTH_CHECKS=True)
+            database.setdefault("OPTIONS", {})["pool"] = {
+                "min_size": DATABASE_POOL_MIN_SIZE,
+                "max_size": DATABASE_POOL_MAX_SIZE,
+                "timeout": DATABASE_POOL_TIMEOUT,
+            }
+
 
 AUTH_USER_MODEL = "accounts.User"
 AUTHENTICATION_BACKENDS = [
@@ -176,14 +213,118 @@ except Exception:
 
 CACHES = {
     "default": {
-        "BACKEND": "django_redis.cache.RedisCache",
+        # django-redis, counting hits and misses for /metrics
+        "BACKEND": "election.cache.RedisCache",
         "LOCATION": REDIS_URL,
         "OPTIONS": {"CLIENT_CLASS": "django_redis.client.DefaultClient"},
     }
 }
+# Spread each party's running total over this many PartyVoteShard rows so
+# concurrent casts don't serialize on one hot row. 0 or 1 disables sharding;
+# run `manage.py compact_vote_shards` to fold shards back into PartyVoteCount.
+VOTE_COUNTER_SHARDS = config("VOTE_COUNTER_SHARDS", default=0, cast=int)
+
+# Record party votes in Redis at cast time and let `manage.py
+# flush_vote_tallies` apply them to PartyVoteCount every
+# VOTE_TALLY_FLUSH_INTERVAL seconds (see vote/writebehind.py).
+VOTE_TALLY_WRITE_BEHIND = config("VOTE_TALLY_WRITE_BEHIND", default=False, cast=bool)
+VOTE_TALLY_FLUSH_INTERVAL = config("VOTE_TALLY_FLUSH_INTERVAL", default=1.0, cast=float)
+
+# `manage.py roll_up_tallies` counts new votes into the regional tallies and
+# per-minute buckets every VOTE_ROLLUP_INTERVAL seconds. Vote ids it passes
+# before their casts commit are rechecked for VOTE_ROLLUP_GAP_TIMEOUT seconds
+# (see vote/rollup.py).
+VOTE_ROLLUP_INTERVAL = config("VOTE_ROLLUP_INTERVAL", default=2.0, cast=float)
+VOTE_ROLLUP_GAP_TIMEOUT = config("VOTE_ROLLUP_GAP_TIMEOUT", default=300.0, cast=float)
+
+# Admission control for the cast and login endpoints (election/admission.py):
+# global and per-client token buckets (requests/second, burst size) plus a
+# cap on requests in flight, enforced in Redis. Over the limit gets 429 with
+# Retry-After. A rate of 0 or a concurrency of 0 turns that limit off; needs
+# the django-redis cache.
+ADMISSION_CONTROL_ENABLED = config("ADMISSION_CONTROL_ENABLED", default=True, cast=bool)
+# Proxies in front of the app that append to X-Forwarded-For (1 behind a
+# single load balancer). At 0 the client address is REMOTE_ADDR, which
+# behind a proxy is the proxy's own for every request.
+ADMISSION_TRUSTED_PROXIES = config("ADMISSION_TRUSTED_PROXIES", default=0, cast=int)
+ADMISSION_CONTROL = {
+    "cast": {
+        "rate": config("ADMISSION_CAST_RATE", default=1000, cast=float),
+        "burst": config("ADMISSION_CAST_BURST", default=2000, cast=int),
+        "client_rate": 1,
+        "client_burst": 5,
+        "concurrency": config("ADMISSION_CAST_CONCURRENCY", default=200, cast=int),
+    },
+    "login": {
+        "rate": config("ADMISSION_LOGIN_RATE", default=300, cast=float),
+        "burst": config("ADMISSION_LOGIN_BURST", default=600, cast=int),
+        # Keyed by client address before login: off unless set, and only
+        # meaningful with ADMISSION_TRUSTED_PROXIES matching the deployment
+        "client_rate": config("ADMISSION_LOGIN_CLIENT_RATE", default=0, cast=float),
+        "client_burst": config("ADMISSION_LOGIN_CLIENT_BURST", default=10, cast=int),
+        "concurrency": config("ADMISSION_LOGIN_CONCURRENCY", default=64, cast=int),
+    },
+}
+
+# Responses to POST /vote/cast/ with an Idempotency-Key are kept this many
+# seconds for retries to replay; a duplicate arriving while the first is
+# still running waits up to IDEMPOTENCY_WAIT seconds for it (vote/idempotency.py).
+IDEMPOTENCY_KEY_TTL = config("IDEMPOTENCY_KEY_TTL", default=24 * 60 * 60, cast=int)
+IDEMPOTENCY_WAIT = config("IDEMPOTENCY_WAIT", default=10.0, cast=float)
+
+# Seconds the shared per-election candidate list (with party totals) is
+# cached before it is rebuilt; each voter's own user_voted flag is always
+# current.
+CANDIDATE_CACHE_TIMEOUT = config("CANDIDATE_CACHE_TIMEOUT", default=10, cast=int)
+
+# Cache-Control for the results endpoints (party votes, candidate list).
+# Both also send ETags and answer If-None-Match with 304.
+RESULTS_MAX_AGE = config("RESULTS_MAX_AGE", default=2, cast=int)
+RESULTS_STALE_WHILE_REVALIDATE = config("RESULTS_STALE_WHILE_REVALIDATE", default=10, cast=int)
+
+# How far (seconds) the materialized results snapshot may trail new votes
+# before a request rebuilds it itself; normally broadcast_tallies keeps it
+# current every LIVE_TALLY_INTERVAL.
+RESULTS_SNAPSHOT_MAX_LAG = config("RESULTS_SNAPSHOT_MAX_LAG", default=1.0, cast=float)
+
+# Serve the candidate and party-vote lists with the native async views in
+# vote/async_views.py (for uvicorn/ASGI) instead of the sync DRF views.
+ASYNC_READ_VIEWS = config("ASYNC_READ_VIEWS", default=False, cast=bool)
+
+# Cloudinary transformation for the precomputed *_thumb_url columns
+# (election/media.py); rerun backfill_media_urls after changing it
+MEDIA_THUMBNAIL = {"width": 160, "height": 160, "crop": "fill", "gravity": "auto"}
+
+# Bearer token required by /metrics; empty leaves it open (e.g. when only
+# reachable from inside the cluster)
+METRICS_TOKEN = config("METRICS_TOKEN", default="")
+
+CHANNEL_LAYERS = {
+    "default": {
+        "BACKEND": "channels_redis.core.RedisChannelLayer",
+        "CONFIG": {"hosts": [REDIS_URL]},
+    }
+}
+
+# Seconds between coalesced party_counts_update messages sent by
+# `manage.py broadcast_tallies` (at most one per election group per interval).
+LIVE_TALLY_INTERVAL = config("LIVE_TALLY_INTERVAL", default=0.25, cast=float)
+
+# Per-process cache of authenticated users (accounts/user_cache.py)
+USER_CACHE_SIZE = config("USER_CACHE_SIZE", default=10000, cast=int)
+USER_CACHE_TTL = config("USER_CACHE_TTL", default=30, cast=int)
+
+# Password checks run in a process pool (accounts/password_pool.py); logins
+# beyond workers + queue depth get a 429. 0 workers checks in-process.
+PASSWORD_POOL_WORKERS = config("PASSWORD_POOL_WORKERS", default=os.cpu_count() or 1, cast=int)
+PASSWORD_POOL_QUEUE_DEPTH = config("PASSWORD_POOL_QUEUE_DEPTH", default=PASSWORD_POOL_WORKERS * 4, cast=int)
+PASSWORD_POOL_START_METHOD = config("PASSWORD_POOL_START_METHOD", default="spawn")
+# Serve /auth/login/ with the async view in accounts/async_views.py
+ASYNC_LOGIN_VIEW = config("ASYNC_LOGIN_VIEW", default=False, cast=bool)
+
 REST_FRAMEWORK = {
     "DEFAULT_AUTHENTICATION_CLASSES": (
-        "rest_framework_simplejwt.authentication.JWTAuthentication",
+        "accounts.authentication.CachedJWTAuthentication",
     ),
     "DEFAULT_PERMISSION_CLASSES": (
         "rest_framework.permissions.AllowAny",
@@ -19,6 +19,7 @@ from django.urls import path, include
 from rest_framework import permissions
 from drf_yasg.views import get_schema_view
 from drf_yasg import openapi
+from .views import metrics_view
 
 schema_view = get_schema_view(
    openapi.Info(
@@ -34,6 +35,7 @@ urlpatterns = [
     path('admin/', admin.site.urls),
     path('auth/', include('accounts.urls')),
     path('vote/',include('vote.urls')),
+    path('metrics', metrics_view, name='metrics'),
 
     # Swagger endpoints
     path('', schema_view.with_ui('swagger', cache_timeout=0), name='schema-swagger-ui'),
@@ -0,0 +1,72 @@
+"""
+Async access to the default cache for the async read views.
+
+When the default cache is django-redis, entries are read and written through
+a redis.asyncio client on the same server. Keys and values are encoded with
+django-redis's own client, so sync and async views share entries. Any other
+backend (e.g. LocMemCache in tests) falls back to Django's async cache
+methods.
+"""
+import asyncio
+import weakref
+
+from django.core.cache import caches
+
+from election import metrics
+
+_redis_caches = weakref.WeakKeyDictionary()
+
+
+class DjangoAsyncCache:
+    def __init__(self, cache):
+        self.cache = cache
+
+    async def get(self, key, default=None):
+        return await self.cache.aget(key, default)
+
+    async def set(self, key, value, timeout):
+        await self.cache.aset(key, value, timeout=timeout)
+
+    async def add(self, key, value, timeout):
+        return await self.cache.aadd(key, value, timeout=timeout)
+
+
+class RedisAsyncCache:
+    def __init__(self, codec, redis):
+        # codec is the django-redis client: make_key/encode/decode only
+        self.codec = codec
+        self.redis = redis
+
+    async def get(self, key, default=None):
+        value = await self.redis.get(self.codec.make_key(key))
+        metrics.record_cache_lookup(key, value is not None)
+        return default if value is None else self.codec.decode(value)
+
+    async def set(self, key, value, timeout):
+        await self.redis.set(self.codec.make_key(key), self.codec.encode(value), ex=timeout)
+
+    async def add(self, key, value, timeout):
+        return bool(await self.redis.set(
+            self.codec.make_key(key), self.codec.encode(value), ex=timeout, nx=True
+        ))
+
+
+def get_async_cache():
+    """
+    Async cache for the running event loop (redis.asyncio connections can't
+    be shared between loops).
+    """
+    cache = caches["default"]
+    try:
+        from django_redis.cache import RedisCache
+    except ImportError:
+        RedisCache = None
+    if RedisCache is None or not isinstance(cache, RedisCache):
+        return DjangoAsyncCache(cache)
+
+    loop = asyncio.get_running_loop()
+    if loop not in _redis_caches:
+        import redis.asyncio
+
+        _redis_caches[loop] = RedisAsyncCache(cache.client, redis.asyncio.from_url(cache.client._server[0]))
+    return _redis_caches[loop]
@@ -0,0 +1,133 @@
+"""
+Async variants of the read endpoints, for running under uvicorn/ASGI.
+
+They are plain Django async views (DRF views are sync-only) with the same
+URLs, responses, ETags and cache entries as the DRF views in vote/views.py.
+The hot paths (cached list, snapshot, 304) never leave the event loop: cache
+reads go through vote.async_cache and the JWT user (on a user-cache miss) and the voter's
+own vote are fetched with the async ORM. Cache misses that need a full
+rebuild (serializers, live totals) run the shared sync code in a thread.
+
+Enabled with ASYNC_READ_VIEWS (see vote/urls.py).
+"""
+import zlib
+
+from asgiref.sync import sync_to_async
+from django.http import HttpResponse, JsonResponse
+from django.views import View
+from rest_framework.exceptions import APIException
+from rest_framework.request import Request
+from rest_framework_simplejwt.authentication import JWTAuthentication
+from rest_framework_simplejwt.exceptions import InvalidToken
+from rest_framework_simplejwt.settings import api_settings
+
+from accounts.authentication import CachedJWTAuthentication
+from accounts.models import User
+from accounts.user_cache import user_cache
+from . import candidate_cache, snapshot
+from .async_cache import get_async_cache
+from .cache_keys import PARTY_VOTES, acandidates_key, ageneration, party_votes_key
+from .conditional import add_validators, is_current, make_etag, not_modified
+from .fast_rows import aparty_vote_rows, dumps
+from .views import PartyVoteListView
+
+
+async def load_user(user_id):
+    try:
+        return await User.objects.aget(**{api_settings.USER_ID_FIELD: user_id})
+    except User.DoesNotExist:
+        return None
+
+
+async def authenticate_jwt(request):
+    """
+    CachedJWTAuthentication with cache misses fetched through the async
+    ORM. Returns the user, or None if no token was sent; raises
+    APIException subclasses for bad tokens like the sync authenticator does.
+    """
+    auth = CachedJWTAuthentication()
+    header = auth.get_header(request)
+    raw_token = auth.get_raw_token(header) if header else None
+    if raw_token is None:
+        return None
+
+    token = auth.get_validated_token(raw_token)
+    try:
+        user_id = token[api_settings.USER_ID_CLAIM]
+    except KeyError as e:
+        raise InvalidToken("Token contained no recognizable user identification") from e
+    user = await user_cache.aget(user_id, load_user)
+    return auth.check_user(user, token)
+
+
+def error_response(exc):
+    detail = exc.detail if isinstance(exc.detail, dict) else {"detail": exc.detail}
+    response = JsonResponse(detail, status=exc.status_code)
+    response["WWW-Authenticate"] = JWTAuthentication().authenticate_header(None)
+    return response
+
+
+class AsyncCandidateListView(View):
+    async def get(self, request, election_type):
+        try:
+            user = await authenticate_jwt(request)
+        except APIException as exc:
+            return error_response(exc)
+        if user is None:
+            response = JsonResponse({"detail": "Authentication credentials were not provided."}, status=401)
+            response["WWW-Authenticate"] = JWTAuthentication().authenticate_header(None)
+            return response
+
+        election_type = election_type.lower()
+        acache = get_async_cache()
+
+        shared = await acache.get(await acandidates_key(election_type, acache))
+        if shared is None:
+            shared = await sync_to_async(candidate_cache.get_shared)(election_type)
+        shared_digest, fragments = shared
+        voted_candidate_id = await candidate_cache.aget_user_vote(election_type, user, acache)
+
+        etag = make_etag(shared_digest, voted_candidate_id)
+        if is_current(request, etag):
+            return not_modified(etag, private=True)
+
+        response = HttpResponse(
+            candidate_cache.render(fragments, voted_candidate_id),
+            content_type="application/json"
+        )
+        return add_validators(response, etag, private=True)
+
+
+class AsyncPartyVoteListView(View):
+    async def get(self, request, election_type):
+        election_type = election_type.lower()
+        acache = get_async_cache()
+        results_version = await ageneration(PARTY_VOTES, election_type, acache)
+
+        if not request.GET:
+            current = await acache.get(snapshot.snapshot_key(election_type))
+            if not snapshot.is_usable(current, results_version):
+                current = await sync_to_async(snapshot.get)(election_type)
+            etag = make_etag("snapshot", election_type, current["version"])
+            if is_current(request, etag):
+                return not_modified(etag)
+            return add_validators(HttpResponse(current["party_votes"], content_type="application/json"), etag)
+
+        query_string = request.GET.urlencode()
+        etag = make_etag(election_type, results_version, zlib.crc32(query_string.encode()))
+        if is_current(request, etag):
+            return not_modified(etag)
+
+        cache_key = party_votes_key(election_type, query_string, results_version)
+        body = await acache.get(cache_key)
+        if not isinstance(body, bytes):
+            body = dumps(await self.build(request, election_type))
+            await acache.set(cache_key, body, timeout=360)
+        return add_validators(HttpResponse(body, content_type="application/json"), etag)
+
+    async def build(self, request, election_type):
+        # Same queryset, search and ordering as the DRF view
+        view = PartyVoteListView(kwargs={"election_type": election_type}, format_kwarg=None)
+        view.request = Request(request)
+        queryset = await sync_to_async(lambda: view.filter_queryset(view.get_queryset()))()
+        return await aparty_vote_rows(queryset)
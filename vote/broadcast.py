@@ -0,0 +1,129 @@
+"""
+Coalescing live-tally broadcaster for VoteConsumer groups.
+
+Instead of publishing once per vote, `manage.py broadcast_tallies` wakes up
+every LIVE_TALLY_INTERVAL seconds. For each election whose party-votes cache
+generation moved (i.e. votes landed) it reads the live totals once and sends
+at most one ``party_counts_update`` to the ``election_<type>`` group. That
+message carries only the parties whose count changed.
+
+Every update has a ``version`` that goes up by one per message, along with the
+``base_version`` it applies on top of. A client that sees a base_version
+other than the last version it applied has missed a message. It should send
+``{"type": "resync"}`` and will get a full ``party_counts_snapshot``. The
+latest snapshot is kept in the cache so consumers can answer that and greet
+new connections without touching the database.
+
+Run a single broadcaster; several would each publish their own versions.
+"""
+import asyncio
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.core.cache import cache
+
+from . import snapshot
+from .cache_keys import PARTY_VOTES, generation
+from .counters import party_totals
+from .models import ELECTION_TYPES
+
+
+def group_name(election_type):
+    return f"election_{election_type}"
+
+
+def snapshot_key(election_type):
+    return f"live_tally_{election_type}"
+
+
+def get_snapshot(election_type):
+    """
+    Latest published {"election_type", "version", "counts"}, or None.
+    """
+    return cache.get(snapshot_key(election_type))
+
+
+class TallyCoalescer:
+    """
+    Turns successive full tallies into versioned deltas. Holds the last
+    published state per election, seeded from the cached snapshot so a
+    restarted broadcaster carries on from the same version.
+    """
+
+    def __init__(self):
+        self.published = {}
+
+    def _last(self, election_type):
+        if election_type not in self.published:
+            self.published[election_type] = get_snapshot(election_type) or {
+                "election_type": election_type, "version": 0, "counts": {}
+            }
+        return self.published[election_type]
+
+    def update(self, election_type, counts):
+        """
+        Returns the delta payload for the new counts, or None if nothing
+        changed since the last one.
+        """
+        last = self._last(election_type)
+        changes = {
+            party: count for party, count in counts.items()
+            if last["counts"].get(party) != count
+        }
+        if not changes:
+            return None
+
+        snapshot = {
+            "election_type": election_type,
+            "version": last["version"] + 1,
+            "counts": {**last["counts"], **changes},
+        }
+        self.published[election_type] = snapshot
+        cache.set(snapshot_key(election_type), snapshot, timeout=None)
+        return {
+            "election_type": election_type,
+            "version": snapshot["version"],
+            "base_version": last["version"],
+            "changes": changes,
+        }
+
+
+class TallyBroadcaster:
+    def __init__(self, channel_layer, interval=None):
+        self.channel_layer = channel_layer
+        self.interval = interval if interval is not None else getattr(settings, "LIVE_TALLY_INTERVAL", 0.25)
+        self.coalescer = TallyCoalescer()
+        self.generations = {}
+
+    def _collect(self):
+        """
+        Sync half of a tick: the payloads for every election that has new
+        votes since the previous tick.
+        """
+        payloads = []
+        for election_type, _ in ELECTION_TYPES:
+            current = generation(PARTY_VOTES, election_type)
+            if self.generations.get(election_type) == current:
+                continue
+            self.generations[election_type] = current
+            totals = party_totals(election_type)
+            # Keep the materialized results snapshot current off the request path
+            snapshot.refresh(election_type, totals, version=current)
+            payload = self.coalescer.update(election_type, totals)
+            if payload:
+                payloads.append(payload)
+        return payloads
+
+    async def tick(self):
+        payloads = await sync_to_async(self._collect)()
+        for payload in payloads:
+            await self.channel_layer.group_send(
+                group_name(payload["election_type"]),
+                {"type": "party_counts_update", "payload": payload},
+            )
+        return payloads
+
+    async def run(self):
+        while True:
+            await self.tick()
+            await asyncio.sleep(self.interval)
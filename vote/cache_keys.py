@@ -0,0 +1,87 @@
+"""
+Cache keys for the vote app, shared by views and signals so they can't
+drift apart.
+
+Cached results embed a per-election generation number. Invalidating a
+family of keys is a single INCR of its generation; entries written under
+older generations are never read again and simply expire. Generations start
+at the current time in microseconds so that if Redis evicts a generation
+key, the new one can't collide with a generation still in the cache.
+"""
+import time
+
+from django.core.cache import cache
+
+PARTY_VOTES = "party_votes"
+CANDIDATES = "candidates"
+# Party names and image URLs, as opposed to their counts (vote/snapshot.py)
+PARTY_ROWS = "party_rows"
+
+
+def _generation_key(family, election_type):
+    return f"cache_gen_{family}_{election_type}"
+
+
+def generation(family, election_type):
+    key = _generation_key(family, election_type)
+    value = cache.get(key)
+    if value is None:
+        cache.add(key, time.time_ns() // 1000, timeout=None)
+        value = cache.get(key)
+    return value
+
+
+def bump_generation(family, election_type):
+    try:
+        return cache.incr(_generation_key(family, election_type))
+    except ValueError:
+        # No generation yet, so nothing is cached under one either
+        return generation(family, election_type)
+
+
+def party_votes_key(election_type, query_string="", results_generation=None):
+    if results_generation is None:
+        results_generation = generation(PARTY_VOTES, election_type)
+    return f"party_votes_{election_type}_g{results_generation}_{query_string}"
+
+
+def results_view_key(view, election_type, variant, results_generation):
+    # Breakdowns derived from the tallies (regions, turnout) move with every
+    # vote, like party votes
+    return f"{view}_{election_type}_g{results_generation}_{variant}"
+
+
+def candidates_key(election_type):
+    return f"candidates_{election_type}_g{generation(CANDIDATES, election_type)}"
+
+
+def user_vote_key(election_type, user_id):
+    return f"user_vote_{election_type}_{user_id}"
+
+
+# Async counterparts for the async read views; `acache` is a
+# vote.async_cache cache.
+
+async def ageneration(family, election_type, acache):
+    key = _generation_key(family, election_type)
+    value = await acache.get(key)
+    if value is None:
+        await acache.add(key, time.time_ns() // 1000, timeout=None)
+        value = await acache.get(key)
+    return value
+
+
+async def acandidates_key(election_type, acache):
+    return f"candidates_{election_type}_g{await ageneration(CANDIDATES, election_type, acache)}"
+
+
+def invalidate_party_votes(election_type):
+    bump_generation(PARTY_VOTES, election_type)
+
+
+def invalidate_candidates(election_type):
+    bump_generation(CANDIDATES, election_type)
+
+
+def invalidate_party_rows(election_type):
+    bump_generation(PARTY_ROWS, election_type)
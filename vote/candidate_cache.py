@@ -0,0 +1,116 @@
+"""
+Shared candidate-list cache with a per-user overlay.
+
+The candidate list is identical for every voter except ``user_voted``, so it
+is cached once per election as pre-encoded JSON, split into byte fragments
+around that field. Each response splices in the caller's flag from a tiny
+per-user entry holding the id of the candidate they voted for (0 if none).
+Redis memory therefore grows by one small integer per voter instead of one
+full serialized list per voter.
+
+The shared entry also carries a digest of its bytes, which with the voter's
+candidate id makes the response ETag.
+"""
+import hashlib
+
+from django.conf import settings
+from django.core.cache import cache
+
+from .cache_keys import candidates_key, user_vote_key
+from .fast_rows import candidate_rows, dumps
+from .models import Candidate, Vote
+
+USER_VOTE_TIMEOUT = 3600
+_USER_VOTED = b',"user_voted":false,'
+
+
+def encode_rows(rows):
+    """
+    Encodes serialized candidate rows (with user_voted False) into
+    (candidate_id, head, tail) fragments that render() joins back together.
+    """
+    fragments = []
+    for row in rows:
+        head, _, tail = dumps(row).partition(_USER_VOTED)
+        fragments.append((row["id"], head + b',"user_voted":', b"," + tail))
+    return tuple(fragments)
+
+
+def render(fragments, voted_candidate_id):
+    return b"[" + b",".join(
+        head + (b"true" if candidate_id == voted_candidate_id else b"false") + tail
+        for candidate_id, head, tail in fragments
+    ) + b"]"
+
+
+def digest(fragments):
+    hasher = hashlib.blake2b(digest_size=12)
+    for candidate_id, head, tail in fragments:
+        hasher.update(head)
+        hasher.update(tail)
+    return hasher.hexdigest()
+
+
+def build_rows(election_type):
+    """
+    Candidate rows for the shared entry (user_voted all False), built
+    without the serializer (vote.fast_rows).
+    """
+    from .counters import party_totals
+
+    # Prefetch party votes (including any uncompacted shards)
+    party_votes = {
+        (election_type, party): count
+        for party, count in party_totals(election_type).items()
+    }
+    return candidate_rows(
+        Candidate.objects.filter(election_type=election_type).order_by("name"), party_votes
+    )
+
+
+def get_shared(election_type, build=None):
+    """
+    Returns (digest, fragments) for an election from the cache, building the
+    serialized rows (build() or build_rows) on a miss.
+    """
+    key = candidates_key(election_type)
+    shared = cache.get(key)
+    if shared is None:
+        fragments = encode_rows(build() if build else build_rows(election_type))
+        shared = (digest(fragments), fragments)
+        cache.set(key, shared, timeout=getattr(settings, "CANDIDATE_CACHE_TIMEOUT", 10))
+    return shared
+
+
+def get_user_vote(election_type, user):
+    key = user_vote_key(election_type, user.id)
+    candidate_id = cache.get(key)
+    if candidate_id is None:
+        candidate_id = (
+            Vote.objects.filter(user=user, election_type=election_type)
+            .values_list("candidate_id", flat=True)
+            .first()
+        ) or 0
+        cache.set(key, candidate_id, timeout=USER_VOTE_TIMEOUT)
+    return candidate_id
+
+
+def remember_user_vote(election_type, user_id, candidate_id):
+    cache.set(user_vote_key(election_type, user_id), candidate_id, timeout=USER_VOTE_TIMEOUT)
+
+
+def forget_user_votes(election_type, user_ids):
+    cache.delete_many([user_vote_key(election_type, user_id) for user_id in user_ids])
+
+
+async def aget_user_vote(election_type, user, acache):
+    key = user_vote_key(election_type, user.id)
+    candidate_id = await acache.get(key)
+    if candidate_id is None:
+        candidate_id = await (
+            Vote.objects.filter(user=user, election_type=election_type)
+            .values_list("candidate_id", flat=True)
+            .afirst()
+        ) or 0
+        await acache.set(key, candidate_id, timeout=USER_VOTE_TIMEOUT)
+    return candidate_id
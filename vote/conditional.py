@@ -0,0 +1,47 @@
+"""
+Conditional GET helpers for the results endpoints.
+
+ETags come from versions the views already have on hand (cache generations,
+content digests), so a client whose copy is current gets a 304 without the
+view building or serializing anything.
+"""
+from django.conf import settings
+from django.http import HttpResponseNotModified
+from django.utils.cache import patch_cache_control
+from django.utils.http import parse_etags, quote_etag
+
+
+def make_etag(*parts):
+    return quote_etag("-".join(str(part) for part in parts))
+
+
+def is_current(request, etag):
+    """
+    True if the request's If-None-Match already names this (strong) ETag.
+    """
+    header = request.META.get("HTTP_IF_NONE_MATCH")
+    if not header:
+        return False
+    etags = parse_etags(header)
+    return "*" in etags or etag in etags
+
+
+def cache_control(private=False):
+    return {
+        "private": private,
+        "public": not private,
+        "max_age": getattr(settings, "RESULTS_MAX_AGE", 2),
+        "stale_while_revalidate": getattr(settings, "RESULTS_STALE_WHILE_REVALIDATE", 10),
+    }
+
+
+def add_validators(response, etag, private=False):
+    response["ETag"] = etag
+    patch_cache_control(response, **cache_control(private))
+    if private:
+        response["Vary"] = "Authorization"
+    return response
+
+
+def not_modified(etag, private=False):
+    return add_validators(HttpResponseNotModified(), etag, private)
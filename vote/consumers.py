@@ -1,21 +1,52 @@
 # vote/consumers.py
 import json
+from asgiref.sync import sync_to_async
 from channels.generic.websocket import AsyncWebsocketConsumer
+from election import metrics
+from .broadcast import get_snapshot, group_name
+from .models import ELECTION_TYPES
 
 class VoteConsumer(AsyncWebsocketConsumer):
     async def connect(self):
         # URL route: /ws/votes/<election_type>/
         self.election_type = self.scope["url_route"]["kwargs"]["election_type"]
-        self.group_name = f"election_{self.election_type}"
+        if self.election_type not in dict(ELECTION_TYPES):
+            # Refuse the handshake: no group, and no metric series per made-up name
+            await self.close()
+            return
+        self.group_name = group_name(self.election_type)
 
         # join group
         await self.channel_layer.group_add(self.group_name, self.channel_name)
         await self.accept()
+        metrics.websocket_connections.inc(self.group_name)
+        self.counted = True
+
+        # start the client off with the full current tally
+        await self.send_snapshot()
 
     async def disconnect(self, close_code):
+        if not hasattr(self, "group_name"):
+            return  # refused in connect
+        if getattr(self, "counted", False):
+            metrics.websocket_connections.dec(self.group_name)
         # leave group
         await self.channel_layer.group_discard(self.group_name, self.channel_name)
 
+    async def receive(self, text_data=None, bytes_data=None):
+        # Clients that detect a version gap ask for a fresh snapshot
+        try:
+            message = json.loads(text_data or "{}")
+        except ValueError:
+            return
+        if isinstance(message, dict) and message.get("type") == "resync":
+            await self.send_snapshot()
+
+    async def send_snapshot(self):
+        snapshot = await sync_to_async(get_snapshot)(self.election_type)
+        if snapshot:
+            await self.send(text_data=json.dumps({"type": "party_counts_snapshot", "payload": snapshot}))
+
     # Receive message from group
     async def party_counts_update(self, event):
         # event contains {"type": "party_counts_update", "payload": {...}}
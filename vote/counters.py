@@ -0,0 +1,167 @@
+import random
+
+from django.conf import settings
+from django.db import IntegrityError, connection, transaction
+from django.db.models import Case, F, IntegerField, OuterRef, Subquery, Sum, Value, When
+from django.db.models.functions import Coalesce
+
+from election.media import build_url
+from . import writebehind
+from .models import PartyVoteCount, PartyVoteShard
+
+
+# -----------------------------
+# Party vote counters
+# -----------------------------
+# With VOTE_COUNTER_SHARDS <= 1 every vote increments the single
+# PartyVoteCount row for its (election_type, party). With N > 1 shards a vote
+# increments one of N PartyVoteShard rows picked at random, so concurrent
+# casts for the same party rarely wait on the same row lock. Shard totals are
+# added on top of PartyVoteCount at read time until compact_shards() folds
+# them back in. With VOTE_TALLY_WRITE_BEHIND the database is not touched at
+# all at cast time; see vote/writebehind.py. The Redis increment waits for
+# the cast's transaction to commit, so a rolled-back vote is never counted.
+
+def shard_count():
+    return getattr(settings, "VOTE_COUNTER_SHARDS", 0)
+
+
+def increment_party_votes(election_type, party, party_image=None, amount=1):
+    if writebehind.enabled():
+        # robust: the vote is already committed, so a Redis error is logged
+        # (reconcile_votes finds the drift) rather than failing the cast
+        transaction.on_commit(lambda: writebehind.record(election_type, party, amount), robust=True)
+        return
+
+    shards = shard_count()
+    if shards > 1:
+        _increment_shard(election_type, party, party_image, amount, random.randrange(shards))
+    else:
+        _increment_row(election_type, party, party_image, amount)
+
+
+def _increment_row(election_type, party, party_image, amount):
+    # Single-statement upsert (PostgreSQL and SQLite 3.24+); keeps an existing
+    # party image and fills it in from the candidate otherwise.
+    table = connection.ops.quote_name(PartyVoteCount._meta.db_table)
+    image = PartyVoteCount._meta.get_field("party_image").get_prep_value(party_image)
+    image_url = build_url(PartyVoteCount, "party_image", image)
+    with connection.cursor() as cursor:
+        cursor.execute(
+            f"""
+            INSERT INTO {table} (election_type, party, vote_count, party_image, party_image_url)
+            VALUES (%s, %s, %s, %s, %s)
+            ON CONFLICT (election_type, party) DO UPDATE SET
+                vote_count = {table}.vote_count + EXCLUDED.vote_count,
+                party_image = COALESCE({table}.party_image, EXCLUDED.party_image),
+                party_image_url = CASE WHEN {table}.party_image IS NULL
+                    THEN EXCLUDED.party_image_url ELSE {table}.party_image_url END
+            """,
+            [election_type, party, amount, image, image_url],
+        )
+
+
+def _increment_shard(election_type, party, party_image, amount, shard):
+    shard_rows = PartyVoteShard.objects.filter(election_type=election_type, party=party, shard=shard)
+    if shard_rows.update(vote_count=F("vote_count") + amount):
+        return
+
+    # First vote on this shard: make sure the base row exists (it carries the
+    # party image and is what the list endpoints iterate), then create the shard.
+    # Locking the base row makes a new shard wait for a running repair
+    # (vote.reconcile), which holds it.
+    PartyVoteCount.objects.select_for_update().get_or_create(
+        election_type=election_type,
+        party=party,
+        defaults={"party_image": party_image, "vote_count": 0}
+    )
+    try:
+        with transaction.atomic():
+            PartyVoteShard.objects.create(
+                election_type=election_type, party=party, shard=shard, vote_count=amount
+            )
+    except IntegrityError:
+        # Another writer created the shard between our update and insert
+        shard_rows.update(vote_count=F("vote_count") + amount)
+
+
+def party_totals(election_type):
+    """
+    Returns {party: live vote total} for one election.
+    """
+    if writebehind.enabled():
+        return writebehind.read_totals(election_type)
+
+    totals = dict(
+        PartyVoteCount.objects.filter(election_type=election_type)
+        .values_list("party", "vote_count")
+    )
+    if shard_count() > 1:
+        pending = (
+            PartyVoteShard.objects.filter(election_type=election_type)
+            .values("party")
+            .annotate(total=Sum("vote_count"))
+            .values_list("party", "total")
+        )
+        for party, total in pending:
+            totals[party] = totals.get(party, 0) + total
+    return totals
+
+
+def with_live_totals(queryset, election_type):
+    """
+    Annotates a PartyVoteCount queryset with ``live_votes`` (base count plus
+    any uncompacted shard counts) so it can be filtered and ordered in SQL.
+    With write-behind tallying the live counts come from Redis and are
+    inlined into the query.
+    """
+    if writebehind.enabled():
+        totals = writebehind.read_totals(election_type)
+        if not totals:
+            return queryset.annotate(live_votes=F("vote_count"))
+        return queryset.annotate(live_votes=Case(
+            *[When(party=party, then=Value(count)) for party, count in totals.items()],
+            default=F("vote_count"),
+            output_field=IntegerField(),
+        ))
+
+    if shard_count() <= 1:
+        return queryset.annotate(live_votes=F("vote_count"))
+
+    shard_sum = (
+        PartyVoteShard.objects.filter(election_type=OuterRef("election_type"), party=OuterRef("party"))
+        .values("party")
+        .annotate(total=Sum("vote_count"))
+        .values("total")
+    )
+    return queryset.annotate(live_votes=F("vote_count") + Coalesce(Subquery(shard_sum), 0))
+
+
+def compact_shards(election_type=None):
+    """
+    Folds shard counts into PartyVoteCount and zeroes the shards. Each party
+    is moved in its own short transaction; shard rows are kept (at zero) so
+    later votes stay a single UPDATE. Returns the number of votes moved.
+    """
+    pending = PartyVoteShard.objects.filter(vote_count__gt=0)
+    if election_type:
+        pending = pending.filter(election_type=election_type)
+    keys = set(pending.values_list("election_type", "party"))
+
+    moved = 0
+    for key_election_type, party in keys:
+        with transaction.atomic():
+            rows = list(
+                PartyVoteShard.objects.select_for_update()
+                .filter(election_type=key_election_type, party=party, vote_count__gt=0)
+                .values_list("id", "vote_count")
+            )
+            if not rows:
+                continue
+            total = sum(count for _, count in rows)
+            PartyVoteShard.objects.filter(id__in=[row_id for row_id, _ in rows]).update(vote_count=0)
+            PartyVoteCount.objects.filter(election_type=key_election_type, party=party).update(
+                vote_count=F("vote_count") + total
+            )
+            moved += total
+    return moved
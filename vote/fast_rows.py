@@ -0,0 +1,94 @@
+"""
+Serializer-free rows for the candidate and party-vote lists.
+
+The list shapes are fixed, so rows are built straight from values_list()
+tuples and encoded with dumps(), which gives the same bytes as
+CandidateSerializer / PartyVoteCountSerializer rendered by DRF's
+JSONRenderer (tests hold the two to that). Keep them in step when a
+serializer's fields change.
+
+dumps() uses orjson when it is installed and the stdlib's C encoder
+otherwise.
+"""
+import json
+
+try:
+    import orjson
+except ImportError:  # optional; the stdlib encoder gives the same bytes
+    orjson = None
+
+from .serializers import PLACEHOLDER_IMAGE
+
+CANDIDATE_COLUMNS = (
+    "id", "name", "party", "age", "election_type",
+    "image_url", "party_image_url", "image_thumb_url", "party_image_thumb_url",
+)
+PARTY_VOTE_COLUMNS = ("party", "election_type", "party_image_url")
+
+# JSONRenderer's settings (UNICODE_JSON, COMPACT_JSON, STRICT_JSON)
+_encoder = json.JSONEncoder(ensure_ascii=False, allow_nan=False, separators=(",", ":"))
+
+
+def dumps(data):
+    """
+    JSON bytes for plain JSON types, identical to JSONRenderer().render().
+    """
+    if orjson is not None:
+        encoded = orjson.dumps(data)
+    else:
+        encoded = _encoder.encode(data).encode()
+    # JSONRenderer escapes these two, which are valid JSON but not valid JS
+    if b"\xe2\x80\xa8" in encoded or b"\xe2\x80\xa9" in encoded:
+        encoded = encoded.replace(b"\xe2\x80\xa8", b"\\u2028").replace(b"\xe2\x80\xa9", b"\\u2029")
+    return encoded
+
+
+def candidate_rows(queryset, party_votes, user_votes=frozenset()):
+    """
+    CandidateSerializer rows for a Candidate queryset; party_votes and
+    user_votes as in the serializer's context.
+    """
+    return [
+        {
+            "id": pk,
+            "name": name,
+            "party": party,
+            "age": age,
+            "election_type": election_type,
+            "image_url": image_url or PLACEHOLDER_IMAGE,
+            "party_votes": party_votes.get((election_type, party), 0),
+            "user_voted": pk in user_votes,
+            "party_image_url": party_image_url or PLACEHOLDER_IMAGE,
+            "image_thumb_url": image_thumb_url or PLACEHOLDER_IMAGE,
+            "party_image_thumb_url": party_image_thumb_url or PLACEHOLDER_IMAGE,
+        }
+        for (pk, name, party, age, election_type, image_url, party_image_url,
+             image_thumb_url, party_image_thumb_url) in queryset.values_list(*CANDIDATE_COLUMNS)
+    ]
+
+
+def _party_vote_values(queryset):
+    # The live total when the view annotated one, as the serializer does
+    count = "live_votes" if "live_votes" in queryset.query.annotations else "vote_count"
+    return queryset.values_list("party", count, "election_type", "party_image_url")
+
+
+def _party_vote_row(values):
+    party, vote_count, election_type, party_image_url = values
+    return {
+        "party": party,
+        "vote_count": vote_count,
+        "election_type": election_type,
+        "party_image_url": party_image_url or PLACEHOLDER_IMAGE,
+    }
+
+
+def party_vote_rows(queryset):
+    """
+    PartyVoteCountSerializer rows for a PartyVoteCount queryset.
+    """
+    return [_party_vote_row(values) for values in _party_vote_values(queryset)]
+
+
+async def aparty_vote_rows(queryset):
+    return [_party_vote_row(values) async for values in _party_vote_values(queryset)]
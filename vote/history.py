@@ -0,0 +1,164 @@
+"""
+Turnout and results over time, from per-minute VoteBuckets.
+
+Votes are counted into (election_type, party, minute) buckets off the
+request path, by vote.rollup, so casts never wait on a bucket row; the
+latest minutes fill in a few seconds behind the votes. An election day is a
+few thousand rows per election whatever the number of votes, so a turnout
+curve is a GROUP BY minute over those rows. Results as of time T are a prefix sum: every
+bucket that ended by T, grouped by party. Both read only the covering
+(election_type, minute, party, vote_count) index, never Vote.
+
+Resolution is one minute. "As of T" counts votes cast before the start of
+T's minute.
+"""
+from datetime import timedelta
+
+from django.db import connection, transaction
+from django.db.models import Count, Sum
+from django.db.models.functions import TruncMinute
+
+from .models import PartyVoteCount, TallyRollup, Vote, VoteBucket
+
+MAX_INTERVAL = 24 * 60
+
+
+def minute_of(timestamp):
+    return timestamp.replace(second=0, microsecond=0)
+
+
+def increment_bucket(election_type, party, minute, amount=1):
+    # Same single-statement upsert as the party counters (vote.counters)
+    table = connection.ops.quote_name(VoteBucket._meta.db_table)
+    minute = VoteBucket._meta.get_field("minute").get_db_prep_value(minute, connection)
+    with connection.cursor() as cursor:
+        cursor.execute(
+            f"""
+            INSERT INTO {table} (election_type, party, minute, vote_count)
+            VALUES (%s, %s, %s, %s)
+            ON CONFLICT (election_type, party, minute) DO UPDATE SET
+                vote_count = {table}.vote_count + EXCLUDED.vote_count
+            """,
+            [election_type, party, minute, amount],
+        )
+
+
+def increment_many(counts):
+    """Adds {(election_type, party, minute): amount}, one upsert per bucket."""
+    for (election_type, party, minute), amount in counts.items():
+        increment_bucket(election_type, party, minute, amount)
+
+
+def count_range(low, high, election_type=None):
+    """
+    Counts the votes with low < id <= high by election, party and minute:
+    {(election_type, party, minute): votes}.
+    """
+    votes = Vote.objects.filter(id__gt=low, id__lte=high)
+    if election_type:
+        votes = votes.filter(election_type=election_type)
+    return count_votes(votes)
+
+
+def count_votes(votes):
+    """count_range for any Vote queryset."""
+    rows = (
+        votes.annotate(bucket=TruncMinute("timestamp"))
+        .values_list("election_type", "candidate__party", "bucket")
+        .annotate(total=Count("id"))
+        .order_by()
+    )
+    return {(row_election_type, party, minute): total for row_election_type, party, minute, total in rows}
+
+
+def rebuild(election_type):
+    """
+    Rebuilds one election's buckets from Vote rows, up to where the roll-up
+    has got (newer votes are left to it). A full pass over the election's
+    votes.
+    """
+    with transaction.atomic():
+        position = TallyRollup.locked()
+        counts = count_votes(position.counted_votes().filter(election_type=election_type))
+        VoteBucket.objects.filter(election_type=election_type).delete()
+        VoteBucket.objects.bulk_create([
+            VoteBucket(election_type=election_type, party=party, minute=minute, vote_count=total)
+            for (_, party, minute), total in counts.items()
+        ], batch_size=5000)
+    return sum(counts.values())
+
+
+def turnout(election_type, interval=1, since=None, until=None):
+    """
+    Votes per ``interval`` minutes between ``since`` and ``until`` (either
+    may be None), with the running total so far at the end of each.
+    Interval boundaries are counted from the first minute with votes.
+    """
+    buckets = VoteBucket.objects.filter(election_type=election_type)
+    before = 0
+    if since is not None:
+        since = minute_of(since)
+        before = buckets.filter(minute__lt=since).aggregate(total=Sum("vote_count"))["total"] or 0
+        buckets = buckets.filter(minute__gte=since)
+    if until is not None:
+        buckets = buckets.filter(minute__lt=minute_of(until))
+
+    per_minute = buckets.values_list("minute").annotate(total=Sum("vote_count")).order_by("minute")
+    step = timedelta(minutes=interval)
+    points = []
+    running = before
+    for minute, total in per_minute:
+        running += total
+        if points and minute < points[-1]["start"] + step:
+            points[-1]["votes"] += total
+        else:
+            start = points[-1]["start"] + step * ((minute - points[-1]["start"]) // step) if points else minute
+            points.append({"start": start, "votes": total})
+        points[-1]["cumulative"] = running
+
+    return {
+        "election_type": election_type,
+        "interval_minutes": interval,
+        "total_votes": running,
+        "buckets": [
+            {"start": point["start"].isoformat(), "votes": point["votes"], "cumulative": point["cumulative"]}
+            for point in points
+        ],
+    }
+
+
+def results_at(election_type, at):
+    """
+    The results document (as /vote/results/<type>/) for votes cast before
+    the start of ``at``'s minute.
+    """
+    # Not at module level: serializers imports services, which imports this
+    from .serializers import PLACEHOLDER_IMAGE
+
+    totals = dict(
+        VoteBucket.objects.filter(election_type=election_type, minute__lt=minute_of(at))
+        .values_list("party")
+        .annotate(total=Sum("vote_count"))
+        .order_by()
+    )
+    images = dict(
+        PartyVoteCount.objects.filter(election_type=election_type, party__in=totals)
+        .values_list("party", "party_image_url")
+    )
+    ranked = sorted(totals.items(), key=lambda item: (-item[1], item[0]))
+    total_votes = sum(totals.values())
+    return {
+        "election_type": election_type,
+        "as_of": minute_of(at).isoformat(),
+        "total_votes": total_votes,
+        "parties": [
+            {
+                "rank": rank,
+                "party": party,
+                "vote_count": votes,
+                "percentage": round(votes * 100 / total_votes, 2) if total_votes else 0.0,
+                "party_image_url": images.get(party) or PLACEHOLDER_IMAGE,
+            }
+            for rank, (party, votes) in enumerate(ranked, 1)
+        ],
+    }
@@ -0,0 +1,128 @@
+"""
+Idempotency-Key support for POST endpoints (used by /vote/cast/).
+
+The first request with a given key claims it in the cache with an atomic
+add, runs, and stores its response for IDEMPOTENCY_KEY_TTL seconds. A
+retry with the same key gets that response back as it was, without
+running the view again or touching the database. A duplicate that arrives
+while the first is still running waits for it (up to IDEMPOTENCY_WAIT
+seconds) instead of racing it.
+
+Keys are scoped to the user, so two voters can't collide. A key reused
+with a different request body is rejected with 422. Server errors are not
+stored: the claim is released so a retry runs again.
+"""
+import hashlib
+import json
+import time
+
+from django.conf import settings
+from django.core.cache import cache
+from rest_framework import status
+from rest_framework.response import Response
+
+HEADER = "Idempotency-Key"
+MAX_KEY_LENGTH = 255
+PENDING = "pending"
+# How long a claim survives a worker that died mid-request
+CLAIM_TIMEOUT = 60
+
+
+def _cache_key(scope, user_id, key):
+    digest = hashlib.sha256(key.encode()).hexdigest()[:32]
+    return f"idempotency_{scope}_{user_id}_{digest}"
+
+
+def fingerprint(data):
+    return hashlib.sha256(json.dumps(data, sort_keys=True, default=str).encode()).hexdigest()[:16]
+
+
+def _error(message, status_code, **headers):
+    response = Response({"error": message}, status=status_code)
+    for name, value in headers.items():
+        response[name] = value
+    return response
+
+
+def _replay(entry, request_fingerprint):
+    if entry["fingerprint"] != request_fingerprint:
+        return _error(
+            f"This {HEADER} was already used with a different request.",
+            status.HTTP_422_UNPROCESSABLE_ENTITY,
+        )
+    response = Response(entry["data"], status=entry["status"])
+    response["Idempotent-Replayed"] = "true"
+    return response
+
+
+def _wait(cache_key):
+    """Polls a pending key until it completes, is released or we give up."""
+    deadline = time.monotonic() + getattr(settings, "IDEMPOTENCY_WAIT", 10.0)
+    delay = 0.01
+    while time.monotonic() < deadline:
+        time.sleep(delay)
+        delay = min(delay * 2, 0.2)
+        entry = cache.get(cache_key)
+        if entry is None or entry["state"] != PENDING:
+            return entry
+    return cache.get(cache_key)
+
+
+def is_replay(request, scope):
+    """
+    True if the request carries an Idempotency-Key whose response is
+    already stored, so run() would only hand that back.
+    """
+    key = request.headers.get(HEADER)
+    if not key or len(key) > MAX_KEY_LENGTH or not request.user.is_authenticated:
+        return False
+    entry = cache.get(_cache_key(scope, request.user.pk, key))
+    return entry is not None and entry["state"] != PENDING
+
+
+def run(request, scope, handler):
+    """
+    Returns handler()'s response, or the stored response of an earlier
+    request with the same Idempotency-Key. Without the header it just calls
+    handler().
+    """
+    key = request.headers.get(HEADER)
+    if key is None:
+        return handler()
+    if not key or len(key) > MAX_KEY_LENGTH:
+        return _error(f"{HEADER} must be 1 to {MAX_KEY_LENGTH} characters.", status.HTTP_400_BAD_REQUEST)
+
+    cache_key = _cache_key(scope, request.user.pk, key)
+    request_fingerprint = fingerprint(request.data)
+    claim = {"state": PENDING, "fingerprint": request_fingerprint}
+
+    while not cache.add(cache_key, claim, timeout=CLAIM_TIMEOUT):
+        entry = cache.get(cache_key)
+        if entry is not None and entry["state"] == PENDING:
+            if entry["fingerprint"] != request_fingerprint:
+                return _replay(entry, request_fingerprint)
+            entry = _wait(cache_key)
+            if entry is not None and entry["state"] == PENDING:
+                return _error(
+                    "A request with this Idempotency-Key is still in progress.",
+                    status.HTTP_409_CONFLICT,
+                    **{"Retry-After": "1"},
+                )
+        if entry is not None:
+            return _replay(entry, request_fingerprint)
+        # The first request failed and released the key: claim it again
+
+    try:
+        response = handler()
+    except BaseException:
+        cache.delete(cache_key)
+        raise
+    if response.status_code >= 500:
+        cache.delete(cache_key)
+    else:
+        cache.set(
+            cache_key,
+            {"state": "done", "fingerprint": request_fingerprint, "status": response.status_code, "data": response.data},
+            timeout=getattr(settings, "IDEMPOTENCY_KEY_TTL", 24 * 60 * 60),
+        )
+    return response
@@ -0,0 +1,259 @@
+"""
+Bulk ballot ingestion for offline polling-unit uploads.
+
+Input is NDJSON (one object per line) or CSV with a header row. Each ballot
+needs ``candidate_id`` and either ``national_id`` or ``user_id``. Rows are
+streamed and handled in batches: voters are resolved with one query per
+batch, Vote rows go in with bulk_create and party counts get one increment
+per (election_type, party) per batch rather than one per ballot. Regional
+tallies and per-minute buckets are rolled up from the Vote rows later
+(vote.rollup).
+"""
+import csv
+import json
+import uuid
+from collections import Counter
+
+from django.db import IntegrityError, transaction
+
+from accounts.models import User
+from .cache_keys import invalidate_party_votes
+from .candidate_cache import forget_user_votes
+from .counters import increment_party_votes
+from .models import Candidate, Vote
+from .services import AlreadyVotedError, cast_vote
+
+BATCH_SIZE = 1000
+FORMATS = ("ndjson", "csv")
+NOT_UTF8 = "Not valid UTF-8."
+
+
+class IngestReport:
+    def __init__(self):
+        self.rows = 0
+        self.inserted = 0
+        self.errors = []
+
+    def error(self, line, message):
+        self.errors.append({"line": line, "error": message})
+
+    def as_dict(self):
+        return {
+            "rows": self.rows,
+            "inserted": self.inserted,
+            "rejected": len(self.errors),
+            "errors": self.errors,
+        }
+
+
+def guess_format(filename, default="ndjson"):
+    if filename and filename.lower().endswith(".csv"):
+        return "csv"
+    return default
+
+
+def read_lines(stream):
+    """
+    Yields (line_number, text, valid) for each line of a text or binary
+    stream. Binary lines are decoded one at a time, so a line that isn't
+    UTF-8 comes back with replacement characters and valid False rather
+    than ending the read.
+    """
+    for line_number, line in enumerate(stream, 1):
+        valid = True
+        if isinstance(line, bytes):
+            encoding = "utf-8-sig" if line_number == 1 else "utf-8"
+            try:
+                line = line.decode(encoding)
+            except UnicodeDecodeError:
+                line, valid = line.decode(encoding, errors="replace"), False
+        yield line_number, line, valid
+
+
+def read_csv(stream):
+    bad_lines = set()
+
+    def text():
+        # Bad lines still go through the parser so rows and line numbers
+        # stay in step with the file
+        for line_number, line, valid in read_lines(stream):
+            if not valid:
+                bad_lines.add(line_number)
+            yield line
+
+    reader = csv.DictReader(text())
+    # DictReader only updates its own line_num after a good row
+    lines = reader.reader
+    while True:
+        first_line = lines.line_num + 1
+        try:
+            row = next(reader)
+        except StopIteration:
+            return
+        except csv.Error as exc:
+            yield lines.line_num, None, f"Invalid CSV: {exc}."
+            continue
+        if any(first_line <= line_number <= lines.line_num for line_number in bad_lines):
+            yield lines.line_num, None, NOT_UTF8
+            continue
+        yield lines.line_num, row, None
+
+
+def read_rows(stream, fmt):
+    """
+    Yields (line_number, row, error) for each ballot in a text or binary
+    stream, without reading it all into memory.
+    """
+    if fmt not in FORMATS:
+        raise ValueError(f"Unsupported format {fmt!r}; expected one of {', '.join(FORMATS)}.")
+
+    if fmt == "csv":
+        yield from read_csv(stream)
+        return
+
+    for line_number, line, valid in read_lines(stream):
+        if not valid:
+            yield line_number, None, NOT_UTF8
+            continue
+        if not line.strip():
+            continue
+        try:
+            row = json.loads(line)
+        except ValueError:
+            yield line_number, None, "Invalid JSON."
+            continue
+        if not isinstance(row, dict):
+            yield line_number, None, "Expected a JSON object."
+            continue
+        yield line_number, row, None
+
+
+def ingest_ballots(stream, fmt="ndjson", batch_size=BATCH_SIZE):
+    candidates = {
+        c["id"]: c
+        for c in Candidate.objects.values("id", "election_type", "party", "party_image")
+    }
+    report = IngestReport()
+    batch = []
+
+    for line, row, error in read_rows(stream, fmt):
+        report.rows += 1
+        if error:
+            report.error(line, error)
+            continue
+
+        try:
+            candidate = candidates.get(int(row.get("candidate_id")))
+        except (TypeError, ValueError):
+            candidate = None
+        if candidate is None:
+            report.error(line, "Candidate does not exist.")
+            continue
+
+        national_id = str(row.get("national_id") or "").strip()
+        user_id = str(row.get("user_id") or "").strip()
+        if not national_id and not user_id:
+            report.error(line, "national_id or user_id is required.")
+            continue
+        if user_id:
+            try:
+                user_id = uuid.UUID(user_id)
+            except ValueError:
+                report.error(line, "Invalid user_id.")
+                continue
+
+        batch.append((line, national_id, user_id, candidate))
+        if len(batch) >= batch_size:
+            _ingest_batch(batch, report)
+            batch = []
+
+    if batch:
+        _ingest_batch(batch, report)
+    # Voter and duplicate errors are found per batch, after parse errors
+    report.errors.sort(key=lambda error: error["line"])
+    return report
+
+
+def _resolve_users(batch):
+    national_ids = {national_id for _, national_id, user_id, _ in batch if not user_id}
+    user_ids = {user_id for _, _, user_id, _ in batch if user_id}
+
+    by_national_id = dict(
+        User.objects.filter(national_id__in=national_ids).values_list("national_id", "id")
+    ) if national_ids else {}
+    known_ids = set(
+        User.objects.filter(id__in=user_ids).values_list("id", flat=True)
+    ) if user_ids else set()
+    return by_national_id, known_ids
+
+
+def _ingest_batch(batch, report):
+    by_national_id, known_ids = _resolve_users(batch)
+
+    ballots = []
+    for line, national_id, user_id, candidate in batch:
+        if not user_id:
+            user_id = by_national_id.get(national_id)
+        elif user_id not in known_ids:
+            user_id = None
+        if user_id is None:
+            report.error(line, "Voter not found.")
+            continue
+        ballots.append((line, user_id, candidate))
+
+    already_voted = set(
+        Vote.objects.filter(user_id__in={user_id for _, user_id, _ in ballots})
+        .values_list("user_id", "election_type")
+    )
+
+    votes, counted = [], []
+    for line, user_id, candidate in ballots:
+        key = (user_id, candidate["election_type"])
+        if key in already_voted:
+            report.error(line, "Duplicate vote: voter has already voted in this election (unique_vote_per_election).")
+            continue
+        already_voted.add(key)
+        votes.append(Vote(user_id=user_id, candidate_id=candidate["id"], election_type=candidate["election_type"]))
+        counted.append((line, user_id, candidate))
+
+    if not votes:
+        return
+
+    try:
+        with transaction.atomic():
+            Vote.objects.bulk_create(votes)
+            _increment_counts(counted)
+    except IntegrityError:
+        # A live cast for one of these voters landed after our duplicate check;
+        # fall back to one transaction per ballot to find which.
+        _ingest_one_by_one(counted, report)
+        return
+    report.inserted += len(votes)
+    # bulk_create skips the Vote post_save signal that normally does this
+    for election_type in {c["election_type"] for _, _, c in counted}:
+        invalidate_party_votes(election_type)
+        forget_user_votes(election_type, [u for _, u, c in counted if c["election_type"] == election_type])
+
+
+def _increment_counts(ballots):
+    totals = Counter((c["election_type"], c["party"]) for _, _, c in ballots)
+    images = {(c["election_type"], c["party"]): c["party_image"] for _, _, c in ballots}
+    for (election_type, party), amount in totals.items():
+        increment_party_votes(election_type, party, images[(election_type, party)], amount=amount)
+
+
+def _ingest_one_by_one(ballots, report):
+    candidates = Candidate.objects.in_bulk({c["id"] for _, _, c in ballots})
+    for line, user_id, candidate in ballots:
+        if candidate["id"] not in candidates:
+            report.error(line, "Candidate does not exist.")
+            continue
+        try:
+            cast_vote(User(id=user_id), candidates[candidate["id"]])
+        except AlreadyVotedError:
+            report.error(line, "Duplicate vote: voter has already voted in this election (unique_vote_per_election).")
+        except IntegrityError:
+            report.error(line, "Voter or candidate no longer exists.")
+        else:
+            report.inserted += 1
+            forget_user_votes(candidate["election_type"], [user_id])
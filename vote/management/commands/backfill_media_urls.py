@@ -0,0 +1,47 @@
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from accounts.models import User
+from vote.cache_keys import invalidate_candidates, invalidate_party_rows, invalidate_party_votes
+from vote.models import ELECTION_TYPES, Candidate, PartyVoteCount
+
+
+class Command(BaseCommand):
+    help = "Fill the precomputed image URL columns for existing candidates, party counts and users."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--batch-size", type=int, default=1000)
+
+    def handle(self, *args, **options):
+        for model in (Candidate, PartyVoteCount, User):
+            updated = self.backfill(model, options["batch_size"])
+            self.stdout.write(f"{model._meta.label}: {updated} rows updated.")
+
+        # Cached candidate lists and results snapshots embed the old URLs
+        for election_type, _ in ELECTION_TYPES:
+            invalidate_candidates(election_type)
+            invalidate_party_votes(election_type)
+            invalidate_party_rows(election_type)
+
+    def backfill(self, model, batch_size):
+        columns = list(model.media_urls)
+        sources = {source for source, _ in model.media_urls.values()}
+        rows = model.objects.only("pk", *sources, *columns).order_by("pk")
+
+        updated, batch = 0, []
+        for row in rows.iterator(chunk_size=batch_size):
+            before = [getattr(row, column) for column in columns]
+            row.refresh_media_urls()
+            if [getattr(row, column) for column in columns] != before:
+                batch.append(row)
+            if len(batch) >= batch_size:
+                updated += self.write(model, batch, columns)
+                batch = []
+        if batch:
+            updated += self.write(model, batch, columns)
+        return updated
+
+    def write(self, model, batch, columns):
+        with transaction.atomic():
+            model.objects.bulk_update(batch, columns)
+        return len(batch)
@@ -0,0 +1,25 @@
+from django.core.management.base import BaseCommand
+
+from vote.cache_keys import invalidate_party_votes
+from vote.history import rebuild
+from vote.models import ELECTION_TYPES
+
+
+class Command(BaseCommand):
+    help = "Rebuild the per-minute turnout buckets from Vote rows (backfills votes cast before they existed)."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--election-type",
+            choices=[value for value, _ in ELECTION_TYPES],
+            help="Only rebuild this election type.",
+        )
+
+    def handle(self, *args, **options):
+        election_types = [options["election_type"]] if options["election_type"] else [
+            value for value, _ in ELECTION_TYPES
+        ]
+        for election_type in election_types:
+            counted = rebuild(election_type)
+            invalidate_party_votes(election_type)
+            self.stdout.write(f"{election_type}: bucketed {counted} votes by minute.")
@@ -0,0 +1,27 @@
+import asyncio
+
+from channels.layers import get_channel_layer
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from vote.broadcast import TallyBroadcaster
+
+
+class Command(BaseCommand):
+    help = "Publish coalesced live party tallies to the election_<type> WebSocket groups."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--interval",
+            type=float,
+            default=getattr(settings, "LIVE_TALLY_INTERVAL", 0.25),
+            help="Seconds between updates (at most one message per group per interval).",
+        )
+
+    def handle(self, *args, **options):
+        broadcaster = TallyBroadcaster(get_channel_layer(), options["interval"])
+        self.stdout.write(f"Broadcasting live tallies every {broadcaster.interval}s.")
+        try:
+            asyncio.run(broadcaster.run())
+        except KeyboardInterrupt:
+            pass
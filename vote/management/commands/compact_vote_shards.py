@@ -0,0 +1,29 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from vote.counters import compact_shards
+
+
+class Command(BaseCommand):
+    help = "Fold sharded party vote counts back into PartyVoteCount."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--election-type", help="Only compact this election type.")
+        parser.add_argument(
+            "--interval",
+            type=float,
+            default=0,
+            help="Keep running, compacting every INTERVAL seconds.",
+        )
+
+    def handle(self, *args, **options):
+        election_type = options["election_type"]
+        interval = options["interval"]
+
+        while True:
+            moved = compact_shards(election_type)
+            self.stdout.write(f"Compacted {moved} votes.")
+            if not interval:
+                break
+            time.sleep(interval)
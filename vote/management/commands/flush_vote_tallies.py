@@ -0,0 +1,33 @@
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from vote.writebehind import flush_all
+
+
+class Command(BaseCommand):
+    help = "Apply write-behind Redis vote tallies to PartyVoteCount."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--interval",
+            type=float,
+            default=getattr(settings, "VOTE_TALLY_FLUSH_INTERVAL", 1.0),
+            help="Seconds between flushes (0 flushes once and exits).",
+        )
+
+    def handle(self, *args, **options):
+        interval = options["interval"]
+
+        while True:
+            applied = flush_all()
+            if applied is None:
+                self.stdout.write("Another flusher holds the lock; skipping.")
+            elif any(applied.values()):
+                self.stdout.write(
+                    ", ".join(f"{election}: {count}" for election, count in applied.items() if count)
+                )
+            if not interval:
+                break
+            time.sleep(interval)
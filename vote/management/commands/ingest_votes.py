@@ -0,0 +1,33 @@
+import sys
+
+from django.core.management.base import BaseCommand, CommandError
+
+from vote.ingest import BATCH_SIZE, FORMATS, guess_format, ingest_ballots
+
+
+class Command(BaseCommand):
+    help = "Bulk-load offline ballots from an NDJSON or CSV file ('-' for stdin)."
+
+    def add_arguments(self, parser):
+        parser.add_argument("path")
+        parser.add_argument("--format", choices=FORMATS, help="Defaults to csv for *.csv, else ndjson.")
+        parser.add_argument("--batch-size", type=int, default=BATCH_SIZE)
+
+    def handle(self, *args, **options):
+        path = options["path"]
+        fmt = options["format"] or guess_format(path)
+
+        try:
+            if path == "-":
+                report = ingest_ballots(sys.stdin.buffer, fmt, options["batch_size"])
+            else:
+                with open(path, "rb") as stream:
+                    report = ingest_ballots(stream, fmt, options["batch_size"])
+        except OSError as exc:
+            raise CommandError(exc)
+
+        for error in report.errors:
+            self.stderr.write(f"line {error['line']}: {error['error']}")
+        self.stdout.write(
+            f"Read {report.rows} rows: {report.inserted} inserted, {len(report.errors)} rejected."
+        )
@@ -0,0 +1,23 @@
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, transaction
+
+from vote import partitioning
+
+
+class Command(BaseCommand):
+    help = "Convert vote_vote to (or back from) a table partitioned by election type. PostgreSQL only."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--undo", action="store_true", help="Go back to a single vote_vote table.")
+
+    def handle(self, *args, **options):
+        if not partitioning.supported(connection):
+            raise CommandError(f"Partitioning needs PostgreSQL; this database is {connection.vendor}.")
+
+        # One transaction: the table is copied, so casts wait until it's done
+        with transaction.atomic():
+            changed = partitioning.unpartition() if options["undo"] else partitioning.partition()
+        if options["undo"]:
+            self.stdout.write("vote_vote is a single table." if changed else "vote_vote was not partitioned.")
+        else:
+            self.stdout.write("vote_vote is partitioned." if changed else "vote_vote was already partitioned.")
@@ -0,0 +1,54 @@
+import os
+
+from django.core.management.base import BaseCommand, CommandError
+
+from vote.models import ELECTION_TYPES
+from vote.reconcile import CHUNK_SIZE, reconcile
+
+
+class Command(BaseCommand):
+    help = "Recount votes and report (or repair) party counters that have drifted from them."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--election-type",
+            choices=[value for value, _ in ELECTION_TYPES],
+            help="Only reconcile this election type.",
+        )
+        parser.add_argument(
+            "--workers",
+            type=int,
+            default=min(8, os.cpu_count() or 1),
+            help="Threads counting vote ranges in parallel (each uses a database connection).",
+        )
+        parser.add_argument("--chunk-size", type=int, default=CHUNK_SIZE, help="Vote ids per counting query.")
+        parser.add_argument("--repair", action="store_true", help="Set drifted counters to the recounted totals.")
+        parser.add_argument(
+            "--fail-on-drift",
+            action="store_true",
+            help="Exit non-zero if drift was found (for scheduled checks).",
+        )
+
+    def handle(self, *args, **options):
+        try:
+            report = reconcile(
+                options["election_type"],
+                workers=options["workers"],
+                chunk_size=options["chunk_size"],
+                fix=options["repair"],
+            )
+        except RuntimeError as exc:
+            raise CommandError(str(exc))
+
+        self.stdout.write(
+            f"Counted {report.scanned} votes in {report.chunks} chunks in {report.seconds:.1f}s."
+        )
+        for item in report.drift:
+            self.stdout.write(
+                f"{'Repaired' if report.repaired else 'Drift'}: {item.election_type} {item.party}: "
+                f"stored {item.stored}, counted {item.expected} ({item.delta:+d})"
+            )
+        if not report.drift:
+            self.stdout.write("No drift.")
+        elif options["fail_on_drift"]:
+            raise CommandError(f"{len(report.drift)} counters drifted.")
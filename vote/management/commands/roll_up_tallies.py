@@ -0,0 +1,29 @@
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from vote.rollup import roll_up
+
+
+class Command(BaseCommand):
+    help = "Roll new Vote rows up into the regional tallies and per-minute buckets."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--interval",
+            type=float,
+            default=getattr(settings, "VOTE_ROLLUP_INTERVAL", 2.0),
+            help="Seconds between roll-ups (0 rolls up once and exits).",
+        )
+
+    def handle(self, *args, **options):
+        interval = options["interval"]
+
+        while True:
+            counted = roll_up()
+            if counted:
+                self.stdout.write(", ".join(f"{election}: {count}" for election, count in counted.items()))
+            if not interval:
+                break
+            time.sleep(interval)
@@ -0,0 +1,26 @@
+# Generated by Django 5.2.8 on 2026-10-18 14:02
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('vote', '0002_alter_candidate_election_type_alter_candidate_name_and_more'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='PartyVoteShard',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('election_type', models.CharField(choices=[('presidential', 'Presidential'), ('governorship', 'Governorship'), ('senatorial', 'Senatorial')], max_length=20)),
+                ('party', models.CharField(max_length=100)),
+                ('shard', models.PositiveSmallIntegerField()),
+                ('vote_count', models.PositiveIntegerField(default=0)),
+            ],
+            options={
+                'constraints': [models.UniqueConstraint(fields=('election_type', 'party', 'shard'), name='unique_party_vote_shard')],
+            },
+        ),
+    ]
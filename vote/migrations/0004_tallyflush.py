@@ -0,0 +1,23 @@
+# Generated by Django 5.2.8 on 2026-10-18 14:04
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('vote', '0003_partyvoteshard'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='TallyFlush',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('batch_id', models.CharField(max_length=32, unique=True)),
+                ('election_type', models.CharField(choices=[('presidential', 'Presidential'), ('governorship', 'Governorship'), ('senatorial', 'Senatorial')], max_length=20)),
+                ('vote_count', models.PositiveIntegerField(default=0)),
+                ('flushed_at', models.DateTimeField(auto_now_add=True)),
+            ],
+        ),
+    ]
@@ -0,0 +1,38 @@
+# Generated by Django 5.2.8 on 2026-10-18 14:29
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('vote', '0004_tallyflush'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='candidate',
+            name='image_thumb_url',
+            field=models.CharField(blank=True, default='', editable=False, max_length=500),
+        ),
+        migrations.AddField(
+            model_name='candidate',
+            name='image_url',
+            field=models.CharField(blank=True, default='', editable=False, max_length=500),
+        ),
+        migrations.AddField(
+            model_name='candidate',
+            name='party_image_thumb_url',
+            field=models.CharField(blank=True, default='', editable=False, max_length=500),
+        ),
+        migrations.AddField(
+            model_name='candidate',
+            name='party_image_url',
+            field=models.CharField(blank=True, default='', editable=False, max_length=500),
+        ),
+        migrations.AddField(
+            model_name='partyvotecount',
+            name='party_image_url',
+            field=models.CharField(blank=True, default='', editable=False, max_length=500),
+        ),
+    ]
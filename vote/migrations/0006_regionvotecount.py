@@ -0,0 +1,27 @@
+# Generated by Django 5.2.8 on 2026-10-18 14:36
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('vote', '0005_media_urls'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='RegionVoteCount',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('election_type', models.CharField(choices=[('presidential', 'Presidential'), ('governorship', 'Governorship'), ('senatorial', 'Senatorial')], max_length=20)),
+                ('state', models.CharField(blank=True, default='', max_length=100)),
+                ('lga', models.CharField(blank=True, default='', max_length=100)),
+                ('party', models.CharField(max_length=100)),
+                ('vote_count', models.PositiveIntegerField(default=0)),
+            ],
+            options={
+                'constraints': [models.UniqueConstraint(fields=('election_type', 'state', 'lga', 'party'), name='unique_region_vote_count')],
+            },
+        ),
+    ]
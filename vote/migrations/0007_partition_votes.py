@@ -0,0 +1,30 @@
+from django.db import migrations
+
+from vote import partitioning
+
+
+# Only the BRIN index: partitioning copies the table and is done
+# separately with `manage.py partition_votes` (undo it before migrating
+# back past here).
+
+
+def forwards(apps, schema_editor):
+    # PostgreSQL only; a no-op everywhere else
+    partitioning.add_brin_index(schema_editor.connection)
+
+
+def backwards(apps, schema_editor):
+    connection = schema_editor.connection
+    if partitioning.supported(connection):
+        schema_editor.execute(f'DROP INDEX IF EXISTS "{partitioning.BRIN_INDEX}"')
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('vote', '0006_regionvotecount'),
+    ]
+
+    operations = [
+        migrations.RunPython(forwards, backwards),
+    ]
@@ -0,0 +1,27 @@
+# Generated by Django 5.2.8 on 2026-10-18 14:47
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('vote', '0007_partition_votes'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='VoteBucket',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('election_type', models.CharField(choices=[('presidential', 'Presidential'), ('governorship', 'Governorship'), ('senatorial', 'Senatorial')], max_length=20)),
+                ('party', models.CharField(max_length=100)),
+                ('minute', models.DateTimeField()),
+                ('vote_count', models.PositiveIntegerField(default=0)),
+            ],
+            options={
+                'indexes': [models.Index(fields=['election_type', 'minute', 'party', 'vote_count'], name='vote_votebu_electio_3b1f8c_idx')],
+                'constraints': [models.UniqueConstraint(fields=('election_type', 'party', 'minute'), name='unique_vote_bucket')],
+            },
+        ),
+    ]
@@ -0,0 +1,29 @@
+from django.db import migrations, models
+
+
+def count_existing_votes_on_first_roll_up(apps, schema_editor):
+    # Regional tallies and per-minute buckets now come only from the
+    # roll-up, which starts at the first vote (last_vote_id 0). Anything
+    # counted into them before is cleared so the first roll_up_tallies run
+    # counts every existing vote exactly once.
+    apps.get_model("vote", "RegionVoteCount").objects.all().delete()
+    apps.get_model("vote", "VoteBucket").objects.all().delete()
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('vote', '0008_votebucket'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='TallyRollup',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('last_vote_id', models.BigIntegerField(default=0)),
+                ('rolled_up_at', models.DateTimeField(blank=True, null=True)),
+            ],
+        ),
+        migrations.RunPython(count_existing_votes_on_first_roll_up, migrations.RunPython.noop),
+    ]
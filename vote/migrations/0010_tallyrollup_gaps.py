@@ -0,0 +1,18 @@
+# Generated by Django 5.2.8 on 2026-10-18 15:52
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('vote', '0009_tallyrollup'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='tallyrollup',
+            name='gaps',
+            field=models.JSONField(blank=True, default=list),
+        ),
+    ]
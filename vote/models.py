@@ -1,7 +1,11 @@
 
+import operator
+from functools import reduce
+
 from django.db import models
 from cloudinary.models import CloudinaryField
 from django.conf import settings
+from election.media import MediaURLsMixin
 
 ELECTION_TYPES = (
     ("presidential", "Presidential"),
@@ -9,13 +13,26 @@ ELECTION_TYPES = (
     ("senatorial", "Senatorial"),
 )
 
-class Candidate(models.Model):
+class Candidate(MediaURLsMixin, models.Model):
     election_type = models.CharField(max_length=20, choices=ELECTION_TYPES,db_index=True)
     name = models.CharField(max_length=100,db_index=True)
     party = models.CharField(max_length=100,db_index=True)
     party_image = CloudinaryField("party_image")
     age = models.IntegerField()
     image = CloudinaryField("image")
+
+    # Precomputed from the images on save (election.media)
+    image_url = models.CharField(max_length=500, blank=True, default="", editable=False)
+    image_thumb_url = models.CharField(max_length=500, blank=True, default="", editable=False)
+    party_image_url = models.CharField(max_length=500, blank=True, default="", editable=False)
+    party_image_thumb_url = models.CharField(max_length=500, blank=True, default="", editable=False)
+
+    media_urls = {
+        "image_url": ("image", None),
+        "image_thumb_url": ("image", "thumbnail"),
+        "party_image_url": ("party_image", None),
+        "party_image_thumb_url": ("party_image", "thumbnail"),
+    }
     
     
     class Meta:
@@ -27,11 +44,14 @@ class Candidate(models.Model):
         return f"{self.name} - {self.election_type}"
 
 
-class PartyVoteCount(models.Model):
+class PartyVoteCount(MediaURLsMixin, models.Model):
     election_type = models.CharField(max_length=20, choices=ELECTION_TYPES,db_index=True)
     party = models.CharField(max_length=100,db_index=True)
     vote_count = models.PositiveIntegerField(default=0)
     party_image = CloudinaryField("party_image", null=True, blank=True)
+    party_image_url = models.CharField(max_length=500, blank=True, default="", editable=False)
+
+    media_urls = {"party_image_url": ("party_image", None)}
     
     class Meta:
         unique_together = ("election_type", "party")
@@ -40,6 +60,11 @@ class PartyVoteCount(models.Model):
         return f"{self.party} ({self.election_type}): {self.vote_count}"
 
 
+def id_ranges(ranges):
+    """Q matching ids in any of the [first, last, ...] ranges."""
+    return reduce(operator.or_, (models.Q(id__gte=first, id__lte=last) for first, last, *_ in ranges))
+
+
 class Vote(models.Model):
     user = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.CASCADE)
     candidate = models.ForeignKey(Candidate, on_delete=models.CASCADE)
@@ -55,25 +80,129 @@ class Vote(models.Model):
         ]
 
     def save(self, *args, **kwargs):
-        
+        # Party counts are updated by vote.services.cast_vote, not here, so a
+        # vote is only ever counted once.
         self.election_type = self.candidate.election_type
         super().save(*args, **kwargs)
 
-        
-        party_count, created = PartyVoteCount.objects.get_or_create(
-            election_type=self.election_type,
-            party=self.candidate.party,
-            defaults={"party_image": self.candidate.party_image}
-        )
-        if not created:
-            party_count.vote_count += 1
-        
-            if not party_count.party_image:
-                party_count.party_image = self.candidate.party_image
-        else:
-            party_count.vote_count = 1  
-
-        party_count.save()
-
     def __str__(self):
         return f"{self.user} voted for {self.candidate.name}"
+
+
+class PartyVoteShard(models.Model):
+    """
+    One slice of a party's running total. When sharded counting is enabled
+    votes land on a random shard so concurrent casts for the same party don't
+    queue on a single PartyVoteCount row; compaction folds them back in.
+    """
+    election_type = models.CharField(max_length=20, choices=ELECTION_TYPES)
+    party = models.CharField(max_length=100)
+    shard = models.PositiveSmallIntegerField()
+    vote_count = models.PositiveIntegerField(default=0)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(
+                fields=["election_type", "party", "shard"],
+                name="unique_party_vote_shard"
+            )
+        ]
+
+    def __str__(self):
+        return f"{self.party} ({self.election_type}) shard {self.shard}: {self.vote_count}"
+
+
+class TallyFlush(models.Model):
+    """
+    Marks a write-behind batch as applied to PartyVoteCount. Written in the
+    same transaction as the counter UPDATE so a flusher that crashes before
+    clearing Redis can tell the batch was already counted.
+    """
+    batch_id = models.CharField(max_length=32, unique=True)
+    election_type = models.CharField(max_length=20, choices=ELECTION_TYPES)
+    vote_count = models.PositiveIntegerField(default=0)
+    flushed_at = models.DateTimeField(auto_now_add=True)
+
+    def __str__(self):
+        return f"{self.election_type} batch {self.batch_id}: {self.vote_count}"
+
+
+class RegionVoteCount(models.Model):
+    """
+    Running total for one party in one LGA, rolled up from Vote rows and the
+    voter's state and LGA by vote.rollup; state results are summed from
+    these rows at read time. Voters without a state or LGA are counted
+    under "".
+    """
+    election_type = models.CharField(max_length=20, choices=ELECTION_TYPES)
+    state = models.CharField(max_length=100, blank=True, default="")
+    lga = models.CharField(max_length=100, blank=True, default="")
+    party = models.CharField(max_length=100)
+    vote_count = models.PositiveIntegerField(default=0)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(
+                fields=["election_type", "state", "lga", "party"],
+                name="unique_region_vote_count"
+            )
+        ]
+
+    def __str__(self):
+        return f"{self.party} ({self.election_type}, {self.state}/{self.lga}): {self.vote_count}"
+
+
+class VoteBucket(models.Model):
+    """
+    Votes for one party in one minute, keyed by the minute's start. Rolled
+    up from Vote rows by vote.rollup, so turnout curves and results as of
+    any minute are sums over these rows rather than scans of Vote.
+    """
+    election_type = models.CharField(max_length=20, choices=ELECTION_TYPES)
+    party = models.CharField(max_length=100)
+    minute = models.DateTimeField()
+    vote_count = models.PositiveIntegerField(default=0)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(
+                fields=["election_type", "party", "minute"],
+                name="unique_vote_bucket"
+            )
+        ]
+        indexes = [
+            # Covers both turnout and as-of queries (index-only scans)
+            models.Index(fields=["election_type", "minute", "party", "vote_count"]),
+        ]
+
+    def __str__(self):
+        return f"{self.party} ({self.election_type}) {self.minute:%H:%M}: {self.vote_count}"
+
+
+class TallyRollup(models.Model):
+    """
+    How far vote.rollup has counted Vote rows into the derived tallies:
+    every vote with an id up to last_vote_id except those in ``gaps``, the
+    [first, last, seen_at] id ranges that had no committed vote when the
+    roll-up passed them. A single row, locked while a roll-up or a rebuild
+    runs so the two can't count a vote twice.
+    """
+    last_vote_id = models.BigIntegerField(default=0)
+    gaps = models.JSONField(default=list, blank=True)
+    rolled_up_at = models.DateTimeField(null=True, blank=True)
+
+    @classmethod
+    def locked(cls):
+        # Call inside a transaction
+        position, _ = cls.objects.select_for_update().get_or_create(pk=1)
+        return position
+
+    def counted_votes(self):
+        """The votes already counted into the tallies."""
+        votes = Vote.objects.filter(id__lte=self.last_vote_id)
+        if self.gaps:
+            votes = votes.exclude(id_ranges(self.gaps))
+        return votes
+
+    def __str__(self):
+        return f"Rolled up to vote {self.last_vote_id}"
@@ -0,0 +1,147 @@
+"""
+Optional PostgreSQL list partitioning of vote_vote by election_type.
+
+`manage.py partition_votes` turns vote_vote into a partitioned table. It
+has one partition per election type plus a default partition for any type
+added later, so each election's votes have their own heap and their own
+smaller indexes.
+
+PostgreSQL requires unique constraints on a partitioned table to include
+the partition key. Both of ours already do. The database primary key is
+(id, election_type). Django still treats ``id`` as the primary key, and a
+shared sequence keeps it unique. unique_vote_per_election is
+(user, election_type), so each partition enforces it locally.
+
+Every vote table also gets a BRIN index on timestamp (migration 0007 adds
+it to the plain table). Votes are appended in time order, so it serves
+time-range scans at a tiny fraction of a B-tree's size.
+
+Partitioning copies the table, so run the command before votes start
+arriving. The old table is only dropped once the copy has the same number
+of rows; otherwise the whole conversion rolls back. Other databases, SQLite
+included, keep the plain table and these functions do nothing.
+"""
+from django.db import connection as default_connection
+
+from .models import ELECTION_TYPES, Vote
+
+TABLE = Vote._meta.db_table
+SEQUENCE = f"{TABLE}_partitioned_id_seq"
+BRIN_INDEX = f"{TABLE}_timestamp_brin"
+OLD_TABLE = f"{TABLE}_unpartitioned"
+
+
+def supported(connection=default_connection):
+    return connection.vendor == "postgresql"
+
+
+def is_partitioned(connection=default_connection):
+    if not supported(connection):
+        return False
+    with connection.cursor() as cursor:
+        cursor.execute(
+            "SELECT 1 FROM pg_partitioned_table WHERE partrelid = to_regclass(%s)", [TABLE]
+        )
+        return cursor.fetchone() is not None
+
+
+def _foreign_keys():
+    return [
+        (
+            field.column,
+            field.related_model._meta.db_table,
+            field.target_field.column,
+        )
+        for field in (Vote._meta.get_field("user"), Vote._meta.get_field("candidate"))
+    ]
+
+
+def _shared_sql(table, primary_key):
+    # Constraints and indexes both layouts need. They're added once the old
+    # table is gone, so the usual names (vote_vote_pkey...) are free again.
+    statements = [
+        f'ALTER TABLE "{table}" ADD PRIMARY KEY ({primary_key})',
+        f'ALTER TABLE "{table}" ADD CONSTRAINT unique_vote_per_election UNIQUE (user_id, election_type)',
+        f'CREATE INDEX "{table}_candidate_id_idx" ON "{table}" (candidate_id)',
+        f'CREATE INDEX "{BRIN_INDEX}" ON "{table}" USING brin ("timestamp")',
+    ]
+    for column, target_table, target_column in _foreign_keys():
+        statements.append(
+            f'ALTER TABLE "{table}" ADD CONSTRAINT "{table}_{column}_fk" FOREIGN KEY ({column}) '
+            f'REFERENCES "{target_table}" ({target_column}) DEFERRABLE INITIALLY DEFERRED'
+        )
+    return statements
+
+
+def _check_copy_sql():
+    # Raises (rolling back the conversion) unless every row made it across
+    return (
+        "DO $$ DECLARE copied bigint; expected bigint; BEGIN "
+        f'SELECT count(*) INTO copied FROM "{TABLE}"; '
+        f'SELECT count(*) INTO expected FROM "{OLD_TABLE}"; '
+        "IF copied <> expected THEN "
+        f"RAISE EXCEPTION '{TABLE} has % rows after the copy, expected %', copied, expected; "
+        "END IF; END $$"
+    )
+
+
+def partition_sql():
+    statements = [
+        f'ALTER TABLE "{TABLE}" RENAME TO "{OLD_TABLE}"',
+        f'CREATE SEQUENCE "{SEQUENCE}" AS bigint',
+        f'CREATE TABLE "{TABLE}" (LIKE "{OLD_TABLE}") PARTITION BY LIST (election_type)',
+        f'ALTER TABLE "{TABLE}" ALTER COLUMN id SET DEFAULT nextval(\'"{SEQUENCE}"\')',
+        f'ALTER SEQUENCE "{SEQUENCE}" OWNED BY "{TABLE}".id',
+    ]
+    for value, _ in ELECTION_TYPES:
+        statements.append(
+            f'CREATE TABLE "{TABLE}_{value}" PARTITION OF "{TABLE}" FOR VALUES IN (\'{value}\')'
+        )
+    statements += [
+        f'CREATE TABLE "{TABLE}_default" PARTITION OF "{TABLE}" DEFAULT',
+        f'INSERT INTO "{TABLE}" SELECT * FROM "{OLD_TABLE}"',
+        f'SELECT setval(\'"{SEQUENCE}"\', COALESCE((SELECT max(id) FROM "{TABLE}"), 0) + 1, false)',
+        _check_copy_sql(),
+        f'DROP TABLE "{OLD_TABLE}"',
+    ]
+    return statements + _shared_sql(TABLE, "id, election_type")
+
+
+def unpartition_sql():
+    statements = [
+        f'ALTER TABLE "{TABLE}" RENAME TO "{OLD_TABLE}"',
+        f'CREATE TABLE "{TABLE}" (LIKE "{OLD_TABLE}")',
+        f'INSERT INTO "{TABLE}" SELECT * FROM "{OLD_TABLE}"',
+        _check_copy_sql(),
+        f'DROP TABLE "{OLD_TABLE}"',
+        f'ALTER TABLE "{TABLE}" ALTER COLUMN id ADD GENERATED BY DEFAULT AS IDENTITY',
+        f"SELECT setval(pg_get_serial_sequence('\"{TABLE}\"', 'id'), "
+        f'COALESCE((SELECT max(id) FROM "{TABLE}"), 0) + 1, false)',
+    ]
+    return statements + _shared_sql(TABLE, "id")
+
+
+def _run(statements, connection):
+    with connection.cursor() as cursor:
+        for statement in statements:
+            cursor.execute(statement)
+
+
+def add_brin_index(connection=default_connection):
+    if supported(connection):
+        _run([f'CREATE INDEX IF NOT EXISTS "{BRIN_INDEX}" ON "{TABLE}" USING brin ("timestamp")'], connection)
+
+
+def partition(connection=default_connection):
+    """Partitions vote_vote if supported and not already done. Returns True if it did."""
+    if not supported(connection) or is_partitioned(connection):
+        return False
+    _run(partition_sql(), connection)
+    return True
+
+
+def unpartition(connection=default_connection):
+    if not is_partitioned(connection):
+        return False
+    _run(unpartition_sql(), connection)
+    return True
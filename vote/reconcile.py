@@ -0,0 +1,209 @@
+"""
+Reconciles party vote counters against the Vote rows they count.
+
+Votes are aggregated in primary-key ranges, each a short indexed GROUP BY
+with no locks, spread over a pool of threads (each with its own database
+connection; the database does the counting). Only ids up to a settled
+point are scanned this way. Ids above it may still belong to uncommitted
+casts, so that tail is recounted per party when the comparison is made.
+
+Repairs are made one party at a time. The party's counter rows are locked,
+the tail is recounted, and the counter is set to the true total in one
+short transaction. A cast for that party waits on the row lock as it would
+for another cast, so no vote is lost or counted twice while it runs.
+"""
+import queue
+import threading
+import time
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass
+
+from django.db import connection, transaction
+from django.db.models import Count, Max, Min
+
+from . import writebehind
+from .cache_keys import invalidate_party_votes
+from .counters import party_totals
+from .models import PartyVoteCount, PartyVoteShard, Vote
+
+CHUNK_SIZE = 500_000
+# Ids this close to the newest vote are recounted at comparison time
+# rather than trusted to be committed when the chunks were scanned.
+SETTLE_MARGIN = 10_000
+
+
+@dataclass
+class Drift:
+    election_type: str
+    party: str
+    expected: int
+    stored: int
+
+    @property
+    def delta(self):
+        return self.stored - self.expected
+
+
+@dataclass
+class ReconcileReport:
+    scanned: int
+    chunks: int
+    seconds: float
+    drift: list
+    repaired: bool = False
+
+
+def _votes(election_type):
+    votes = Vote.objects.all()
+    if election_type:
+        votes = votes.filter(election_type=election_type)
+    return votes
+
+
+def count_range(election_type, low, high=None):
+    """{(election_type, party): votes} for ids in (low, high]."""
+    votes = _votes(election_type).filter(id__gt=low)
+    if high is not None:
+        votes = votes.filter(id__lte=high)
+    rows = (
+        votes.values_list("election_type", "candidate__party")
+        .annotate(total=Count("id"))
+        .order_by()
+    )
+    return Counter({(row_election, party): total for row_election, party, total in rows})
+
+
+def chunk_ranges(low, high, chunk_size):
+    ranges = []
+    while low < high:
+        ranges.append((low, min(low + chunk_size, high)))
+        low += chunk_size
+    return ranges
+
+
+def count_votes(election_type=None, workers=4, chunk_size=CHUNK_SIZE, settled_id=None):
+    """
+    Counts votes with ids up to ``settled_id`` across ``workers`` threads.
+    Returns (counts, settled_id, chunks).
+    """
+    bounds = _votes(election_type).aggregate(low=Min("id"), high=Max("id"))
+    if bounds["low"] is None:
+        return Counter(), 0, 0
+    if settled_id is None:
+        settled_id = max(bounds["high"] - SETTLE_MARGIN, bounds["low"] - 1)
+    ranges = chunk_ranges(bounds["low"] - 1, settled_id, chunk_size)
+
+    totals = Counter()
+    if workers <= 1:
+        for low, high in ranges:
+            totals.update(count_range(election_type, low, high))
+        return totals, settled_id, len(ranges)
+
+    pending = queue.SimpleQueue()
+    for bound in ranges:
+        pending.put(bound)
+    lock = threading.Lock()
+
+    def work():
+        # Pull ranges until none are left, then release this thread's connection
+        try:
+            while True:
+                try:
+                    low, high = pending.get_nowait()
+                except queue.Empty:
+                    return
+                counts = count_range(election_type, low, high)
+                with lock:
+                    totals.update(counts)
+        finally:
+            connection.close()
+
+    with ThreadPoolExecutor(max_workers=workers, thread_name_prefix="reconcile") as pool:
+        for future in [pool.submit(work) for _ in range(min(workers, len(ranges)))]:
+            future.result()
+    return totals, settled_id, len(ranges)
+
+
+def _tail(election_type, party, settled_id):
+    return _votes(election_type).filter(id__gt=settled_id, candidate__party=party).count()
+
+
+def _stored_keys(election_type):
+    counters = PartyVoteCount.objects.all()
+    if election_type:
+        counters = counters.filter(election_type=election_type)
+    return set(counters.values_list("election_type", "party"))
+
+
+def find_drift(counts, settled_id, election_type=None):
+    """
+    Compares counted votes with the live party totals. Unlocked, so a cast
+    landing mid-comparison can show as a transient drift of one; repair()
+    rechecks every party under its row lock.
+    """
+    counts = counts + count_range(election_type, settled_id)
+    live = {}
+    drift = []
+    for key_election, party in sorted(set(counts) | _stored_keys(election_type)):
+        if key_election not in live:
+            live[key_election] = party_totals(key_election)
+        expected = counts.get((key_election, party), 0)
+        stored = live[key_election].get(party, 0)
+        if stored != expected:
+            drift.append(Drift(key_election, party, expected, stored))
+    return drift
+
+
+def repair(drift, counts, settled_id):
+    """
+    Sets each drifted party's counter to its true total. Each party is
+    fixed in its own transaction holding only that party's counter rows;
+    with sharded counters the shards are folded into the base row as
+    compaction would. Returns the parties whose counters actually changed.
+    """
+    if writebehind.enabled():
+        raise RuntimeError("Flush and disable write-behind tallying before repairing counters.")
+
+    repaired = []
+    for item in drift:
+        key = {"election_type": item.election_type, "party": item.party}
+        with transaction.atomic():
+            base = PartyVoteCount.objects.select_for_update().filter(**key).first()
+            shards = dict(
+                PartyVoteShard.objects.select_for_update().filter(**key).values_list("id", "vote_count")
+            )
+            # Casts for this party now wait on these locks, and everything
+            # committed before them is visible to the tail count.
+            expected = counts.get((item.election_type, item.party), 0) + _tail(
+                item.election_type, item.party, settled_id
+            )
+            stored = (base.vote_count if base else 0) + sum(shards.values())
+            if stored == expected:
+                continue
+            if shards:
+                # Only the shards locked and summed above; one created since
+                # holds votes the tail count may not have seen
+                PartyVoteShard.objects.filter(id__in=shards).update(vote_count=0)
+            if base is None:
+                PartyVoteCount.objects.create(vote_count=expected, **key)
+            else:
+                PartyVoteCount.objects.filter(pk=base.pk).update(vote_count=expected)
+            transaction.on_commit(lambda election_type=item.election_type: invalidate_party_votes(election_type))
+        repaired.append(Drift(item.election_type, item.party, expected, stored))
+    return repaired
+
+
+def reconcile(election_type=None, workers=4, chunk_size=CHUNK_SIZE, fix=False):
+    started = time.perf_counter()
+    counts, settled_id, chunks = count_votes(election_type, workers, chunk_size)
+    drift = find_drift(counts, settled_id, election_type)
+    if fix and drift:
+        drift = repair(drift, counts, settled_id)
+    return ReconcileReport(
+        scanned=sum(counts.values()),
+        chunks=chunks,
+        seconds=time.perf_counter() - started,
+        drift=drift,
+        repaired=fix,
+    )
@@ -0,0 +1,132 @@
+"""
+Results by state and LGA.
+
+RegionVoteCount holds one row per (election_type, state, lga, party), so a
+breakdown reads O(parties x regions) rows however many votes there are.
+State results are the sum of their LGA rows. The rows are rolled up from
+Vote off the request path (vote.rollup), so a cast never waits on a
+regional row lock; they trail the votes by a few seconds.
+"""
+from collections import Counter, defaultdict
+
+from django.db import connection, transaction
+from django.db.models import Count, Sum
+
+from .models import RegionVoteCount, TallyRollup, Vote
+
+
+def region_key(state, lga):
+    """(state, lga) as stored on RegionVoteCount."""
+    return (state or "").strip(), (lga or "").strip()
+
+
+def increment_region_votes(election_type, state, lga, party, amount=1):
+    # Same single-statement upsert as the party counters (vote.counters)
+    table = connection.ops.quote_name(RegionVoteCount._meta.db_table)
+    with connection.cursor() as cursor:
+        cursor.execute(
+            f"""
+            INSERT INTO {table} (election_type, state, lga, party, vote_count)
+            VALUES (%s, %s, %s, %s, %s)
+            ON CONFLICT (election_type, state, lga, party) DO UPDATE SET
+                vote_count = {table}.vote_count + EXCLUDED.vote_count
+            """,
+            [election_type, state, lga, party, amount],
+        )
+
+
+def increment_many(counts):
+    """Adds {(election_type, state, lga, party): amount}, one upsert per key."""
+    for (election_type, state, lga, party), amount in counts.items():
+        increment_region_votes(election_type, state, lga, party, amount)
+
+
+def count_range(low, high, election_type=None):
+    """
+    Counts the votes with low < id <= high by election, voter region and
+    party: {(election_type, state, lga, party): votes}.
+    """
+    votes = Vote.objects.filter(id__gt=low, id__lte=high)
+    if election_type:
+        votes = votes.filter(election_type=election_type)
+    return count_votes(votes)
+
+
+def count_votes(votes):
+    """count_range for any Vote queryset."""
+    rows = (
+        votes.values_list("election_type", "user__state", "user__lga", "candidate__party")
+        .annotate(total=Count("id"))
+        .order_by()
+    )
+    counts = Counter()
+    for row_election_type, state, lga, party, total in rows:
+        counts[(row_election_type, *region_key(state, lga), party)] += total
+    return counts
+
+
+def rebuild(election_type):
+    """
+    Recounts one election's regional tallies from Vote rows, up to where
+    the roll-up has got (newer votes are left to it). A full pass over the
+    election's votes, so it isn't for the request path.
+    """
+    with transaction.atomic():
+        position = TallyRollup.locked()
+        counts = count_votes(position.counted_votes().filter(election_type=election_type))
+        RegionVoteCount.objects.filter(election_type=election_type).delete()
+        RegionVoteCount.objects.bulk_create([
+            RegionVoteCount(election_type=election_type, state=state, lga=lga, party=party, vote_count=total)
+            for (_, state, lga, party), total in counts.items()
+        ])
+    return sum(counts.values())
+
+
+def _group(rows, key):
+    # rows are (region, party, votes); returns regions with their party
+    # totals, each list ordered by votes then name
+    grouped = defaultdict(Counter)
+    for region, party, votes in rows:
+        grouped[region][party] += votes
+    regions = []
+    for region, parties in grouped.items():
+        regions.append({
+            key: region or None,
+            "total_votes": sum(parties.values()),
+            "parties": [
+                {"party": party, "vote_count": votes}
+                for party, votes in sorted(parties.items(), key=lambda item: (-item[1], item[0]))
+            ],
+        })
+    regions.sort(key=lambda region: (-region["total_votes"], region[key] or ""))
+    return regions
+
+
+def state_results(election_type):
+    rows = (
+        RegionVoteCount.objects.filter(election_type=election_type)
+        .values("state", "party")
+        .annotate(total=Sum("vote_count"))
+        .values_list("state", "party", "total")
+        .order_by()
+    )
+    states = _group(rows, "state")
+    return {
+        "election_type": election_type,
+        "total_votes": sum(state["total_votes"] for state in states),
+        "states": states,
+    }
+
+
+def lga_results(election_type, state):
+    rows = list(
+        RegionVoteCount.objects.filter(election_type=election_type, state__iexact=state)
+        .values_list("lga", "party", "vote_count", "state")
+    )
+    lgas = _group([(lga, party, votes) for lga, party, votes, _ in rows], "lga")
+    return {
+        "election_type": election_type,
+        "state": rows[0][3] if rows else state,
+        "total_votes": sum(lga["total_votes"] for lga in lgas),
+        "lgas": lgas,
+    }
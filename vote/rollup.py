@@ -0,0 +1,117 @@
+"""
+Tallies derived from Vote rows, rolled up off the request path.
+
+A cast inserts its Vote and bumps its party counter (sharded, write-behind
+or plain, as configured) and nothing else. roll_up(), run every
+VOTE_ROLLUP_INTERVAL seconds by `manage.py roll_up_tallies`, then counts
+the votes past TallyRollup.last_vote_id into the regional tallies and the
+per-minute buckets: a GROUP BY over an id range and one upsert per key for
+each, in the transaction that moves TallyRollup forward. Casts never wait
+on those rows, and the tallies trail the votes by about the interval.
+
+The position starts at 0 (migration 0009 clears anything counted before),
+so the first run after an upgrade counts every existing vote, in batches.
+
+Ids are handed out before their transactions commit, so a vote with a
+lower id can become visible after a higher one has been counted. Every id
+the position passes without a vote is kept in TallyRollup.gaps and
+rechecked on each run; a vote that turns up there is counted then. Most
+gaps are ids of rolled-back casts (a second vote attempt uses one up on
+PostgreSQL) that never fill, so a gap is given up after
+VOTE_ROLLUP_GAP_TIMEOUT seconds. A cast whose transaction stays open
+longer than that is left out until the rebuild commands recount.
+"""
+import time
+from collections import Counter
+
+from django.conf import settings
+from django.db import transaction
+from django.utils import timezone
+
+from . import history, regions
+from .cache_keys import invalidate_party_votes
+from .models import TallyRollup, Vote, id_ranges
+
+BATCH_SIZE = 10_000
+# Gap ranges (and ids found in them) per query
+GAP_BATCH = 500
+
+
+def holes(first, last, ids):
+    """The [first, last] ranges within first..last not in ``ids`` (sorted, all in range)."""
+    missing, start = [], first
+    for vote_id in ids:
+        if vote_id > start:
+            missing.append([start, vote_id - 1])
+        start = vote_id + 1
+    if start <= last:
+        missing.append([start, last])
+    return missing
+
+
+def _count(votes, counted):
+    region_counts = regions.count_votes(votes)
+    regions.increment_many(region_counts)
+    history.increment_many(history.count_votes(votes))
+    for (election_type, *_), amount in region_counts.items():
+        counted[election_type] += amount
+
+
+def _fill_gaps(position, now, gap_timeout, counted):
+    # Counts the votes that have since committed into the gaps and keeps
+    # whatever is still missing, unless it has waited long enough
+    gaps = []
+    for start in range(0, len(position.gaps), GAP_BATCH):
+        chunk = position.gaps[start:start + GAP_BATCH]
+        found = sorted(Vote.objects.filter(id_ranges(chunk)).values_list("id", flat=True))
+        for offset in range(0, len(found), GAP_BATCH):
+            _count(Vote.objects.filter(id__in=found[offset:offset + GAP_BATCH]), counted)
+        for first, last, seen_at in chunk:
+            if now - seen_at < gap_timeout:
+                inside = [vote_id for vote_id in found if first <= vote_id <= last]
+                gaps += [[low, high, seen_at] for low, high in holes(first, last, inside)]
+    position.gaps = gaps
+
+
+def roll_up(gap_timeout=None, batch_size=BATCH_SIZE):
+    """
+    Counts every committed vote not counted yet, ``batch_size`` votes per
+    transaction. Returns {election_type: votes counted}.
+    """
+    if gap_timeout is None:
+        gap_timeout = getattr(settings, "VOTE_ROLLUP_GAP_TIMEOUT", 300.0)
+
+    counted = Counter()
+    with transaction.atomic():
+        position = TallyRollup.locked()
+        if position.gaps:
+            _fill_gaps(position, time.time(), gap_timeout, counted)
+            position.save(update_fields=["gaps"])
+
+    while True:
+        with transaction.atomic():
+            position = TallyRollup.locked()
+            low = position.last_vote_id
+            ids = list(
+                Vote.objects.filter(id__gt=low).order_by("id").values_list("id", flat=True)[:batch_size]
+            )
+            if not ids:
+                break
+            high = ids[-1]
+            missing = holes(low + 1, high, ids)
+            votes = Vote.objects.filter(id__gt=low, id__lte=high)
+            if missing:
+                # Exactly the ids read above, even if a gap fills meanwhile
+                votes = votes.exclude(id_ranges(missing))
+            _count(votes, counted)
+            now = time.time()
+            position.gaps += [[first, last, now] for first, last in missing]
+            position.last_vote_id = high
+            position.rolled_up_at = timezone.now()
+            position.save(update_fields=["last_vote_id", "gaps", "rolled_up_at"])
+        if len(ids) < batch_size:
+            break
+
+    for election_type in counted:
+        invalidate_party_votes(election_type)
+    return dict(counted)
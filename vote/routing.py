@@ -0,0 +1,6 @@
+from django.urls import re_path
+from .consumers import VoteConsumer
+
+websocket_urlpatterns = [
+    re_path(r"^ws/votes/(?P<election_type>\w+)/$", VoteConsumer.as_asgi()),
+]
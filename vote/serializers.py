@@ -1,5 +1,8 @@
 from rest_framework import serializers
 from .models import Candidate, PartyVoteCount, Vote
+from .services import AlreadyVotedError, cast_vote
+
+PLACEHOLDER_IMAGE = "/placeholder.png"
 
 # ==============================
 # Candidate Serializer
@@ -9,6 +12,8 @@ class CandidateSerializer(serializers.ModelSerializer):
     party_votes = serializers.SerializerMethodField()
     user_voted = serializers.SerializerMethodField()
     party_image_url = serializers.SerializerMethodField()
+    image_thumb_url = serializers.SerializerMethodField()
+    party_image_thumb_url = serializers.SerializerMethodField()
 
     class Meta:
         model = Candidate
@@ -22,15 +27,24 @@ class CandidateSerializer(serializers.ModelSerializer):
             "party_votes",
             "user_voted",
             "party_image_url",
+            "image_thumb_url",
+            "party_image_thumb_url",
         ]
 
+    # Image URLs are precomputed on save (election.media); no URL building here
     def get_image_url(self, obj):
         # Return candidate image URL or placeholder
-        return obj.image.url if obj.image else "/placeholder.png"
+        return obj.image_url or PLACEHOLDER_IMAGE
+
+    def get_image_thumb_url(self, obj):
+        return obj.image_thumb_url or PLACEHOLDER_IMAGE
 
     def get_party_image_url(self, obj):
         # Return party logo URL or placeholder
-        return obj.party_image.url if obj.party_image else "/placeholder.png"
+        return obj.party_image_url or PLACEHOLDER_IMAGE
+
+    def get_party_image_thumb_url(self, obj):
+        return obj.party_image_thumb_url or PLACEHOLDER_IMAGE
 
     def get_party_votes(self, obj):
         # Use pre-fetched party_votes from context
@@ -47,14 +61,19 @@ class CandidateSerializer(serializers.ModelSerializer):
 # Party Vote Count Serializer
 # ==============================
 class PartyVoteCountSerializer(serializers.ModelSerializer):
+    vote_count = serializers.SerializerMethodField()
     party_image_url = serializers.SerializerMethodField()
 
     class Meta:
         model = PartyVoteCount
         fields = ["party", "vote_count", "election_type", "party_image_url"]
 
+    def get_vote_count(self, obj):
+        # Live total annotated by the view (base count plus uncompacted shards)
+        return getattr(obj, "live_votes", obj.vote_count)
+
     def get_party_image_url(self, obj):
-        return obj.party_image.url if obj.party_image else "/placeholder.png"
+        return obj.party_image_url or PLACEHOLDER_IMAGE
 
 
 # ==============================
@@ -67,10 +86,15 @@ class VoteSerializer(serializers.ModelSerializer):
         model = Vote
         fields = ["candidate_id"]
 
-    def validate_candidate_id(self, value):
-        if not Candidate.objects.filter(id=value).exists():
-            raise serializers.ValidationError("Candidate does not exist.")
-        return value
+    def validate(self, attrs):
+        # Fetch the candidate once here; the view and create() reuse it
+        try:
+            attrs["candidate"] = Candidate.objects.only(
+                "id", "election_type", "party", "party_image"
+            ).get(id=attrs["candidate_id"])
+        except Candidate.DoesNotExist:
+            raise serializers.ValidationError({"candidate_id": "Candidate does not exist."})
+        return attrs
 
     def create(self, validated_data):
         request = self.context.get("request")
@@ -79,22 +103,10 @@ class VoteSerializer(serializers.ModelSerializer):
         if not user or not user.is_authenticated:
             raise serializers.ValidationError("Authentication required.")
 
-        candidate = Candidate.objects.get(id=validated_data["candidate_id"])
-
-        # Prevent double voting per election
-        if Vote.objects.filter(user=user, election_type=candidate.election_type).exists():
-            raise serializers.ValidationError(
-                "You have already voted in this election."
-            )
-
-        # Create vote
-        vote = Vote.objects.create(
-            user=user,
-            candidate=candidate,
-            election_type=candidate.election_type
-        )
-        return vote
-
+        try:
+            return cast_vote(user, validated_data["candidate"])
+        except AlreadyVotedError as exc:
+            raise serializers.ValidationError(str(exc))
 
 
 
@@ -0,0 +1,35 @@
+from django.db import IntegrityError, transaction
+
+from .counters import increment_party_votes
+from .models import Vote
+
+
+class AlreadyVotedError(Exception):
+    pass
+
+
+def cast_vote(user, candidate):
+    """
+    Records one vote and counts it, in a single transaction.
+
+    Double voting is caught by the unique_vote_per_election constraint rather
+    than a pre-check, so a cast is the Vote INSERT plus one party counter
+    update; the existing vote is only looked up once the INSERT has failed. Regional tallies and per-minute buckets are rolled up from the
+    Vote rows later (vote.rollup).
+    """
+    try:
+        with transaction.atomic():
+            vote = Vote.objects.create(
+                user=user,
+                candidate=candidate,
+                election_type=candidate.election_type
+            )
+            increment_party_votes(candidate.election_type, candidate.party, candidate.party_image)
+    except IntegrityError:
+        # Only the unique constraint means a second vote; anything else (a
+        # candidate deleted under us, say) is a real error. Checked once the
+        # failed transaction is rolled back, so the query can run.
+        if Vote.objects.filter(user=user, election_type=candidate.election_type).exists():
+            raise AlreadyVotedError("You have already voted in this election.") from None
+        raise
+    return vote
@@ -1,25 +1,30 @@
+from django.db import transaction
 from django.db.models.signals import post_save, post_delete
 from django.dispatch import receiver
-from django.core.cache import cache
+from .cache_keys import invalidate_candidates, invalidate_party_rows, invalidate_party_votes
 from .models import Candidate, PartyVoteCount, Vote
 
+# Invalidate after commit so a concurrent read can't re-cache the old rows
+# under the new generation.
 
 
 @receiver([post_save, post_delete], sender=Candidate)
 def clear_candidates_cache(sender, instance, **kwargs):
     election_type = instance.election_type
-    cache.delete(f"candidates_{election_type}")
+    transaction.on_commit(lambda: invalidate_candidates(election_type))
+    transaction.on_commit(lambda: invalidate_party_rows(election_type))
 
 
 
 @receiver([post_save, post_delete], sender=PartyVoteCount)
 def clear_party_votes_cache(sender, instance, **kwargs):
     election_type = instance.election_type
-    cache.delete(f"party_votes_{election_type}")
+    transaction.on_commit(lambda: invalidate_party_votes(election_type))
+    transaction.on_commit(lambda: invalidate_party_rows(election_type))
 
 
 
-@receiver(post_save, sender=Vote)
+@receiver([post_save, post_delete], sender=Vote)
 def clear_votes_cache_on_vote(sender, instance, **kwargs):
-    election_type = instance.candidate.election_type
-    cache.delete(f"party_votes_{election_type}")
+    election_type = instance.election_type
+    transaction.on_commit(lambda: invalidate_party_votes(election_type))
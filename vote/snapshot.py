@@ -0,0 +1,181 @@
+"""
+Materialized per-election results snapshot.
+
+One cache entry per election holds the ranked results already encoded as
+JSON, in two shapes:
+
+* ``party_votes``: the unfiltered /vote/party-votes/<type>/ list, byte for
+  byte what PartyVoteCountSerializer would render;
+* ``document``: /vote/results/<type>/, which adds rank, percentage and the
+  total.
+
+The request path only reads those bytes. The snapshot is refreshed
+incrementally: the broadcaster (vote/broadcast.py) passes in the live totals
+it reads every tick, and the per-party rows (names, image URLs) are reused
+from the previous snapshot. They are reloaded when a party appears in the
+totals, when a Candidate or PartyVoteCount changes (the PARTY_ROWS
+generation, bumped by vote.signals) and in any case after ROWS_MAX_AGE
+seconds, for writes that bypass the signals. A party with votes but no
+PartyVoteCount row yet (write-behind, before the first flush) gets a
+placeholder row. With no broadcaster running, a request that finds the
+snapshot more than RESULTS_SNAPSHOT_MAX_LAG seconds behind the results
+generation rebuilds it, holding a short lock; other requests keep serving
+the previous snapshot in the meantime.
+"""
+import time
+
+from django.conf import settings
+from django.core.cache import cache
+
+from .cache_keys import PARTY_ROWS, PARTY_VOTES, generation
+from .counters import party_totals
+from .fast_rows import dumps, party_vote_rows
+from .models import PartyVoteCount
+from .serializers import PLACEHOLDER_IMAGE
+
+# Seconds a snapshot's party rows are reused before being reloaded anyway
+ROWS_MAX_AGE = 60
+# A snapshot nobody refreshes or reads for this long is dropped; the next
+# request rebuilds it
+TIMEOUT = 60 * 60
+# Seconds a rebuild may hold the lock, and that requests finding no
+# snapshot wait for the one rebuilding it
+LOCK_TIMEOUT = 5
+COLD_WAIT = 2.0
+
+
+def snapshot_key(election_type):
+    return f"results_snapshot_{election_type}"
+
+
+def _lock_key(election_type):
+    return f"results_snapshot_lock_{election_type}"
+
+
+def _load_rows(election_type):
+    rows = party_vote_rows(PartyVoteCount.objects.filter(election_type=election_type))
+    return {row["party"]: row for row in rows}
+
+
+def _rows(election_type, previous, totals):
+    """
+    Returns (rows, rows_version, rows_loaded_at): the previous snapshot's
+    rows if still good for these totals, else freshly loaded ones.
+    """
+    rows_version = generation(PARTY_ROWS, election_type)
+    if (
+        previous
+        and previous.get("rows_version") == rows_version
+        and time.time() - previous["rows_loaded_at"] < ROWS_MAX_AGE
+        and all(party in previous["rows"] for party in totals)
+    ):
+        return previous["rows"], rows_version, previous["rows_loaded_at"]
+
+    rows = _load_rows(election_type)
+    for party in totals:
+        if party not in rows:
+            rows[party] = {
+                "party": party,
+                "vote_count": 0,
+                "election_type": election_type,
+                "party_image_url": PLACEHOLDER_IMAGE,
+            }
+    return rows, rows_version, time.time()
+
+
+def refresh(election_type, totals=None, version=None):
+    """
+    Rebuilds and stores the snapshot. `totals` ({party: count}) and the
+    results `version` they correspond to can be passed in by a caller that
+    already has them.
+    """
+    if version is None:
+        # Read before the totals: a vote landing in between leaves the
+        # snapshot marked stale rather than wrongly marked current.
+        version = generation(PARTY_VOTES, election_type)
+    if totals is None:
+        totals = party_totals(election_type)
+
+    previous = cache.get(snapshot_key(election_type))
+    rows, rows_version, rows_loaded_at = _rows(election_type, previous, totals)
+
+    for party, row in rows.items():
+        row["vote_count"] = totals.get(party, 0)
+    ranked = sorted(rows.values(), key=lambda row: (-row["vote_count"], row["party"]))
+    total_votes = sum(row["vote_count"] for row in ranked)
+
+    snapshot = {
+        "version": version,
+        "built_at": time.time(),
+        "rows": rows,
+        "rows_version": rows_version,
+        "rows_loaded_at": rows_loaded_at,
+        "party_votes": dumps(ranked),
+        "document": dumps({
+            "election_type": election_type,
+            "version": version,
+            "total_votes": total_votes,
+            "parties": [
+                {
+                    "rank": rank,
+                    "party": row["party"],
+                    "vote_count": row["vote_count"],
+                    "percentage": round(row["vote_count"] * 100 / total_votes, 2) if total_votes else 0.0,
+                    "party_image_url": row["party_image_url"],
+                }
+                for rank, row in enumerate(ranked, 1)
+            ],
+        }),
+    }
+    cache.set(snapshot_key(election_type), snapshot, timeout=TIMEOUT)
+    return snapshot
+
+
+def is_usable(snapshot, current_version):
+    """
+    True if the snapshot can be served as is: current, or behind by less
+    than RESULTS_SNAPSHOT_MAX_LAG seconds.
+    """
+    if snapshot is None:
+        return False
+    if snapshot["version"] == current_version:
+        return True
+    return time.time() - snapshot["built_at"] < getattr(settings, "RESULTS_SNAPSHOT_MAX_LAG", 1.0)
+
+
+def _wait_for(election_type):
+    """Polls for a snapshot another request is building, up to COLD_WAIT seconds."""
+    deadline = time.monotonic() + COLD_WAIT
+    delay = 0.01
+    while time.monotonic() < deadline:
+        time.sleep(delay)
+        delay = min(delay * 2, 0.1)
+        snapshot = cache.get(snapshot_key(election_type))
+        if snapshot is not None:
+            return snapshot
+    return None
+
+
+def _refresh_locked(election_type, version):
+    try:
+        return refresh(election_type, version=version)
+    finally:
+        cache.delete(_lock_key(election_type))
+
+
+def get(election_type):
+    current = generation(PARTY_VOTES, election_type)
+    snapshot = cache.get(snapshot_key(election_type))
+    if snapshot is None:
+        # One request builds a missing snapshot; the rest wait for it
+        if cache.add(_lock_key(election_type), 1, timeout=LOCK_TIMEOUT):
+            return _refresh_locked(election_type, current)
+        snapshot = _wait_for(election_type)
+        if snapshot is None:
+            # The builder is slow or gone: don't leave the request empty-handed
+            snapshot = refresh(election_type, version=current)
+        return snapshot
+
+    if not is_usable(snapshot, current) and cache.add(_lock_key(election_type), 1, timeout=LOCK_TIMEOUT):
+        snapshot = _refresh_locked(election_type, current)
+    return snapshot
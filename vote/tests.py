@@ -1,3 +1,1481 @@
-from django.test import TestCase
+import csv
+import io
+import json
+import os
+import tempfile
+import time
+from datetime import datetime, timezone as dt_timezone
+from unittest import mock, skipIf
 
-# Create your tests here.
+import cloudinary
+from asgiref.sync import sync_to_async
+from asgiref.testing import ApplicationCommunicator
+from channels.layers import get_channel_layer
+from channels.routing import URLRouter
+from django.core.cache import cache
+from django.core.management import call_command
+from django.core.management.base import CommandError
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.db import DEFAULT_DB_ALIAS, IntegrityError, connection, connections, transaction
+from django.test import AsyncRequestFactory, TestCase, TransactionTestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from rest_framework.renderers import JSONRenderer
+from rest_framework.test import APIClient
+from rest_framework_simplejwt.tokens import AccessToken
+
+try:
+    import fakeredis
+except ImportError:  # only needed for the write-behind tests
+    fakeredis = None
+
+try:
+    import psycopg_pool
+except ImportError:  # only needed for the connection pool tests
+    psycopg_pool = None
+
+from accounts.models import User
+from election import admission, db_router, metrics
+from . import (
+    cache_keys, candidate_cache, fast_rows, history, partitioning, reconcile, rollup, snapshot, writebehind,
+)
+from .async_views import AsyncCandidateListView, AsyncPartyVoteListView
+from .broadcast import TallyBroadcaster, TallyCoalescer
+from .counters import compact_shards, increment_party_votes, party_totals, with_live_totals
+from .ingest import ingest_ballots
+from .models import (
+    Candidate, PartyVoteCount, PartyVoteShard, RegionVoteCount, TallyFlush, TallyRollup, Vote, VoteBucket,
+)
+from .routing import websocket_urlpatterns
+from .serializers import PLACEHOLDER_IMAGE, CandidateSerializer, PartyVoteCountSerializer
+from .services import AlreadyVotedError, cast_vote
+
+
+LOCMEM_CACHES = {
+    "default": {"BACKEND": "django.core.cache.backends.locmem.LocMemCache"}
+}
+
+# Image URLs are built locally but need a cloud name to build them with
+if not cloudinary.config().cloud_name:
+    cloudinary.config(cloud_name="test-cloud")
+
+
+def make_candidate(party="APC", election_type="presidential", name=None):
+    return Candidate.objects.create(
+        election_type=election_type,
+        name=name or f"{party} candidate",
+        party=party,
+        party_image=f"{party.lower()}.png",
+        age=60,
+        image="candidate.png",
+    )
+
+
+def make_user(n=1, **fields):
+    return User.objects.create_user(
+        national_id=f"{n:011d}",
+        password="secret-pass",
+        vin=f"{n:017d}",
+        first_name="Test",
+        last_name=str(n),
+        **fields,
+    )
+
+
+TRANSACTION_STATEMENTS = ("BEGIN", "COMMIT", "ROLLBACK", "SAVEPOINT", "RELEASE")
+
+
+class QueryBudgetMixin:
+    def assertQueryBudget(self, budget, func):
+        """
+        Runs func() and fails if it issued more than `budget` statements,
+        not counting transaction control (BEGIN/COMMIT/SAVEPOINT...).
+        """
+        with CaptureQueriesContext(connection) as ctx:
+            result = func()
+        statements = [
+            q["sql"] for q in ctx.captured_queries
+            if not q["sql"].lstrip().upper().startswith(TRANSACTION_STATEMENTS)
+        ]
+        self.assertLessEqual(len(statements), budget, "\n".join(statements))
+        return result
+
+
+@override_settings(CACHES=LOCMEM_CACHES)
+class CastVoteTests(QueryBudgetMixin, TestCase):
+    QUERY_BUDGET = 3
+
+    def setUp(self):
+        self.candidate = make_candidate("APC")
+        self.user = make_user()
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def cast(self, candidate_id):
+        return self.client.post("/vote/cast/", {"candidate_id": candidate_id}, format="json")
+
+    def test_cast_stays_within_query_budget(self):
+        response = self.assertQueryBudget(self.QUERY_BUDGET, lambda: self.cast(self.candidate.id))
+
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(Vote.objects.get().candidate, self.candidate)
+        self.assertEqual(PartyVoteCount.objects.get(party="APC").vote_count, 1)
+
+    def test_second_vote_is_rejected_and_not_counted(self):
+        self.cast(self.candidate.id)
+        other = make_candidate("PDP")
+
+        # The failed INSERT, then the lookup that tells a second vote apart
+        response = self.assertQueryBudget(self.QUERY_BUDGET, lambda: self.cast(other.id))
+
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(response.json(), {"error": "You have already voted in this election."})
+        self.assertEqual(Vote.objects.count(), 1)
+        self.assertEqual(party_totals("presidential"), {"APC": 1})
+
+    def test_other_integrity_errors_are_not_taken_for_a_second_vote(self):
+        # e.g. the candidate deleted between the lookup and the INSERT
+        with mock.patch.object(Vote.objects, "create", side_effect=IntegrityError("FOREIGN KEY constraint failed")):
+            with self.assertRaisesMessage(IntegrityError, "FOREIGN KEY"):
+                cast_vote(self.user, self.candidate)
+        self.assertEqual(party_totals("presidential"), {})
+
+    def test_unknown_candidate(self):
+        response = self.cast(999)
+
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(response.json(), {"candidate_id": ["Candidate does not exist."]})
+
+
+@skipIf(fakeredis is None, "fakeredis is not installed")
+@override_settings(
+    CACHES=LOCMEM_CACHES,
+    ADMISSION_CONTROL={"cast": {"rate": 100, "burst": 100, "client_rate": 0.01, "client_burst": 2, "concurrency": 3}},
+)
+class CastAdmissionTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        admission.admission_requests.clear()
+        self.redis = fakeredis.FakeRedis()
+        for patcher in (
+            mock.patch.object(admission, "enabled", return_value=True),
+            mock.patch.object(admission, "get_redis", return_value=self.redis),
+        ):
+            patcher.start()
+            self.addCleanup(patcher.stop)
+        self.candidate = make_candidate("APC")
+
+    def cast(self, user):
+        client = APIClient()
+        client.force_authenticate(user)
+        return client.post("/vote/cast/", {"candidate_id": self.candidate.id}, format="json")
+
+    def test_admitted_request_frees_its_slot(self):
+        self.assertEqual(self.cast(make_user(1)).status_code, 201)
+
+        self.assertEqual(self.redis.zcard("admission:cast:inflight"), 0)
+        self.assertEqual(admission.admission_requests.value("cast", "admitted"), 1)
+
+    def test_client_over_its_rate_gets_429(self):
+        voter = make_user(1)
+        statuses = [self.cast(voter).status_code for _ in range(3)]
+
+        self.assertEqual(statuses, [201, 400, 429])
+        response = self.cast(voter)
+        self.assertEqual(response["Retry-After"], "100")
+        self.assertEqual(self.cast(make_user(2)).status_code, 201)
+        self.assertEqual(admission.admission_requests.value("cast", "rate_limited"), 2)
+
+    def test_idempotent_retries_are_not_charged(self):
+        client = APIClient()
+        client.force_authenticate(make_user(1))
+
+        def cast():
+            return client.post(
+                "/vote/cast/", {"candidate_id": self.candidate.id}, format="json", HTTP_IDEMPOTENCY_KEY="retry-1"
+            )
+
+        # client_burst is 2: a third charged request would be refused
+        statuses = [cast().status_code for _ in range(4)]
+
+        self.assertEqual(statuses, [201, 201, 201, 201])
+        self.assertEqual(admission.admission_requests.value("cast", "admitted"), 1)
+        self.assertEqual(Vote.objects.count(), 1)
+
+    def test_full_concurrency_gets_429_before_any_work(self):
+        self.redis.zadd("admission:cast:inflight", {f"busy-{n}": time.time() for n in range(3)})
+        voter = make_user(1)
+
+        response = self.cast(voter)
+
+        self.assertEqual((response.status_code, response["Retry-After"]), (429, "1"))
+        self.assertFalse(Vote.objects.exists())
+        self.assertEqual(admission.admission_requests.value("cast", "overloaded"), 1)
+
+    def test_stale_slots_expire(self):
+        self.redis.zadd("admission:cast:inflight", {f"dead-{n}": time.time() - 60 for n in range(3)})
+
+        self.assertEqual(self.cast(make_user(1)).status_code, 201)
+
+    def test_limiter_outage_lets_requests_through(self):
+        self.redis.eval = mock.Mock(side_effect=ConnectionError("redis down"))
+
+        with self.assertLogs("election.admission", "WARNING"):
+            response = self.cast(make_user(1))
+
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(admission.admission_requests.value("cast", "error"), 1)
+
+
+REPLICA = "replica"
+
+
+@override_settings(CACHES=LOCMEM_CACHES, DATABASE_REPLICAS=[REPLICA])
+class ReplicaRoutingTests(TransactionTestCase):
+    """
+    The replica stand-in is a second SQLite database holding a copy of the
+    primary taken in setUp, so it lags behind every write made afterwards.
+    It's added after the test runner has set up the test databases, which
+    don't include it.
+    """
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.replica_dir = tempfile.TemporaryDirectory()
+        connections.settings[REPLICA] = {
+            **connections.settings[DEFAULT_DB_ALIAS],
+            "NAME": os.path.join(cls.replica_dir.name, "replica.sqlite3"),
+        }
+        cls.databases = cls.databases | {REPLICA}
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.databases = cls.databases - {REPLICA}
+        connections[REPLICA].close()
+        del connections[REPLICA]
+        del connections.settings[REPLICA]
+        cls.replica_dir.cleanup()
+        super().tearDownClass()
+
+    def setUp(self):
+        cache.clear()
+        self.candidate = make_candidate("APC")
+        self.voter, self.other = make_user(1), make_user(2)
+        for alias in (DEFAULT_DB_ALIAS, REPLICA):
+            connections[alias].ensure_connection()
+        connections[DEFAULT_DB_ALIAS].connection.backup(connections[REPLICA].connection)
+
+    def get_candidates(self, user):
+        client = APIClient()
+        client.force_authenticate(user)
+        # So the view reads the database (but keeps any pin)
+        cache.delete_many([cache_keys.candidates_key("presidential"), cache_keys.user_vote_key("presidential", user.pk)])
+        with CaptureQueriesContext(connections[REPLICA]) as replica:
+            response = client.get("/vote/candidates/presidential/")
+        return response.json()[0]["user_voted"], len(replica.captured_queries) > 0
+
+    def test_reads_go_to_the_replica_and_writes_to_the_primary(self):
+        with CaptureQueriesContext(connections[REPLICA]) as replica:
+            response = APIClient().get("/vote/regions/presidential/")
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(replica.captured_queries)
+
+        client = APIClient()
+        client.force_authenticate(self.voter)
+        with CaptureQueriesContext(connections[REPLICA]) as replica:
+            response = client.post("/vote/cast/", {"candidate_id": self.candidate.id}, format="json")
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(replica.captured_queries, [])
+        self.assertEqual(Vote.objects.using(DEFAULT_DB_ALIAS).count(), 1)
+        self.assertEqual(Vote.objects.using(REPLICA).count(), 0)
+
+    def test_voter_reads_their_own_vote_after_casting(self):
+        self.assertEqual(self.get_candidates(self.voter), (False, True))
+        client = APIClient()
+        client.force_authenticate(self.voter)
+        client.post("/vote/cast/", {"candidate_id": self.candidate.id}, format="json")
+
+        # Pinned to the primary: sees the vote the lagging replica lacks
+        self.assertEqual(self.get_candidates(self.voter), (True, False))
+        # Other voters still read the replica
+        self.assertEqual(self.get_candidates(self.other), (False, True))
+
+        cache.delete(db_router.pin_key(self.voter.pk))  # the window has passed
+        self.assertEqual(self.get_candidates(self.voter), (False, True))
+
+    def test_request_metrics_count_replica_queries(self):
+        route = "vote/regions/<str:election_type>/"
+        before = metrics.db_queries.total(route)
+        with CaptureQueriesContext(connections[REPLICA]) as replica, \
+                CaptureQueriesContext(connections[DEFAULT_DB_ALIAS]) as primary:
+            APIClient().get("/vote/regions/presidential/")
+
+        self.assertTrue(replica.captured_queries)
+        self.assertEqual(
+            metrics.db_queries.total(route) - before,
+            len(replica.captured_queries) + len(primary.captured_queries),
+        )
+
+    def test_reads_outside_requests_use_the_primary(self):
+        self.assertEqual(db_router.ReplicaRouter().db_for_read(Vote), DEFAULT_DB_ALIAS)
+
+
+@override_settings(CACHES=LOCMEM_CACHES)
+class IdempotentCastTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.candidate = make_candidate("APC")
+        self.user = make_user()
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def cast(self, candidate_id, key="retry-1"):
+        return self.client.post(
+            "/vote/cast/", {"candidate_id": candidate_id}, format="json", HTTP_IDEMPOTENCY_KEY=key
+        )
+
+    def test_retry_replays_the_first_response_without_queries(self):
+        first = self.cast(self.candidate.id)
+
+        with self.assertNumQueries(0):
+            retry = self.cast(self.candidate.id)
+
+        self.assertEqual(first.status_code, 201)
+        self.assertEqual((retry.status_code, retry.json()), (201, first.json()))
+        self.assertEqual(retry["Idempotent-Replayed"], "true")
+        self.assertEqual(Vote.objects.count(), 1)
+
+    def test_new_key_is_a_new_request(self):
+        self.cast(self.candidate.id)
+
+        self.assertEqual(self.cast(self.candidate.id, key="retry-2").status_code, 400)
+
+    def test_key_reused_for_another_request_is_rejected(self):
+        self.cast(self.candidate.id)
+
+        response = self.cast(make_candidate("PDP").id)
+
+        self.assertEqual(response.status_code, 422)
+
+    def test_keys_are_scoped_to_the_voter(self):
+        self.cast(self.candidate.id)
+        other = APIClient()
+        other.force_authenticate(make_user(2))
+
+        response = other.post(
+            "/vote/cast/", {"candidate_id": self.candidate.id}, format="json", HTTP_IDEMPOTENCY_KEY="retry-1"
+        )
+
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(Vote.objects.count(), 2)
+
+    @override_settings(IDEMPOTENCY_WAIT=0.05)
+    def test_duplicate_waits_for_the_request_in_flight(self):
+        from .idempotency import PENDING, _cache_key, fingerprint
+
+        key = _cache_key("cast", self.user.pk, "retry-1")
+        claim = {"state": PENDING, "fingerprint": fingerprint({"candidate_id": self.candidate.id})}
+        cache.set(key, claim)
+
+        still_running = self.cast(self.candidate.id)
+        self.assertEqual((still_running.status_code, still_running["Retry-After"]), (409, "1"))
+
+        done = {**claim, "state": "done", "status": 201, "data": {"message": "Vote submitted successfully!"}}
+        with mock.patch("vote.idempotency.time.sleep", side_effect=lambda _: cache.set(key, done)):
+            response = self.cast(self.candidate.id)
+        self.assertEqual(response.status_code, 201)
+        self.assertFalse(Vote.objects.exists())
+
+    def test_server_error_releases_the_key(self):
+        with mock.patch("vote.views.cast_vote", side_effect=RuntimeError("db down")):
+            with self.assertRaises(RuntimeError):
+                self.cast(self.candidate.id)
+
+        self.assertEqual(self.cast(self.candidate.id).status_code, 201)
+
+
+@override_settings(CACHES=LOCMEM_CACHES)
+class ShardedCounterTests(TestCase):
+    def setUp(self):
+        cache.clear()
+
+    def test_unsharded_increments_party_row(self):
+        increment_party_votes("presidential", "APC", "apc.png")
+        increment_party_votes("presidential", "APC", "apc.png", amount=2)
+
+        self.assertEqual(PartyVoteCount.objects.get(party="APC").vote_count, 3)
+        self.assertFalse(PartyVoteShard.objects.exists())
+
+    @override_settings(VOTE_COUNTER_SHARDS=4)
+    def test_sharded_votes_are_summed_and_compacted(self):
+        for _ in range(20):
+            increment_party_votes("presidential", "APC", "apc.png")
+        increment_party_votes("presidential", "PDP", "pdp.png")
+
+        self.assertEqual(PartyVoteCount.objects.get(party="APC").vote_count, 0)
+        self.assertLessEqual(PartyVoteShard.objects.filter(party="APC").count(), 4)
+        self.assertEqual(party_totals("presidential"), {"APC": 20, "PDP": 1})
+
+        self.assertEqual(compact_shards(), 21)
+        self.assertEqual(PartyVoteCount.objects.get(party="APC").vote_count, 20)
+        self.assertEqual(party_totals("presidential"), {"APC": 20, "PDP": 1})
+
+    @override_settings(VOTE_COUNTER_SHARDS=4)
+    def test_party_vote_list_reads_live_totals(self):
+        increment_party_votes("presidential", "PDP", "pdp.png", amount=2)
+        for _ in range(5):
+            increment_party_votes("presidential", "APC", "apc.png")
+
+        response = APIClient().get("/vote/party-votes/presidential/")
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(
+            [(row["party"], row["vote_count"]) for row in response.json()],
+            [("APC", 5), ("PDP", 2)],
+        )
+
+
+@skipIf(fakeredis is None, "fakeredis is not installed")
+@override_settings(CACHES=LOCMEM_CACHES, VOTE_TALLY_WRITE_BEHIND=True)
+class WriteBehindTallyTests(TestCase):
+    def setUp(self):
+        self.redis = fakeredis.FakeRedis()
+        patcher = mock.patch.object(writebehind, "get_redis", return_value=self.redis)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        make_candidate("APC")
+        make_candidate("PDP")
+
+    def cast(self, party, times=1):
+        with self.captureOnCommitCallbacks(execute=True):
+            for _ in range(times):
+                increment_party_votes("presidential", party, f"{party.lower()}.png")
+
+    def test_cast_only_touches_redis_until_flushed(self):
+        with self.assertNumQueries(0):
+            self.cast("APC", 3)
+        self.cast("PDP")
+
+        self.assertFalse(PartyVoteCount.objects.exists())
+        self.assertEqual(party_totals("presidential"), {"APC": 3, "PDP": 1})
+
+        self.assertEqual(writebehind.flush_all(), {"presidential": 4, "governorship": 0, "senatorial": 0})
+        self.assertEqual(PartyVoteCount.objects.get(party="APC").vote_count, 3)
+        self.assertEqual(PartyVoteCount.objects.get(party="PDP").party_image.public_id, "pdp")
+        self.assertEqual(party_totals("presidential"), {"APC": 3, "PDP": 1})
+
+    def test_rolled_back_cast_is_not_counted(self):
+        user = make_user()
+        candidate = Candidate.objects.get(party="APC")
+        with self.captureOnCommitCallbacks(execute=True):
+            with self.assertRaises(RuntimeError), transaction.atomic():
+                cast_vote(user, candidate)
+                raise RuntimeError("rolled back after counting")
+            cast_vote(make_user(2), candidate)
+
+        self.assertEqual(Vote.objects.count(), 1)
+        self.assertEqual(party_totals("presidential"), {"APC": 1})
+        self.assertEqual(writebehind.flush("presidential", self.redis), 1)
+
+    def test_crash_after_commit_does_not_double_count(self):
+        self.cast("APC", 2)
+        with mock.patch.object(writebehind, "_publish_base", side_effect=RuntimeError("crash")):
+            with self.assertRaises(RuntimeError):
+                writebehind.flush("presidential", self.redis)
+
+        # The batch is in the database and still in Redis; reads count it once
+        self.assertEqual(PartyVoteCount.objects.get(party="APC").vote_count, 2)
+        self.cast("APC")
+        self.assertEqual(writebehind.flush("presidential", self.redis), 0)
+        self.assertEqual(writebehind.flush("presidential", self.redis), 1)
+        self.assertEqual(PartyVoteCount.objects.get(party="APC").vote_count, 3)
+        self.assertEqual(TallyFlush.objects.count(), 1)
+
+    def test_crash_before_commit_reapplies_claimed_batch(self):
+        self.cast("APC", 2)
+        with mock.patch.object(PartyVoteCount.objects, "bulk_create", side_effect=RuntimeError("crash")):
+            with self.assertRaises(RuntimeError):
+                writebehind.flush("presidential", self.redis)
+
+        self.assertFalse(PartyVoteCount.objects.exists())
+        self.assertEqual(party_totals("presidential"), {"APC": 2})
+        self.assertEqual(writebehind.flush("presidential", self.redis), 2)
+        self.assertEqual(PartyVoteCount.objects.get(party="APC").vote_count, 2)
+
+    def test_flusher_that_lost_the_lock_commits_nothing(self):
+        self.cast("APC", 2)
+        create = TallyFlush.objects.create
+
+        def expire_and_create(**kwargs):
+            # The lock expires mid-batch and a second flusher takes it
+            self.redis.set(writebehind.LOCK_KEY, "other")
+            return create(**kwargs)
+
+        with mock.patch.object(TallyFlush.objects, "create", side_effect=expire_and_create):
+            self.assertIsNone(writebehind.flush_all(self.redis))
+
+        self.assertFalse(PartyVoteCount.objects.exists())
+        self.assertEqual(self.redis.get(writebehind.LOCK_KEY), b"other")
+        self.redis.delete(writebehind.LOCK_KEY)
+        self.assertEqual(writebehind.flush_all(self.redis)["presidential"], 2)
+        self.assertEqual(PartyVoteCount.objects.get(party="APC").vote_count, 2)
+
+
+@override_settings(CACHES=LOCMEM_CACHES)
+class BulkIngestTests(TestCase):
+    def setUp(self):
+        self.apc = make_candidate("APC")
+        self.pdp = make_candidate("PDP")
+        self.senate = make_candidate("APC", election_type="senatorial")
+        self.voters = [make_user(n) for n in range(1, 5)]
+        cast_vote(self.voters[3], self.pdp)
+
+    def ndjson(self, *rows):
+        return io.BytesIO(b"\n".join(
+            row if isinstance(row, bytes) else json.dumps(row).encode() for row in rows
+        ))
+
+    def test_ndjson_ballots_are_inserted_and_counted_per_party(self):
+        v1, v2, v3, v4 = self.voters
+        stream = self.ndjson(
+            {"national_id": v1.national_id, "candidate_id": self.apc.id},
+            {"user_id": str(v2.id), "candidate_id": self.apc.id},
+            {"national_id": v3.national_id, "candidate_id": self.pdp.id},
+            {"national_id": v1.national_id, "candidate_id": self.senate.id},
+            {"national_id": v1.national_id, "candidate_id": self.pdp.id},
+            {"national_id": v4.national_id, "candidate_id": self.apc.id},
+            {"national_id": "99999999999", "candidate_id": self.apc.id},
+            {"national_id": v3.national_id, "candidate_id": 999},
+            b"{not json",
+        )
+
+        report = ingest_ballots(stream, "ndjson", batch_size=3)
+
+        self.assertEqual(report.rows, 9)
+        self.assertEqual(report.inserted, 4)
+        self.assertEqual([e["line"] for e in report.errors], [5, 6, 7, 8, 9])
+        self.assertIn("unique_vote_per_election", report.errors[0]["error"])
+        self.assertEqual(party_totals("presidential"), {"APC": 2, "PDP": 2})
+        self.assertEqual(party_totals("senatorial"), {"APC": 1})
+        self.assertEqual(Vote.objects.count(), 5)
+
+    def test_upload_endpoint_accepts_csv(self):
+        v1, v2 = self.voters[:2]
+        admin = User.objects.create_superuser(national_id="00000000000", password="x", vin="A" * 17)
+        client = APIClient()
+        client.force_authenticate(admin)
+        upload = SimpleUploadedFile(
+            "unit-042.csv",
+            f"national_id,candidate_id\n{v1.national_id},{self.apc.id}\n{v2.national_id},abc\n".encode(),
+        )
+
+        response = client.post("/vote/bulk/", {"file": upload}, format="multipart")
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()["inserted"], 1)
+        self.assertEqual(response.json()["errors"], [{"line": 3, "error": "Candidate does not exist."}])
+
+    def test_undecodable_and_malformed_lines_are_reported(self):
+        v1, v2, v3 = self.voters[:3]
+        ndjson = self.ndjson(
+            {"national_id": v1.national_id, "candidate_id": self.apc.id},
+            b'{"national_id": "caf\xe9"}',
+            {"national_id": v2.national_id, "candidate_id": self.apc.id},
+        )
+        report = ingest_ballots(ndjson, "ndjson")
+        self.assertEqual((report.inserted, report.errors), (2, [{"line": 2, "error": "Not valid UTF-8."}]))
+
+        csv_upload = io.BytesIO(
+            b"national_id,candidate_id\n"
+            b"caf\xe9,1\n"
+            + b"x" * (csv.field_size_limit() + 1) + b",1\n"
+            + f"{v3.national_id},{self.pdp.id}\n".encode()
+        )
+        report = ingest_ballots(csv_upload, "csv")
+        self.assertEqual(report.inserted, 1)
+        self.assertEqual([e["line"] for e in report.errors], [2, 3])
+        self.assertEqual(report.errors[0]["error"], "Not valid UTF-8.")
+        self.assertTrue(report.errors[1]["error"].startswith("Invalid CSV: field larger than field limit"))
+
+    def test_upload_endpoint_requires_admin(self):
+        client = APIClient()
+        client.force_authenticate(self.voters[0])
+
+        self.assertEqual(client.post("/vote/bulk/", {}, format="multipart").status_code, 403)
+
+
+@override_settings(CACHES=LOCMEM_CACHES)
+class CandidateListCacheTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.apc = make_candidate("APC", name="Ada")
+        self.pdp = make_candidate("PDP", name="Bola")
+        self.user = make_user()
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def test_response_matches_serializer_output(self):
+        cast_vote(self.user, self.pdp)
+
+        response = self.client.get("/vote/candidates/presidential/")
+
+        expected = CandidateSerializer(
+            Candidate.objects.order_by("name"),
+            many=True,
+            context={"user_votes": {self.pdp.id}, "party_votes": {("presidential", "PDP"): 1}},
+        ).data
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.content, JSONRenderer().render(expected))
+
+    def test_list_is_cached_once_and_overlaid_per_user(self):
+        other = APIClient()
+        other.force_authenticate(make_user(2))
+        other.get("/vote/candidates/presidential/")
+
+        with self.assertNumQueries(1):  # only this voter's own vote lookup
+            self.client.get("/vote/candidates/presidential/")
+        self.client.post("/vote/cast/", {"candidate_id": self.apc.id}, format="json")
+
+        with self.assertNumQueries(0):
+            rows = self.client.get("/vote/candidates/presidential/").json()
+        self.assertEqual([(r["name"], r["user_voted"]) for r in rows], [("Ada", True), ("Bola", False)])
+        self.assertIsNotNone(cache.get(cache_keys.candidates_key("presidential")))
+        self.assertIsNone(cache.get("candidates_presidential_%s" % self.user.id))
+
+
+@override_settings(CACHES=LOCMEM_CACHES, RESULTS_SNAPSHOT_MAX_LAG=0)
+class CacheGenerationTests(TestCase):
+    def setUp(self):
+        cache.clear()
+
+    def test_vote_moves_party_votes_to_new_generation(self):
+        candidate = make_candidate("APC")
+        client = APIClient()
+        self.assertEqual(client.get("/vote/party-votes/presidential/").json(), [])
+        old_key = cache_keys.party_votes_key("presidential")
+
+        with self.captureOnCommitCallbacks(execute=True):
+            cast_vote(make_user(), candidate)
+
+        self.assertNotEqual(cache_keys.party_votes_key("presidential"), old_key)
+        self.assertEqual(
+            [row["vote_count"] for row in client.get("/vote/party-votes/presidential/").json()], [1]
+        )
+
+    def test_candidate_change_invalidates_candidate_list_only(self):
+        party_votes = cache_keys.party_votes_key("presidential")
+        candidates = cache_keys.candidates_key("presidential")
+
+        with self.captureOnCommitCallbacks(execute=True):
+            make_candidate("APC")
+
+        self.assertNotEqual(cache_keys.candidates_key("presidential"), candidates)
+        self.assertEqual(cache_keys.party_votes_key("presidential"), party_votes)
+
+
+@override_settings(
+    CACHES=LOCMEM_CACHES,
+    CHANNEL_LAYERS={"default": {"BACKEND": "channels.layers.InMemoryChannelLayer"}},
+)
+class LiveTallyBroadcastTests(TestCase):
+    def setUp(self):
+        cache.clear()
+
+    def test_coalescer_sends_versioned_deltas(self):
+        coalescer = TallyCoalescer()
+
+        first = coalescer.update("presidential", {"APC": 3, "PDP": 1})
+        second = coalescer.update("presidential", {"APC": 5, "PDP": 1})
+
+        self.assertEqual(first, {
+            "election_type": "presidential", "version": 1, "base_version": 0,
+            "changes": {"APC": 3, "PDP": 1},
+        })
+        self.assertEqual(second["changes"], {"APC": 5})
+        self.assertEqual((second["base_version"], second["version"]), (1, 2))
+        self.assertIsNone(coalescer.update("presidential", {"APC": 5, "PDP": 1}))
+        # A restarted broadcaster continues from the cached snapshot
+        self.assertEqual(TallyCoalescer().update("presidential", {"APC": 6})["version"], 3)
+
+    def record_votes(self, party, count):
+        for _ in range(count):
+            increment_party_votes("presidential", party, f"{party.lower()}.png")
+            cache_keys.invalidate_party_votes("presidential")
+
+    async def receive_json(self, communicator):
+        message = await communicator.receive_output()
+        self.assertEqual(message["type"], "websocket.send")
+        return json.loads(message["text"])
+
+    async def test_burst_of_votes_is_published_as_one_message(self):
+        # channels.testing needs daphne, so drive the ASGI app directly
+        communicator = ApplicationCommunicator(URLRouter(websocket_urlpatterns), {
+            "type": "websocket", "path": "/ws/votes/presidential/",
+            "headers": [], "query_string": b"", "subprotocols": [],
+        })
+        open_sockets = metrics.websocket_connections.value("election_presidential")
+        await communicator.send_input({"type": "websocket.connect"})
+        self.assertEqual((await communicator.receive_output())["type"], "websocket.accept")
+        self.assertEqual(metrics.websocket_connections.value("election_presidential"), open_sockets + 1)
+        broadcaster = TallyBroadcaster(get_channel_layer())
+
+        await sync_to_async(self.record_votes)("APC", 50)
+        await sync_to_async(self.record_votes)("PDP", 20)
+        await broadcaster.tick()
+
+        message = await self.receive_json(communicator)
+        self.assertEqual(message["type"], "party_counts_update")
+        self.assertEqual(message["payload"]["changes"], {"APC": 50, "PDP": 20})
+        self.assertTrue(await communicator.receive_nothing())
+
+        # Nothing new: the next tick publishes nothing
+        self.assertEqual(await broadcaster.tick(), [])
+
+        await communicator.send_input({"type": "websocket.receive", "text": '{"type": "resync"}'})
+        snapshot = await self.receive_json(communicator)
+        self.assertEqual(snapshot["type"], "party_counts_snapshot")
+        self.assertEqual(snapshot["payload"]["version"], 1)
+        self.assertEqual(snapshot["payload"]["counts"], {"APC": 50, "PDP": 20})
+
+        await communicator.send_input({"type": "websocket.disconnect", "code": 1000})
+        await communicator.wait()
+        self.assertEqual(metrics.websocket_connections.value("election_presidential"), open_sockets)
+
+
+    async def test_unknown_election_type_is_refused(self):
+        communicator = ApplicationCommunicator(URLRouter(websocket_urlpatterns), {
+            "type": "websocket", "path": "/ws/votes/made_up/",
+            "headers": [], "query_string": b"", "subprotocols": [],
+        })
+        await communicator.send_input({"type": "websocket.connect"})
+        self.assertEqual((await communicator.receive_output())["type"], "websocket.close")
+        await communicator.send_input({"type": "websocket.disconnect", "code": 1006})
+        await communicator.wait()
+
+        self.assertNotIn(("election_made_up",), metrics.websocket_connections.values)
+
+@override_settings(CACHES=LOCMEM_CACHES, RESULTS_SNAPSHOT_MAX_LAG=0)
+class ConditionalGetTests(TestCase):
+    POLLS = 50
+
+    def setUp(self):
+        cache.clear()
+        self.candidate = make_candidate("APC")
+        increment_party_votes("presidential", "APC", "apc.png")
+        self.client = APIClient()
+
+    def poll(self, url, etag):
+        """
+        Polls url POLLS times as a dashboard would; returns (body bytes sent,
+        statement count).
+        """
+        sent = 0
+        with CaptureQueriesContext(connection) as ctx:
+            for _ in range(self.POLLS):
+                response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+                self.assertEqual(response.status_code, 304)
+                sent += len(response.content)
+        return sent, len(ctx.captured_queries)
+
+    def test_party_votes_steady_state_polling_sends_no_body(self):
+        url = "/vote/party-votes/presidential/"
+        first = self.client.get(url)
+        self.assertEqual(first.status_code, 200)
+        self.assertIn("stale-while-revalidate=10", first["Cache-Control"])
+        self.assertIn("public", first["Cache-Control"])
+
+        self.assertEqual(self.poll(url, first["ETag"]), (0, 0))
+
+        cast_vote(make_user(), self.candidate)
+        cache_keys.invalidate_party_votes("presidential")
+        changed = self.client.get(url, HTTP_IF_NONE_MATCH=first["ETag"])
+        self.assertEqual(changed.status_code, 200)
+        self.assertNotEqual(changed["ETag"], first["ETag"])
+        self.assertEqual(changed.json()[0]["vote_count"], 2)
+
+    def test_candidate_list_etag_is_per_voter(self):
+        url = "/vote/candidates/presidential/"
+        user = make_user()
+        self.client.force_authenticate(user)
+        first = self.client.get(url)
+        self.assertIn("private", first["Cache-Control"])
+
+        self.assertEqual(self.poll(url, first["ETag"]), (0, 0))
+
+        self.client.post("/vote/cast/", {"candidate_id": self.candidate.id}, format="json")
+        after_vote = self.client.get(url, HTTP_IF_NONE_MATCH=first["ETag"])
+        self.assertEqual(after_vote.status_code, 200)
+        self.assertTrue(after_vote.json()[0]["user_voted"])
+
+
+@override_settings(CACHES=LOCMEM_CACHES)
+class ResultsSnapshotTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        make_candidate("APC")
+        make_candidate("PDP")
+        increment_party_votes("presidential", "APC", "apc.png", amount=3)
+        increment_party_votes("presidential", "PDP", "pdp.png", amount=1)
+        self.client = APIClient()
+
+    def test_unfiltered_party_votes_match_serializer_output(self):
+        filtered = self.client.get("/vote/party-votes/presidential/?ordering=-vote_count")
+        snapshot_response = self.client.get("/vote/party-votes/presidential/")
+
+        self.assertEqual(snapshot_response.content, filtered.content)
+        with self.assertNumQueries(0):
+            self.client.get("/vote/party-votes/presidential/")
+
+    def test_results_document_has_ranks_and_percentages(self):
+        document = self.client.get("/vote/results/presidential/").json()
+
+        self.assertEqual(document["total_votes"], 4)
+        self.assertEqual(
+            [(p["rank"], p["party"], p["vote_count"], p["percentage"]) for p in document["parties"]],
+            [(1, "APC", 3, 75.0), (2, "PDP", 1, 25.0)],
+        )
+
+    def test_refresh_reuses_party_rows(self):
+        self.client.get("/vote/results/presidential/")
+        increment_party_votes("presidential", "PDP", "pdp.png", amount=5)
+
+        with self.assertNumQueries(0):
+            snapshot.refresh("presidential", {"APC": 3, "PDP": 6})
+        parties = self.client.get("/vote/results/presidential/").json()["parties"]
+        self.assertEqual([(p["party"], p["vote_count"]) for p in parties], [("PDP", 6), ("APC", 3)])
+
+    def test_changed_party_row_is_reloaded(self):
+        snapshot.refresh("presidential")
+        pdp = PartyVoteCount.objects.get(party="PDP")
+        pdp.party_image = "pdp-2024.png"
+        with self.captureOnCommitCallbacks(execute=True):
+            pdp.save()
+
+        rows = snapshot.refresh("presidential")["rows"]
+        self.assertEqual(rows["PDP"]["party_image_url"], pdp.party_image_url)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            pdp.delete()
+        parties = json.loads(snapshot.refresh("presidential", {"APC": 3, "PDP": 1})["document"])["parties"]
+        self.assertEqual([(p["party"], p["vote_count"]) for p in parties], [("APC", 3), ("PDP", 1)])
+        self.assertEqual(parties[1]["party_image_url"], PLACEHOLDER_IMAGE)
+
+    def test_rows_are_reloaded_after_max_age(self):
+        snapshot.refresh("presidential")
+        PartyVoteCount.objects.filter(party="PDP").update(party_image_url="https://img/pdp-new.png")
+
+        rows = snapshot.refresh("presidential")["rows"]
+        self.assertNotEqual(rows["PDP"]["party_image_url"], "https://img/pdp-new.png")
+        with mock.patch.object(snapshot, "ROWS_MAX_AGE", 0):
+            rows = snapshot.refresh("presidential")["rows"]
+        self.assertEqual(rows["PDP"]["party_image_url"], "https://img/pdp-new.png")
+
+    def test_party_missing_from_totals_counts_zero(self):
+        snapshot.refresh("presidential")
+
+        parties = json.loads(snapshot.refresh("presidential", {"APC": 3})["document"])["parties"]
+        self.assertEqual([(p["party"], p["vote_count"]) for p in parties], [("APC", 3), ("PDP", 0)])
+
+    def test_party_without_a_counter_row_is_included(self):
+        # Write-behind: votes for LP are in Redis before any flush
+        snapshot.refresh("presidential", {"APC": 3, "PDP": 1, "LP": 5})
+
+        with self.assertNumQueries(0):
+            current = snapshot.refresh("presidential", {"APC": 3, "PDP": 1, "LP": 6})
+        parties = json.loads(current["document"])["parties"]
+        self.assertEqual([(p["party"], p["vote_count"]) for p in parties], [("LP", 6), ("APC", 3), ("PDP", 1)])
+
+    def test_missing_snapshot_is_built_once(self):
+        cache.add(snapshot._lock_key("presidential"), 1)  # another request is building it
+        built = snapshot.refresh("presidential")
+        cache.delete(snapshot.snapshot_key("presidential"))
+
+        with mock.patch.object(snapshot, "refresh", wraps=snapshot.refresh) as refresh, \
+                mock.patch("vote.snapshot.time.sleep", side_effect=lambda _: cache.set(
+                    snapshot.snapshot_key("presidential"), built)):
+            self.assertEqual(snapshot.get("presidential")["document"], built["document"])
+        refresh.assert_not_called()
+
+    def test_missing_snapshot_is_built_if_the_builder_never_finishes(self):
+        cache.add(snapshot._lock_key("presidential"), 1)
+
+        with mock.patch.object(snapshot, "COLD_WAIT", 0):
+            document = json.loads(snapshot.get("presidential")["document"])
+        self.assertEqual(document["total_votes"], 4)
+
+    @override_settings(RESULTS_SNAPSHOT_MAX_LAG=0)
+    def test_stale_snapshot_is_rebuilt_on_request(self):
+        self.client.get("/vote/results/presidential/")
+        increment_party_votes("presidential", "PDP", "pdp.png", amount=5)
+        cache_keys.invalidate_party_votes("presidential")
+
+        parties = self.client.get("/vote/results/presidential/").json()["parties"]
+        self.assertEqual(parties[0]["party"], "PDP")
+
+
+@override_settings(CACHES=LOCMEM_CACHES)
+class RegionTallyTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.apc = make_candidate("APC")
+        self.pdp = make_candidate("PDP")
+        self.voters = [
+            make_user(1, state="Lagos", lga="Ikeja"),
+            make_user(2, state="Lagos", lga="Ikeja"),
+            make_user(3, state="Lagos", lga="Epe"),
+            make_user(4, state="Kano", lga="Nassarawa"),
+            make_user(5),
+        ]
+        self.client = APIClient()
+
+    def cast_all(self, *candidates):
+        for voter, candidate in zip(self.voters, candidates):
+            cast_vote(voter, candidate)
+        return rollup.roll_up()
+
+    def tallies(self):
+        return set(RegionVoteCount.objects.values_list("state", "lga", "party", "vote_count"))
+
+    def test_cast_counts_by_voter_region(self):
+        self.cast_all(self.apc, self.apc, self.pdp, self.pdp, self.apc)
+
+        self.assertEqual(self.tallies(), {
+            ("Lagos", "Ikeja", "APC", 2),
+            ("Lagos", "Epe", "PDP", 1),
+            ("Kano", "Nassarawa", "PDP", 1),
+            ("", "", "APC", 1),
+        })
+
+    def test_casts_wait_for_the_roll_up(self):
+        cast_vote(self.voters[0], self.apc)
+        with self.assertRaises(AlreadyVotedError):
+            cast_vote(self.voters[0], self.pdp)
+        self.assertEqual(self.tallies(), set())
+
+        self.assertEqual(rollup.roll_up(), {"presidential": 1})
+        self.assertEqual(self.tallies(), {("Lagos", "Ikeja", "APC", 1)})
+
+        # Each vote is counted once
+        cast_vote(self.voters[1], self.pdp)
+        self.assertEqual(rollup.roll_up(), {"presidential": 1})
+        self.assertEqual(rollup.roll_up(), {})
+        self.assertEqual(self.tallies(), {("Lagos", "Ikeja", "APC", 1), ("Lagos", "Ikeja", "PDP", 1)})
+
+    def test_roll_up_works_in_batches(self):
+        for voter in self.voters:
+            cast_vote(voter, self.apc)
+
+        self.assertEqual(rollup.roll_up(batch_size=2), {"presidential": 5})
+        self.assertEqual(TallyRollup.objects.get().last_vote_id, Vote.objects.latest("id").id)
+        self.assertEqual(sum(count for *_, count in self.tallies()), 5)
+
+    def vote_with_id(self, vote_id, voter, candidate):
+        # Stands in for a cast that took its id before a later one committed
+        return Vote.objects.create(id=vote_id, user=voter, candidate=candidate)
+
+    def test_votes_committing_behind_the_position_are_counted(self):
+        first = cast_vote(self.voters[0], self.apc)
+        self.vote_with_id(first.id + 3, self.voters[1], self.apc)
+
+        self.assertEqual(rollup.roll_up(), {"presidential": 2})
+        position = TallyRollup.objects.get()
+        self.assertEqual(position.last_vote_id, first.id + 3)
+        self.assertEqual([gap[:2] for gap in position.gaps], [[first.id + 1, first.id + 2]])
+
+        self.vote_with_id(first.id + 2, self.voters[2], self.pdp)
+        self.assertEqual(rollup.roll_up(), {"presidential": 1})
+        self.assertEqual([gap[:2] for gap in TallyRollup.objects.get().gaps], [[first.id + 1, first.id + 1]])
+        self.assertEqual(rollup.roll_up(), {})
+        self.assertEqual(self.tallies(), {("Lagos", "Ikeja", "APC", 2), ("Lagos", "Epe", "PDP", 1)})
+
+        # A gap nothing fills (a rolled-back cast) is given up on
+        rollup.roll_up(gap_timeout=0)
+        self.assertEqual(TallyRollup.objects.get().gaps, [])
+
+    def test_rebuild_leaves_gaps_to_the_roll_up(self):
+        first = cast_vote(self.voters[0], self.apc)
+        self.vote_with_id(first.id + 2, self.voters[1], self.apc)
+        rollup.roll_up()
+        self.vote_with_id(first.id + 1, self.voters[2], self.pdp)
+
+        call_command("rebuild_region_tallies", "--election-type", "presidential", stdout=io.StringIO())
+        self.assertEqual(self.tallies(), {("Lagos", "Ikeja", "APC", 2)})
+        rollup.roll_up()
+        self.assertEqual(self.tallies(), {("Lagos", "Ikeja", "APC", 2), ("Lagos", "Epe", "PDP", 1)})
+
+    def test_ingest_counts_by_region(self):
+        stream = io.BytesIO(b"\n".join(
+            json.dumps({"national_id": voter.national_id, "candidate_id": self.apc.id}).encode()
+            for voter in self.voters[:4]
+        ))
+
+        ingest_ballots(stream, "ndjson")
+        rollup.roll_up()
+
+        self.assertEqual(self.tallies(), {
+            ("Lagos", "Ikeja", "APC", 2),
+            ("Lagos", "Epe", "APC", 1),
+            ("Kano", "Nassarawa", "APC", 1),
+        })
+
+    def test_states_are_rolled_up_from_lgas(self):
+        self.cast_all(self.apc, self.apc, self.pdp, self.pdp)
+
+        body = self.client.get("/vote/regions/presidential/").json()
+
+        self.assertEqual(body["total_votes"], 4)
+        self.assertEqual(
+            [(s["state"], s["total_votes"], [(p["party"], p["vote_count"]) for p in s["parties"]])
+             for s in body["states"]],
+            [("Lagos", 3, [("APC", 2), ("PDP", 1)]), ("Kano", 1, [("PDP", 1)])],
+        )
+
+    def test_lga_breakdown_for_one_state(self):
+        self.cast_all(self.apc, self.pdp, self.pdp, self.pdp)
+
+        body = self.client.get("/vote/regions/presidential/lagos/").json()
+
+        self.assertEqual(body["state"], "Lagos")
+        self.assertEqual(body["total_votes"], 3)
+        self.assertEqual(
+            [(l["lga"], [(p["party"], p["vote_count"]) for p in l["parties"]]) for l in body["lgas"]],
+            [("Ikeja", [("APC", 1), ("PDP", 1)]), ("Epe", [("PDP", 1)])],
+        )
+
+    def test_breakdown_is_cached_until_the_next_roll_up(self):
+        self.cast_all(self.apc)
+        first = self.client.get("/vote/regions/presidential/")
+
+        with self.assertNumQueries(0):
+            again = self.client.get("/vote/regions/presidential/", HTTP_IF_NONE_MATCH=first["ETag"])
+        self.assertEqual(again.status_code, 304)
+
+        cast_vote(self.voters[3], self.pdp)
+        rollup.roll_up()
+        self.assertEqual(self.client.get("/vote/regions/presidential/").json()["total_votes"], 2)
+
+    def test_rebuild_recounts_from_votes(self):
+        self.cast_all(self.apc, self.apc, self.pdp)
+        expected = self.tallies()
+        RegionVoteCount.objects.all().delete()
+        RegionVoteCount.objects.create(election_type="presidential", state="Lagos", lga="Ikeja", party="APC", vote_count=9)
+
+        cast_vote(self.voters[3], self.pdp)  # not rolled up yet
+
+        call_command("rebuild_region_tallies", "--election-type", "presidential", stdout=io.StringIO())
+
+        self.assertEqual(self.tallies(), expected)
+        rollup.roll_up()
+        self.assertEqual(self.tallies(), expected | {("Kano", "Nassarawa", "PDP", 1)})
+
+
+@override_settings(CACHES=LOCMEM_CACHES)
+class ReconcileTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        apc, pdp = make_candidate("APC"), make_candidate("PDP")
+        for n, candidate in enumerate([apc, apc, pdp, apc, pdp], 1):
+            cast_vote(make_user(n), candidate)
+
+    def test_counts_match_across_chunks_and_tail(self):
+        counts, settled_id, chunks = reconcile.count_votes(
+            workers=1, chunk_size=2, settled_id=Vote.objects.order_by("id")[2].id
+        )
+
+        self.assertEqual(chunks, 2)
+        self.assertEqual(sum(counts.values()), 3)
+        self.assertEqual(reconcile.find_drift(counts, settled_id), [])
+
+    def test_drift_is_reported_and_repaired(self):
+        PartyVoteCount.objects.filter(party="APC").update(vote_count=6)
+        PartyVoteCount.objects.filter(party="PDP").delete()
+
+        report = reconcile.reconcile(workers=1, chunk_size=2)
+        self.assertEqual(
+            [(d.party, d.stored, d.expected, d.delta) for d in report.drift],
+            [("APC", 6, 3, 3), ("PDP", 0, 2, -2)],
+        )
+        self.assertEqual(party_totals("presidential"), {"APC": 6})
+
+        with self.captureOnCommitCallbacks(execute=True):
+            reconcile.reconcile(workers=1, fix=True)
+        self.assertEqual(party_totals("presidential"), {"APC": 3, "PDP": 2})
+        self.assertEqual(reconcile.reconcile(workers=1).drift, [])
+
+    @override_settings(VOTE_COUNTER_SHARDS=4)
+    def test_repair_folds_shards(self):
+        increment_party_votes("presidential", "APC", amount=2)
+
+        reconcile.reconcile(workers=1, fix=True)
+
+        self.assertEqual(party_totals("presidential"), {"APC": 3, "PDP": 2})
+        self.assertFalse(PartyVoteShard.objects.filter(vote_count__gt=0).exists())
+
+    @override_settings(VOTE_COUNTER_SHARDS=4)
+    def test_repair_only_resets_the_shards_it_locked(self):
+        increment_party_votes("presidential", "APC", amount=2)
+        tail = reconcile._tail
+
+        def tail_then_new_shard(*args):
+            # A cast creating its shard while the repair runs
+            counted = tail(*args)
+            shard = PartyVoteShard.objects.filter(party="APC").values_list("shard", flat=True).get()
+            PartyVoteShard.objects.create(
+                election_type="presidential", party="APC", shard=(shard + 1) % 4, vote_count=1
+            )
+            return counted
+
+        with mock.patch.object(reconcile, "_tail", side_effect=tail_then_new_shard):
+            reconcile.reconcile(workers=1, fix=True)
+
+        self.assertEqual(PartyVoteCount.objects.get(party="APC").vote_count, 3)
+        self.assertEqual(list(PartyVoteShard.objects.filter(vote_count__gt=0).values_list("vote_count", flat=True)), [1])
+
+    def test_command_can_fail_on_drift(self):
+        PartyVoteCount.objects.filter(party="PDP").update(vote_count=1)
+        out = io.StringIO()
+
+        with self.assertRaisesMessage(CommandError, "1 counters drifted"):
+            call_command("reconcile_votes", "--workers", "1", "--fail-on-drift", stdout=out)
+        self.assertIn("Drift: presidential PDP: stored 1, counted 2 (-1)", out.getvalue())
+
+
+@override_settings(CACHES=LOCMEM_CACHES)
+class ParallelReconcileTests(TransactionTestCase):
+    def test_worker_threads_share_the_count(self):
+        candidate = make_candidate("APC")
+        for n in range(1, 8):
+            cast_vote(make_user(n), candidate)
+
+        counts, settled_id, chunks = reconcile.count_votes(
+            workers=3, chunk_size=2, settled_id=Vote.objects.order_by("-id")[0].id
+        )
+
+        self.assertEqual(chunks, 4)
+        self.assertEqual(counts, {("presidential", "APC"): 7})
+
+
+@override_settings(CACHES=LOCMEM_CACHES)
+class VoteHistoryTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.apc = make_candidate("APC")
+        self.pdp = make_candidate("PDP")
+        self.client = APIClient()
+        self.voters = iter(range(1, 100))
+
+    def cast_at(self, clock, candidate):
+        at = datetime(2027, 2, 25, *clock, tzinfo=dt_timezone.utc)
+        with mock.patch("django.utils.timezone.now", return_value=at):
+            cast_vote(make_user(next(self.voters)), candidate)
+
+    def roll_up(self):
+        return rollup.roll_up()
+
+    def cast_morning(self, roll_up=True):
+        self.cast_at((8, 0, 10), self.apc)
+        self.cast_at((8, 0, 50), self.apc)
+        self.cast_at((8, 1, 30), self.pdp)
+        self.cast_at((8, 7, 5), self.apc)
+        if roll_up:
+            self.roll_up()
+
+    def test_votes_are_bucketed_by_minute(self):
+        self.cast_morning(roll_up=False)
+        self.assertFalse(VoteBucket.objects.exists())
+
+        self.assertEqual(self.roll_up(), {"presidential": 4})
+        self.assertEqual(
+            sorted((b.minute.strftime("%H:%M"), b.party, b.vote_count) for b in VoteBucket.objects.all()),
+            [("08:00", "APC", 2), ("08:01", "PDP", 1), ("08:07", "APC", 1)],
+        )
+
+    def test_turnout_curve(self):
+        self.cast_morning()
+
+        body = self.client.get("/vote/turnout/presidential/?interval=5").json()
+
+        self.assertEqual(body["total_votes"], 4)
+        self.assertEqual(
+            [(b["start"], b["votes"], b["cumulative"]) for b in body["buckets"]],
+            [("2027-02-25T08:00:00+00:00", 3, 3), ("2027-02-25T08:05:00+00:00", 1, 4)],
+        )
+
+        since = self.client.get("/vote/turnout/presidential/?since=2027-02-25T08:01:00Z").json()
+        self.assertEqual([(b["votes"], b["cumulative"]) for b in since["buckets"]], [(1, 3), (1, 4)])
+
+    def test_results_as_of_a_minute(self):
+        self.cast_morning()
+
+        early = self.client.get("/vote/results/presidential/?at=2027-02-25T08:01:59Z").json()
+        later = self.client.get("/vote/results/presidential/?at=2027-02-25T08:02:00Z").json()
+
+        self.assertEqual(early["as_of"], "2027-02-25T08:01:00+00:00")
+        self.assertEqual([(p["party"], p["vote_count"]) for p in early["parties"]], [("APC", 2)])
+        self.assertEqual(
+            [(p["rank"], p["party"], p["vote_count"], p["percentage"]) for p in later["parties"]],
+            [(1, "APC", 2, 66.67), (2, "PDP", 1, 33.33)],
+        )
+
+    def test_bad_parameters(self):
+        self.assertEqual(self.client.get("/vote/results/presidential/?at=noon").status_code, 400)
+        self.assertEqual(self.client.get("/vote/turnout/presidential/?interval=0").status_code, 400)
+        self.assertEqual(self.client.get("/vote/turnout/presidential/?interval=x").status_code, 400)
+
+    def test_ingest_and_backfill_match_live_buckets(self):
+        self.cast_morning()
+        voter = make_user(99)
+        ingest_ballots(io.BytesIO(json.dumps({"national_id": voter.national_id, "candidate_id": self.pdp.id}).encode()))
+        self.roll_up()
+        expected = set(VoteBucket.objects.values_list("party", "minute", "vote_count"))
+        self.assertEqual(sum(count for _, _, count in expected), 5)
+        VoteBucket.objects.all().delete()
+
+        call_command("backfill_vote_buckets", "--election-type", "presidential", stdout=io.StringIO())
+
+        self.assertEqual(set(VoteBucket.objects.values_list("party", "minute", "vote_count")), expected)
+
+
+class PartitioningTests(TestCase):
+    def assertCopiedBeforeDrop(self, statements):
+        copy = statements.index('INSERT INTO "vote_vote" SELECT * FROM "vote_vote_unpartitioned"')
+        drop = statements.index('DROP TABLE "vote_vote_unpartitioned"')
+        check = drop - 1
+        self.assertLess(copy, check)
+        self.assertIn('count(*) INTO copied FROM "vote_vote"', statements[check])
+        self.assertIn('count(*) INTO expected FROM "vote_vote_unpartitioned"', statements[check])
+        self.assertIn("RAISE EXCEPTION", statements[check])
+
+    def test_other_databases_keep_the_plain_table(self):
+        self.assertFalse(partitioning.supported(connection))
+        self.assertFalse(partitioning.partition())
+        self.assertFalse(partitioning.is_partitioned())
+        with self.assertRaisesMessage(CommandError, "needs PostgreSQL"):
+            call_command("partition_votes", stdout=io.StringIO())
+
+    def test_partitions_keep_vote_constraints(self):
+        statements = partitioning.partition_sql()
+
+        for election_type in ("presidential", "governorship", "senatorial"):
+            self.assertIn(
+                f"CREATE TABLE \"vote_vote_{election_type}\" PARTITION OF \"vote_vote\" "
+                f"FOR VALUES IN ('{election_type}')",
+                statements,
+            )
+        self.assertIn('ALTER TABLE "vote_vote" ADD PRIMARY KEY (id, election_type)', statements)
+        self.assertIn(
+            'ALTER TABLE "vote_vote" ADD CONSTRAINT unique_vote_per_election UNIQUE (user_id, election_type)',
+            statements,
+        )
+        # Data is copied, and the copy checked, before the old table (and
+        # its index names) go away
+        self.assertCopiedBeforeDrop(statements)
+
+    def test_undo_checks_the_copy_too(self):
+        self.assertCopiedBeforeDrop(partitioning.unpartition_sql())
+
+
+@override_settings(CACHES=LOCMEM_CACHES, RESULTS_SNAPSHOT_MAX_LAG=0)
+class AsyncReadViewTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.candidate = make_candidate("APC")
+        make_candidate("PDP")
+        increment_party_votes("presidential", "APC", "apc.png", amount=2)
+        self.user = make_user()
+        self.auth = f"Bearer {AccessToken.for_user(self.user)}"
+        self.client = APIClient()
+        self.factory = AsyncRequestFactory()
+
+    async def get_async(self, view, path, election_type="presidential", **headers):
+        request = self.factory.get(path, headers=headers)
+        return await view.as_view()(request, election_type=election_type)
+
+    async def test_candidates_match_sync_view(self):
+        await sync_to_async(cast_vote)(self.user, self.candidate)
+        url = "/vote/candidates/presidential/"
+        expected = await sync_to_async(self.client.get)(url, HTTP_AUTHORIZATION=self.auth)
+
+        response = await self.get_async(AsyncCandidateListView, url, authorization=self.auth)
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.content, expected.content)
+        self.assertEqual(response["ETag"], expected["ETag"])
+        self.assertTrue(json.loads(response.content)[0]["user_voted"])
+
+    async def test_candidates_require_a_token(self):
+        response = await self.get_async(AsyncCandidateListView, "/vote/candidates/presidential/")
+        self.assertEqual(response.status_code, 401)
+
+        response = await self.get_async(
+            AsyncCandidateListView, "/vote/candidates/presidential/", authorization="Bearer nope"
+        )
+        self.assertEqual(response.status_code, 401)
+
+    async def test_party_votes_match_sync_view(self):
+        for url in ("/vote/party-votes/presidential/", "/vote/party-votes/presidential/?search=AP"):
+            expected = await sync_to_async(self.client.get)(url)
+            response = await self.get_async(AsyncPartyVoteListView, url)
+
+            self.assertEqual(response.content, expected.content, url)
+            self.assertEqual(response["ETag"], expected["ETag"], url)
+
+    async def test_party_votes_not_modified(self):
+        first = await self.get_async(AsyncPartyVoteListView, "/vote/party-votes/presidential/")
+        response = await self.get_async(
+            AsyncPartyVoteListView, "/vote/party-votes/presidential/", if_none_match=first["ETag"]
+        )
+        self.assertEqual(response.status_code, 304)
+        self.assertEqual(response.content, b"")
+
+
+@override_settings(CACHES={"default": {"BACKEND": "election.cache.LocMemCache"}})
+class MetricsTests(TestCase):
+    CANDIDATES_ROUTE = "vote/candidates/<str:election_type>/"
+
+    def setUp(self):
+        cache.clear()
+        make_candidate("APC")
+        self.client = APIClient()
+        self.client.force_authenticate(make_user())
+
+    def test_requests_queries_and_cache_families_are_counted(self):
+        requests = metrics.http_requests.value(self.CANDIDATES_ROUTE, "GET", 200)
+        observed = metrics.db_queries.count(self.CANDIDATES_ROUTE)
+        misses = metrics.cache_lookups.value("candidates", "miss")
+        hits = metrics.cache_lookups.value("candidates", "hit")
+
+        self.client.get("/vote/candidates/presidential/")
+        self.client.get("/vote/candidates/presidential/")
+
+        self.assertEqual(metrics.http_requests.value(self.CANDIDATES_ROUTE, "GET", 200), requests + 2)
+        self.assertEqual(metrics.db_queries.count(self.CANDIDATES_ROUTE), observed + 2)
+        self.assertEqual(metrics.cache_lookups.value("candidates", "miss"), misses + 1)
+        self.assertEqual(metrics.cache_lookups.value("candidates", "hit"), hits + 1)
+
+    def test_metrics_endpoint_renders_prometheus_text(self):
+        self.client.get("/vote/party-votes/presidential/?ordering=-vote_count")
+
+        response = self.client.get("/metrics")
+
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response["Content-Type"].startswith("text/plain; version=0.0.4"))
+        body = response.content.decode()
+        self.assertIn("# TYPE http_request_duration_seconds histogram", body)
+        self.assertIn(
+            'http_request_duration_seconds_bucket{route="vote/party-votes/<str:election_type>/",method="GET",le="+Inf"}',
+            body,
+        )
+        self.assertIn('cache_lookups_total{family="party_votes"', body)
+        self.assertIn("user_cache_hits ", body)
+
+    @override_settings(METRICS_TOKEN="s3cret")
+    def test_metrics_token(self):
+        self.assertEqual(self.client.get("/metrics").status_code, 403)
+        self.assertEqual(self.client.get("/metrics", HTTP_AUTHORIZATION="Bearer s3cret").status_code, 200)
+
+
+@skipIf(psycopg_pool is None, "psycopg[pool] is not installed")
+class DatabasePoolTests(TestCase):
+    def test_pool_stats_are_exported(self):
+        from django.db.backends.postgresql.base import DatabaseWrapper
+
+        from election import db_pool
+
+        pool = mock.Mock()
+        pool.get_stats.return_value = {
+            "pool_min": 2, "pool_max": 4, "pool_size": 4, "pool_available": 1, "requests_waiting": 5,
+            "requests_num": 40, "requests_wait_ms": 120,
+        }
+        with mock.patch.dict(DatabaseWrapper._connection_pools, {"default": pool}, clear=True):
+            stats = db_pool.stats()
+            body = metrics.render()
+
+        self.assertEqual(stats["default_in_use"], 3)
+        self.assertEqual(stats["default_saturation"], 0.75)
+        self.assertEqual(stats["default_checkout_wait_ms"], 120)
+        self.assertEqual(stats["default_connections_lost"], 0)
+        self.assertIn("db_pool_default_waiting 5", body)
+
+    def test_checkouts_are_timed(self):
+        from django.db.backends.postgresql import base
+
+        from election import db_pool
+        from election.db_pool.base import DatabaseWrapper
+
+        wrapper = DatabaseWrapper({**connection.settings_dict, "OPTIONS": {"pool": True}}, alias="pooled")
+        checkouts = db_pool.checkout_seconds.count("pooled")
+        timeouts = db_pool.checkout_timeouts.value("pooled")
+
+        with mock.patch.object(DatabaseWrapper, "pool", new_callable=mock.PropertyMock, return_value=mock.Mock()), \
+                mock.patch.object(base.DatabaseWrapper, "get_new_connection", side_effect=["conn", psycopg_pool.PoolTimeout]):
+            self.assertEqual(wrapper.get_new_connection({}), "conn")
+            with self.assertRaises(psycopg_pool.PoolTimeout):
+                wrapper.get_new_connection({})
+
+        self.assertEqual(db_pool.checkout_seconds.count("pooled"), checkouts + 2)
+        self.assertEqual(db_pool.checkout_timeouts.value("pooled"), timeouts + 1)
+
+
+@override_settings(CACHES=LOCMEM_CACHES)
+class MediaURLTests(TestCase):
+    def test_urls_are_stored_on_save(self):
+        candidate = Candidate.objects.get(pk=make_candidate("APC").pk)
+
+        self.assertEqual(candidate.image_url, candidate.image.url)
+        self.assertEqual(candidate.party_image_url, candidate.party_image.url)
+        self.assertIn("c_fill", candidate.image_thumb_url)
+        row = CandidateSerializer(candidate, context={}).data
+        self.assertEqual(row["image_url"], candidate.image.url)
+
+    def test_counter_upsert_fills_party_image_url(self):
+        candidate = make_candidate("APC")
+        increment_party_votes("presidential", "APC", candidate.party_image)
+        increment_party_votes("presidential", "APC", None)
+
+        row = PartyVoteCount.objects.get(election_type="presidential", party="APC")
+        self.assertEqual(row.party_image_url, candidate.party_image_url)
+        self.assertNotEqual(row.party_image_url, "")
+
+    def test_backfill_fills_existing_rows(self):
+        make_candidate("APC")
+        Candidate.objects.update(image_url="", party_image_url="")
+
+        call_command("backfill_media_urls", stdout=io.StringIO())
+
+        candidate = Candidate.objects.get()
+        self.assertEqual(candidate.image_url, candidate.image.url)
+        self.assertEqual(candidate.party_image_url, candidate.party_image.url)
+
+
+class FastRowsTests(TestCase):
+    def setUp(self):
+        self.apc = make_candidate("APC", name='Adé "Jr." O\u2028ba')
+        self.pdp = make_candidate("PDP")
+        Candidate.objects.filter(pk=self.pdp.pk).update(image_url="", party_image_thumb_url="")
+        increment_party_votes("presidential", "APC", self.apc.party_image, amount=3)
+        increment_party_votes("presidential", "PDP", None, amount=1)
+        PartyVoteCount.objects.filter(party="PDP").update(party_image=None, party_image_url="")
+
+    def assertSameBytes(self, fast, reference):
+        rendered = JSONRenderer().render(reference)
+        self.assertEqual(fast_rows.dumps(fast), rendered)
+        with mock.patch.object(fast_rows, "orjson", None):
+            self.assertEqual(fast_rows.dumps(fast), rendered)
+
+    def test_candidate_rows_match_serializer(self):
+        queryset = Candidate.objects.order_by("name")
+        context = {"party_votes": {("presidential", "APC"): 3}, "user_votes": {self.pdp.id}}
+
+        self.assertSameBytes(
+            fast_rows.candidate_rows(queryset, context["party_votes"], context["user_votes"]),
+            CandidateSerializer(queryset, many=True, context=context).data,
+        )
+
+    def test_party_vote_rows_match_serializer(self):
+        live = with_live_totals(PartyVoteCount.objects.all(), "presidential").order_by("-live_votes")
+        plain = PartyVoteCount.objects.order_by("party")
+
+        for queryset in (live, plain):
+            self.assertSameBytes(
+                fast_rows.party_vote_rows(queryset), PartyVoteCountSerializer(queryset, many=True).data
+            )
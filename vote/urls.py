@@ -7,11 +7,26 @@
 #     path('party-votes/<str:election_type>/', PartyVoteCountListView.as_view(), name='party-votes-list'),
 #     path('cast/', CastVoteView.as_view(), name='cast-vote'),  
 # ]
+from django.conf import settings
 from django.urls import path
-from .views import CandidateListView, PartyVoteListView, CastVoteView
+from .async_views import AsyncCandidateListView, AsyncPartyVoteListView
+from .views import CandidateListView, PartyVoteListView, CastVoteView, BulkVoteUploadView, RegionResultsView, ResultsSnapshotView, TurnoutView
 
-urlpatterns = [
+sync_read_urlpatterns = [
     path("candidates/<str:election_type>/", CandidateListView.as_view()),
     path("party-votes/<str:election_type>/", PartyVoteListView.as_view()),
+]
+
+async_read_urlpatterns = [
+    path("candidates/<str:election_type>/", AsyncCandidateListView.as_view()),
+    path("party-votes/<str:election_type>/", AsyncPartyVoteListView.as_view()),
+]
+
+urlpatterns = (async_read_urlpatterns if settings.ASYNC_READ_VIEWS else sync_read_urlpatterns) + [
+    path("results/<str:election_type>/", ResultsSnapshotView.as_view()),
+    path("regions/<str:election_type>/", RegionResultsView.as_view()),
+    path("regions/<str:election_type>/<str:state>/", RegionResultsView.as_view()),
+    path("turnout/<str:election_type>/", TurnoutView.as_view()),
     path("cast/", CastVoteView.as_view()),
+    path("bulk/", BulkVoteUploadView.as_view()),
 ]
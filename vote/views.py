@@ -1,8 +1,18 @@
+import zlib
 from rest_framework import generics, permissions, status, filters
 from rest_framework.response import Response
 from django.core.cache import cache
-from .models import Candidate, PartyVoteCount, Vote
+from django.http import HttpResponse
+from django.utils import timezone
+from django.utils.dateparse import parse_datetime
+from rest_framework.views import APIView
+from . import candidate_cache, history, idempotency, regions, snapshot
+from .cache_keys import PARTY_VOTES, generation, party_votes_key, results_view_key
+from .conditional import add_validators, is_current, make_etag, not_modified
+from .models import Candidate, PartyVoteCount
 from .serializers import CandidateSerializer, PartyVoteCountSerializer, VoteSerializer
+from .counters import with_live_totals
+from .fast_rows import dumps, party_vote_rows
 
 # -----------------------------
 # Candidate List View with Cache
@@ -17,63 +27,185 @@ class CandidateListView(generics.ListAPIView):
 
     def list(self, request, *args, **kwargs):
         election_type = self.kwargs.get("election_type", "").lower()
-        cache_key = f"candidates_{election_type}_{request.user.id}"
 
-        cached_data = cache.get(cache_key)
-        if cached_data:
-            return Response(cached_data)
+        # One shared entry per election; only user_voted differs per voter
+        shared_digest, fragments = candidate_cache.get_shared(election_type)
+        voted_candidate_id = candidate_cache.get_user_vote(election_type, request.user)
 
-        queryset = self.get_queryset()
+        etag = make_etag(shared_digest, voted_candidate_id)
+        if is_current(request, etag):
+            return not_modified(etag, private=True)
 
-        # Prefetch votes by current user
-        user_votes = set(
-            Vote.objects.filter(user=request.user, election_type=election_type)
-            .values_list("candidate_id", flat=True)
+        response = HttpResponse(
+            candidate_cache.render(fragments, voted_candidate_id),
+            content_type="application/json"
         )
-
-        # Prefetch party votes
-        votes = PartyVoteCount.objects.filter(election_type=election_type)
-        party_votes_dict = {(v.election_type, v.party): v.vote_count for v in votes}
-
-        serializer = self.get_serializer(
-            queryset,
-            many=True,
-            context={"request": request, "user_votes": user_votes, "party_votes": party_votes_dict}
-        )
-
-        cache.set(cache_key, serializer.data, timeout=3600)  # cache for 1 min
-        return Response(serializer.data)
+        return add_validators(response, etag, private=True)
 
 
 # -----------------------------
 # Party Vote List View with Cache
 # -----------------------------
+class PartyVoteOrderingFilter(filters.OrderingFilter):
+    # Clients keep ordering by "vote_count"; sort on the live total instead
+    def get_ordering(self, request, queryset, view):
+        ordering = super().get_ordering(request, queryset, view)
+        if not ordering:
+            return ordering
+        return [term.replace("vote_count", "live_votes") for term in ordering]
+
+
 class PartyVoteListView(generics.ListAPIView):
     serializer_class = PartyVoteCountSerializer
     permission_classes = [permissions.AllowAny]
-    filter_backends = [filters.SearchFilter, filters.OrderingFilter]
+    filter_backends = [filters.SearchFilter, PartyVoteOrderingFilter]
     search_fields = ["party"]
     ordering_fields = ["vote_count", "party"]
     ordering = ["-vote_count"]
 
     def get_queryset(self):
         election_type = self.kwargs.get("election_type", "").lower()
-        return PartyVoteCount.objects.filter(election_type__iexact=election_type).order_by("-vote_count", "party")
+        queryset = PartyVoteCount.objects.filter(election_type__iexact=election_type)
+        return with_live_totals(queryset, election_type).order_by("-live_votes", "party")
 
     def list(self, request, *args, **kwargs):
         election_type = self.kwargs.get("election_type", "").lower()
+        if not request.GET:
+            # Unfiltered: serve the materialized snapshot's bytes as they are
+            return snapshot_response(request, election_type, "party_votes")
+
         query_string = request.GET.urlencode()
-        cache_key = f"party_votes_{election_type}_{query_string}"
 
-        cached_data = cache.get(cache_key)
-        if cached_data:
-            return Response(cached_data)
+        # The results generation moves on every vote, so it versions the body
+        results_version = generation(PARTY_VOTES, election_type)
+        etag = make_etag(election_type, results_version, zlib.crc32(query_string.encode()))
+        if is_current(request, etag):
+            return not_modified(etag)
 
-        queryset = self.filter_queryset(self.get_queryset())
-        serializer = self.get_serializer(queryset, many=True)
+        # Cached as encoded bytes, built without the serializer (vote.fast_rows)
+        cache_key = party_votes_key(election_type, query_string, results_version)
+        body = cache.get(cache_key)
+        if not isinstance(body, bytes):
+            body = dumps(party_vote_rows(self.filter_queryset(self.get_queryset())))
+            cache.set(cache_key, body, timeout=360)
+        return add_validators(HttpResponse(body, content_type="application/json"), etag)
 
-        cache.set(cache_key, serializer.data, timeout=360)  
-        return Response(serializer.data)
+
+# -----------------------------
+# Results Snapshot View
+# -----------------------------
+def snapshot_response(request, election_type, shape):
+    current = snapshot.get(election_type)
+    etag = make_etag("snapshot", election_type, current["version"])
+    if is_current(request, etag):
+        return not_modified(etag)
+    return add_validators(HttpResponse(current[shape], content_type="application/json"), etag)
+
+
+def versioned_response(request, view, election_type, variant, build):
+    """
+    Serves build() encoded, cached and ETagged under the party-votes
+    generation; `variant` tells apart the request shapes one view serves.
+    """
+    digest = zlib.crc32(variant.encode())
+    results_version = generation(PARTY_VOTES, election_type)
+    etag = make_etag(view, election_type, results_version, digest)
+    if is_current(request, etag):
+        return not_modified(etag)
+
+    cache_key = results_view_key(view, election_type, digest, results_version)
+    body = cache.get(cache_key)
+    if not isinstance(body, bytes):
+        body = dumps(build())
+        cache.set(cache_key, body, timeout=360)
+    return add_validators(HttpResponse(body, content_type="application/json"), etag)
+
+
+def parse_time(value):
+    parsed = parse_datetime(value.strip())
+    if parsed is None:
+        raise ValueError(f"Invalid datetime {value!r}; use ISO 8601.")
+    if timezone.is_naive(parsed):
+        parsed = timezone.make_aware(parsed)
+    return parsed
+
+
+def bad_request(message):
+    return Response({"error": message}, status=status.HTTP_400_BAD_REQUEST)
+
+
+class ResultsSnapshotView(APIView):
+    """
+    Ranked results for one election with vote percentages, served from the
+    pre-encoded snapshot (no ORM or serializer on the request path).
+    With ?at=<datetime> the results as of that minute are summed from the
+    per-minute buckets instead.
+    """
+    permission_classes = [permissions.AllowAny]
+
+    def get(self, request, election_type):
+        election_type = election_type.lower()
+        if "at" not in request.GET:
+            return snapshot_response(request, election_type, "document")
+
+        try:
+            at = history.minute_of(parse_time(request.GET["at"]))
+        except ValueError as exc:
+            return bad_request(str(exc))
+        return versioned_response(
+            request, "results_at", election_type, at.isoformat(),
+            lambda: history.results_at(election_type, at),
+        )
+
+
+# -----------------------------
+# Regional Results View
+# -----------------------------
+class RegionResultsView(APIView):
+    """
+    Results by state for one election, or by LGA within one state, read
+    from the RegionVoteCount tallies.
+    """
+    permission_classes = [permissions.AllowAny]
+
+    def get(self, request, election_type, state=None):
+        election_type = election_type.lower()
+        state = (state or "").strip()
+        if state:
+            build = lambda: regions.lga_results(election_type, state)
+        else:
+            build = lambda: regions.state_results(election_type)
+        return versioned_response(request, "regions", election_type, state.lower(), build)
+
+
+# -----------------------------
+# Turnout View
+# -----------------------------
+class TurnoutView(APIView):
+    """
+    Votes per interval through the day with running totals, summed from
+    the per-minute buckets. ?interval=<minutes> (default 1), ?since= and
+    ?until= (ISO 8601) are optional.
+    """
+    permission_classes = [permissions.AllowAny]
+
+    def get(self, request, election_type):
+        election_type = election_type.lower()
+        interval = request.GET.get("interval", "1")
+        if not interval.isdigit() or not 1 <= int(interval) <= history.MAX_INTERVAL:
+            return bad_request(f"interval must be a whole number of minutes from 1 to {history.MAX_INTERVAL}.")
+        interval = int(interval)
+        try:
+            since, until = (
+                parse_time(request.GET[name]) if request.GET.get(name) else None
+                for name in ("since", "until")
+            )
+        except ValueError as exc:
+            return bad_request(str(exc))
+        return versioned_response(
+            request, "turnout", election_type, request.GET.urlencode(),
+            lambda: history.turnout(election_type, interval, since, until),
+        )
 
 
 # -----------------------------
@@ -85,70 +217,82 @@ class PartyVoteListView(generics.ListAPIView):
 
 from rest_framework import generics, permissions, status
 from rest_framework.response import Response
-from django.db.models import F
-from django.core.cache import cache
-from .models import Candidate, PartyVoteCount, Vote
 from .serializers import VoteSerializer
+from election.admission import AdmissionControlMixin
+from .services import AlreadyVotedError, cast_vote
 
-class CastVoteView(generics.CreateAPIView):
+class CastVoteView(AdmissionControlMixin, generics.CreateAPIView):
     serializer_class = VoteSerializer
     permission_classes = [permissions.IsAuthenticated]
+    admission_endpoint = "cast"
 
     def get_serializer_context(self):
         return {"request": self.request}
 
+    def is_replay(self, request):
+        # A retry of a finished cast does no work, so it isn't charged
+        return idempotency.is_replay(request, "cast")
+
     def create(self, request, *args, **kwargs):
+        # Retries carrying the same Idempotency-Key get the first response back
+        return idempotency.run(request, "cast", lambda: self.cast(request))
+
+    def cast(self, request):
         serializer = self.get_serializer(data=request.data)
         serializer.is_valid(raise_exception=True)
 
-        candidate = Candidate.objects.get(id=serializer.validated_data["candidate_id"])
+        candidate = serializer.validated_data["candidate"]
         election_type = candidate.election_type
 
         # ----------------------------
-        # Prevent double voting
+        # Insert vote + count it (one transaction);
+        # the unique constraint rejects double votes
         # ----------------------------
-        if Vote.objects.filter(user=request.user, election_type=election_type).exists():
+        try:
+            cast_vote(request.user, candidate)
+        except AlreadyVotedError as exc:
             return Response(
-                {"error": "You have already voted in this election."},
+                {"error": str(exc)},
                 status=status.HTTP_400_BAD_REQUEST
             )
 
         # ----------------------------
-        # Create vote
-        # ----------------------------
-        Vote.objects.create(
-            user=request.user,
-            candidate=candidate,
-            election_type=election_type
-        )
-
-        # ----------------------------
-        # Atomic increment of party vote
-        # ----------------------------
-        party_count, created = PartyVoteCount.objects.get_or_create(
-            election_type=election_type,
-            party=candidate.party,
-            defaults={"party_image": candidate.party_image, "vote_count": 0}
-        )
-
-        # F() ensures atomic increment
-        PartyVoteCount.objects.filter(id=party_count.id).update(
-            vote_count=F('vote_count') + 1,
-            party_image=candidate.party_image if not party_count.party_image else party_count.party_image
-        )
-
-        # ----------------------------
-        # Clear caches
+        # Update this voter's user_voted overlay; the Vote post_save
+        # signal moves the party-votes cache to a new generation
         # ----------------------------
-        cache.delete(f"candidates_{election_type}_{request.user.id}")
-        try:
-            keys = cache.keys(f"party_votes_{election_type}*")
-            for key in keys:
-                cache.delete(key)
-        except NotImplementedError:
-            cache.delete(f"party_votes_{election_type}_")
+        candidate_cache.remember_user_vote(election_type, request.user.id, candidate.id)
 
         return Response(
             {"message": "Vote submitted successfully!"},
             status=status.HTTP_201_CREATED
         )
+
+
+# -----------------------------
+# Bulk Vote Upload View
+# -----------------------------
+from rest_framework.parsers import MultiPartParser
+from .ingest import FORMATS, guess_format, ingest_ballots
+
+class BulkVoteUploadView(APIView):
+    """
+    Upload a polling unit's offline ballots as an NDJSON or CSV file
+    (multipart field "file"). Returns a per-row error report.
+    """
+    permission_classes = [permissions.IsAdminUser]
+    parser_classes = [MultiPartParser]
+
+    def post(self, request, *args, **kwargs):
+        upload = request.FILES.get("file")
+        if upload is None:
+            return Response({"error": "No file uploaded."}, status=status.HTTP_400_BAD_REQUEST)
+
+        fmt = request.data.get("format") or guess_format(upload.name)
+        if fmt not in FORMATS:
+            return Response(
+                {"error": f"format must be one of: {', '.join(FORMATS)}."},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+
+        report = ingest_ballots(upload, fmt)
+        return Response(report.as_dict(), status=status.HTTP_200_OK)
@@ -0,0 +1,216 @@
+"""
+Redis write-behind tallying for party vote counts.
+
+With VOTE_TALLY_WRITE_BEHIND enabled a cast only inserts the Vote row and
+bumps a Redis hash; flush() later folds the deltas into PartyVoteCount with
+one UPDATE per election. Per election there are three hashes:
+
+    vote_tally:<election>:pending   deltas recorded since the last flush
+    vote_tally:<election>:flushing  deltas claimed by the running flush
+    vote_tally:<election>:base      PartyVoteCount as of the last flush
+
+Live totals are base + flushing + pending, read in one round trip.
+
+Crash recovery:
+
+* Claiming renames pending to flushing and stamps it with a batch id in one
+  MULTI, so a vote is always in exactly one of the two hashes.
+* The batch is applied in a single transaction that also inserts a
+  TallyFlush row for its id. If the flusher dies after the commit but before
+  deleting the flushing hash, the next flush sees the TallyFlush row and only
+  finishes the Redis side, so a batch is never counted twice.
+* If it dies before the commit, nothing reached the database and the next
+  flush applies the same flushing hash again.
+* The flush lock expires after lock_timeout seconds so a dead flusher
+  cannot hold it forever. A live one renews it before each election and
+  again inside each batch's transaction, and rolls the batch back if the
+  lock has passed to another flusher meanwhile.
+* Vote rows are always written synchronously, so if Redis itself loses
+  unflushed deltas the counts can be rebuilt from the Vote table.
+"""
+import uuid
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Case, F, IntegerField, Value, When
+
+from .cache_keys import invalidate_party_rows
+from .models import ELECTION_TYPES, Candidate, PartyVoteCount, TallyFlush
+
+BATCH_FIELD = "__batch__"
+LOCK_KEY = "vote_tally:flush_lock"
+
+# Extends the lock only while it still holds this flusher's token
+RENEW_SCRIPT = """
+if redis.call('GET', KEYS[1]) == ARGV[1] then
+    return redis.call('EXPIRE', KEYS[1], ARGV[2])
+end
+return 0
+"""
+
+
+class FlushLockLost(Exception):
+    pass
+
+
+def get_redis():
+    from django_redis import get_redis_connection
+
+    return get_redis_connection("default")
+
+
+def enabled():
+    return getattr(settings, "VOTE_TALLY_WRITE_BEHIND", False)
+
+
+def _key(election_type, part):
+    return f"vote_tally:{election_type}:{part}"
+
+
+def _decode(value):
+    return value.decode() if isinstance(value, bytes) else value
+
+
+def record(election_type, party, amount=1, redis=None):
+    (redis or get_redis()).hincrby(_key(election_type, "pending"), party, amount)
+
+
+def read_totals(election_type, redis=None):
+    """
+    Returns {party: live vote total} straight from Redis. Before the first
+    flush there is no base hash yet, so PartyVoteCount is used instead.
+    """
+    redis = redis or get_redis()
+    pipe = redis.pipeline(transaction=False)
+    for part in ("base", "flushing", "pending"):
+        pipe.hgetall(_key(election_type, part))
+    base, flushing, pending = pipe.execute()
+
+    if base:
+        totals = {_decode(party): int(count) for party, count in base.items()}
+    else:
+        totals = dict(
+            PartyVoteCount.objects.filter(election_type=election_type)
+            .values_list("party", "vote_count")
+        )
+
+    for deltas in (flushing, pending):
+        for party, count in deltas.items():
+            party = _decode(party)
+            if party != BATCH_FIELD:
+                totals[party] = totals.get(party, 0) + int(count)
+    return totals
+
+
+def _renew(redis, token, lock_timeout):
+    if not redis.eval(RENEW_SCRIPT, 1, LOCK_KEY, token, lock_timeout):
+        raise FlushLockLost
+
+
+def flush(election_type, redis=None, token=None, lock_timeout=60):
+    """
+    Applies pending deltas for one election to PartyVoteCount. Callers must
+    hold the flush lock (see flush_all); given its token, the lock is renewed
+    for lock_timeout seconds and FlushLockLost is raised if it was lost.
+    Returns the number of votes applied.
+    """
+    redis = redis or get_redis()
+    renew = (lambda: _renew(redis, token, lock_timeout)) if token else (lambda: None)
+    renew()
+    batch_id, deltas = _claim(election_type, redis)
+    applied = _apply(election_type, batch_id, deltas, renew) if deltas else 0
+    _publish_base(election_type, redis)
+    return applied
+
+
+def flush_all(redis=None, lock_timeout=60):
+    """
+    Flushes every election type unless another flusher holds the lock.
+    Returns {election_type: votes applied}, or None if the lock was taken,
+    before or during the flush.
+    """
+    redis = redis or get_redis()
+    token = uuid.uuid4().hex
+    if not redis.set(LOCK_KEY, token, nx=True, ex=lock_timeout):
+        return None
+    try:
+        return {
+            election_type: flush(election_type, redis, token, lock_timeout)
+            for election_type, _ in ELECTION_TYPES
+        }
+    except FlushLockLost:
+        return None
+    finally:
+        if _decode(redis.get(LOCK_KEY)) == token:
+            redis.delete(LOCK_KEY)
+
+
+def _claim(election_type, redis):
+    pending_key = _key(election_type, "pending")
+    flushing_key = _key(election_type, "flushing")
+
+    # A flushing hash left behind by a crashed flush is finished first
+    if not redis.exists(flushing_key) and redis.exists(pending_key):
+        pipe = redis.pipeline(transaction=True)
+        pipe.rename(pending_key, flushing_key)
+        pipe.hset(flushing_key, BATCH_FIELD, uuid.uuid4().hex)
+        pipe.execute()
+
+    claimed = {_decode(k): _decode(v) for k, v in redis.hgetall(flushing_key).items()}
+    batch_id = claimed.pop(BATCH_FIELD, None)
+    return batch_id, {party: int(count) for party, count in claimed.items() if int(count)}
+
+
+def _apply(election_type, batch_id, deltas, renew=lambda: None):
+    with transaction.atomic():
+        if TallyFlush.objects.filter(batch_id=batch_id).exists():
+            return 0
+
+        existing = set(
+            PartyVoteCount.objects.filter(election_type=election_type, party__in=deltas)
+            .values_list("party", flat=True)
+        )
+        missing = [party for party in deltas if party not in existing]
+        if missing:
+            images = dict(
+                Candidate.objects.filter(election_type=election_type, party__in=missing)
+                .values_list("party", "party_image")
+            )
+            rows = [
+                PartyVoteCount(election_type=election_type, party=party, party_image=images.get(party))
+                for party in missing
+            ]
+            for row in rows:
+                row.refresh_media_urls()  # bulk_create skips save()
+            PartyVoteCount.objects.bulk_create(rows, ignore_conflicts=True)
+            # bulk_create sends no post_save, so the snapshot's rows are told here
+            transaction.on_commit(lambda: invalidate_party_rows(election_type))
+
+        PartyVoteCount.objects.filter(election_type=election_type, party__in=deltas).update(
+            vote_count=F("vote_count") + Case(
+                *[When(party=party, then=Value(count)) for party, count in deltas.items()],
+                default=Value(0),
+                output_field=IntegerField(),
+            )
+        )
+
+        # Only the latest batch per election is ever needed for recovery
+        TallyFlush.objects.filter(election_type=election_type).delete()
+        TallyFlush.objects.create(
+            batch_id=batch_id, election_type=election_type, vote_count=sum(deltas.values())
+        )
+        # Last, so a flusher that lost the lock mid-batch commits nothing
+        renew()
+    return sum(deltas.values())
+
+
+def _publish_base(election_type, redis):
+    base = dict(
+        PartyVoteCount.objects.filter(election_type=election_type)
+        .values_list("party", "vote_count")
+    )
+    pipe = redis.pipeline(transaction=True)
+    pipe.delete(_key(election_type, "flushing"), _key(election_type, "base"))
+    if base:
+        pipe.hset(_key(election_type, "base"), mapping=base)
+    pipe.execute()